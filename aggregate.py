@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Collapse identical printings into one Moxfield row.
+
+The same printing often shows up many times in an export (different ids,
+dates or groups). Aggregator keys rows on (name, edition, collector number,
+foil, condition, language, proxy) and, per key:
+
+  - sums Count and Tradelist Count
+  - merges the comma-separated Tags, keeping first-seen order
+  - keeps the newest Last Modified; only normalized dates are compared, so a
+    row whose date could not be parsed keeps the first value seen
+  - keeps every other field from the first row seen
+
+Rows are added one at a time. Merged rows come out in first-seen order. When
+more than `max_keys` distinct keys are held in memory, the partial results are
+spilled to disk in hash partitions. At the end each partition is merged on its
+own, so memory stays at about max_keys entries. Rows are then ordered by
+partition, and by first-seen order within a partition.
+
+Works on any dataclass rows with the Moxfield field names (MoxfieldAppRow).
+"""
+import os
+import re
+import zlib
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_MAX_KEYS = 500_000
+SPILL_PARTITIONS = 64
+
+# what dates.DateNormalizer writes; unparseable dates are passed through as-is
+_NORMALIZED_DATE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6}\Z")
+
+Key = Tuple[str, ...]
+Entry = List[Any]  # [count, tradelist count, tags, last modified, first row]
+
+def aggregate_key(row) -> Key:
+    return (row.name, row.edition, row.collector_number, row.foil, row.condition, row.language, row.proxy)
+
+def add_counts(total: str, count: str) -> str:
+    if not count:
+        return total
+    if not total:
+        return count
+    try:
+        return str(int(total) + int(count))
+    except ValueError:
+        return total  # not a number; keep the first one
+
+def merge_tags(tags: str, more: str) -> str:
+    if not more or more == tags:
+        return tags
+    if not tags:
+        return more
+    seen = [t.strip() for t in tags.split(",") if t.strip()]
+    for tag in more.split(","):
+        tag = tag.strip()
+        if tag and tag not in seen:
+            seen.append(tag)
+    return ",".join(seen)
+
+def is_newer(last_modified: str, current: str) -> bool:
+    """True when last_modified should replace current: both normalized (or current empty) and later."""
+    if current and last_modified <= current:  # "YYYY-MM-DD HH:MM:SS.ffffff" sorts as text
+        return False
+    return _NORMALIZED_DATE.match(last_modified) is not None and (
+        not current or _NORMALIZED_DATE.match(current) is not None)
+
+def _merge_entry(entry: Entry, other: Entry) -> None:
+    entry[0] = add_counts(entry[0], other[0])
+    entry[1] = add_counts(entry[1], other[1])
+    entry[2] = merge_tags(entry[2], other[2])
+    if is_newer(other[3], entry[3]):
+        entry[3] = other[3]
+
+
+class Aggregator:
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, spill_dir: Optional[str] = None,
+                 key: Callable[[Any], Key] = aggregate_key):
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1")
+        self.max_keys = max_keys
+        self.spill_dir = spill_dir
+        self.key = key
+        self._entries: Dict[Key, Entry] = {}
+        self._tmpdir: Optional[str] = None
+        self._partitions: List[Optional[Any]] = [None] * SPILL_PARTITIONS
+        # counters
+        self.rows_in = 0
+        self.spills = 0
+
+    def __enter__(self) -> "Aggregator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- input -----------------------------------------------------------------
+    def add(self, row) -> None:
+        self.rows_in += 1
+        key = self.key(row)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = [row.count, row.tradelist_count, row.tags, row.last_modified, row]
+            if len(self._entries) > self.max_keys:
+                self._spill()
+            return
+        entry[0] = add_counts(entry[0], row.count)
+        entry[1] = add_counts(entry[1], row.tradelist_count)
+        if row.tags:
+            entry[2] = merge_tags(entry[2], row.tags)
+        if is_newer(row.last_modified, entry[3]):
+            entry[3] = row.last_modified
+
+    def add_all(self, rows: Iterable) -> None:
+        add = self.add
+        for row in rows:
+            add(row)
+
+    def passthrough(self, rows: Iterable) -> Iterator:
+        """Yield rows unchanged while adding them (for writing raw and merged output in one pass)."""
+        add = self.add
+        for row in rows:
+            add(row)
+            yield row
+
+    def add_entries(self, entries: Iterable[Tuple[Key, Entry]]) -> None:
+        """Merge partial results from another Aggregator (e.g. from a worker process)."""
+        for key, other in entries:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = other
+                if len(self._entries) > self.max_keys:
+                    self._spill()
+            else:
+                _merge_entry(entry, other)
+
+    # --- spilling --------------------------------------------------------------
+    def _partition(self, key: Key) -> int:
+        return zlib.crc32("\x1f".join(key).encode("utf-8")) % SPILL_PARTITIONS
+
+    def _spill(self) -> None:
+        import pickle
+        import tempfile
+
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="mtg-aggregate-", dir=self.spill_dir)
+        parts: Dict[int, List[Tuple[Key, Entry]]] = {}
+        for key, entry in self._entries.items():
+            parts.setdefault(self._partition(key), []).append((key, entry))
+        for i, items in parts.items():
+            f = self._partitions[i]
+            if f is None:
+                f = self._partitions[i] = open(os.path.join(self._tmpdir, f"part-{i:02d}.pickle"), "w+b")
+            pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._entries = {}
+        self.spills += 1
+
+    def _read_partition(self, f) -> Dict[Key, Entry]:
+        import pickle
+
+        merged: Dict[Key, Entry] = {}
+        f.seek(0)
+        while True:
+            try:
+                items = pickle.load(f)
+            except EOFError:
+                return merged
+            for key, other in items:
+                entry = merged.get(key)
+                if entry is None:
+                    merged[key] = other
+                else:
+                    _merge_entry(entry, other)
+
+    # --- output ----------------------------------------------------------------
+    def entries(self) -> Iterator[Tuple[Key, Entry]]:
+        """All (key, merged entry) pairs; consumes the aggregator."""
+        if self._tmpdir is None:
+            entries, self._entries = self._entries, {}
+            yield from entries.items()
+            return
+        if self._entries:
+            self._spill()
+        for i, f in enumerate(self._partitions):
+            if f is None:
+                continue
+            yield from self._read_partition(f).items()
+            f.close()
+            self._partitions[i] = None
+        self.close()
+
+    def rows(self) -> Iterator:
+        """Merged rows; consumes the aggregator."""
+        for _, (count, tradelist_count, tags, last_modified, row) in self.entries():
+            yield replace(row, count=count, tradelist_count=tradelist_count, tags=tags,
+                          last_modified=last_modified)
+
+    def close(self) -> None:
+        for f in self._partitions:
+            if f is not None:
+                f.close()
+        self._partitions = [None] * SPILL_PARTITIONS
+        if self._tmpdir is not None:
+            import shutil
+
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
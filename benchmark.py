@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the converters.
+
+Generates synthetic ShinyApp / TCGPlayer exports and measures conversion
+throughput end to end (rows/sec, peak RSS of the converter process) and per
+stage (CSV parse, memory-mapped parse of the fast engine's columns, row model
+construction, name cleaning, set lookup, date formatting, price analytics, card
+index build and check, CSV write, deck output). Results are saved as JSON so runs can be compared across
+commits.
+
+Startup cost is measured separately: each converter is run a few times on a
+tiny input (the editor hook / single deck case) and the median wall time is
+checked against a budget, with the slowest imports listed. `run` exits with 1
+when a converter is over budget.
+
+USAGE:
+    ./benchmark.py generate shiny 100000 -o shiny-100k.csv
+    ./benchmark.py run --rows 10000 100000 -o bench.json
+    ./benchmark.py run --rows 100000 --compare bench.json
+    ./benchmark.py run --rows 1000 --startup-runs 20 --startup-budget 100
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+this_file_path = os.path.realpath(__file__)
+this_dir_path = os.path.dirname(this_file_path)
+example_export = os.path.join(this_dir_path, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+
+SHINY_FIELDS = [
+    "id", "product_name", "set_name", "brand_name", "discriminator", "rarity", "quantity",
+    "value_total", "value_per_unit", "value_currency", "paid_total", "paid_per_unit",
+    "paid_currency", "grade_type", "grade_subtype", "group_name", "group_wishlist",
+    "tcg_player_id", "price_charting_id", "card_market_id", "date_added", "tag",
+]
+TCGPLAYER_FIELDS = ["Have", "Want", "Trade", "Name", "Set", "Low", "Mid", "High"]
+
+STARTUP_ROWS = 20
+STARTUP_RUNS = 10
+STARTUP_BUDGET_MS = 150.0
+
+CONVERTERS = {
+    "shiny": "shiny_to_moxfield.py",
+    "tcgplayer": "tcgplayer_to_moxfield.py",
+}
+
+_BASE_NAMES = [
+    "Plains", "Island", "Swamp", "Mountain", "Forest", "Sol Ring", "Arcane Signet",
+    "Command Tower", "Lightning Bolt", "Counterspell", "Llanowar Elves", "Swords to Plowshares",
+    "Thornbite Staff", "Youthful Valkyrie", "Ruby, Daring Tracker", "Giada, Font of Hope",
+]
+_NAME_SUFFIXES = ["", "", "", "", " (Borderless)", " (Showcase)", " (Extended Art)", " - Full Art"]
+_RARITIES = ["Common", "Uncommon", "Rare", "Mythic", "Land", "Promo"]
+_GRADES = ["Near Mint", "Lightly Played", "Moderately Played"]
+
+# --- Synthetic data ------------------------------------------------------------
+def _zipf_weights(n: int, skew: float) -> List[float]:
+    return [1.0 / (rank ** skew) for rank in range(1, n + 1)]
+
+def _name_pool(rng: random.Random) -> List[str]:
+    names = list(_BASE_NAMES)
+    if os.path.exists(example_export):
+        with open(example_export, newline="", encoding="utf-8") as f:
+            names.extend(row["product_name"] for row in csv.DictReader(f))
+    names.extend(f"Synthetic Card {i}{rng.choice(_NAME_SUFFIXES)}" for i in range(2000))
+    # de-duplicate but keep the base names (lands, staples) at the front of the skew
+    return list(dict.fromkeys(names))
+
+def _set_pool() -> List[str]:
+    with open(os.path.join(this_dir_path, "mtg_sets.json"), encoding="utf-8") as f:
+        names = list(json.load(f))
+    with open(os.path.join(this_dir_path, "moxfield_set_codes.csv"), newline="", encoding="utf-8") as f:
+        names.extend(row["Set Name"] for row in csv.DictReader(f))
+    # a few names that only resolve through normalization / fuzzy matching
+    names.extend(["Duskmourn House of Horror", "Magic 2019 Core Set", "Commander: Bloomburrow",
+                  "Promo Pack: Kaldheim"])
+    return list(dict.fromkeys(names))
+
+def generate(source: str, rows: int, out, seed: int = 0, skew: float = 1.1, groups: int = 50,
+             foil_rate: float = 0.3, proxy_rate: float = 0.05) -> None:
+    """Write a synthetic export with `rows` data rows to the text stream `out`."""
+    rng = random.Random(seed)
+    names = _name_pool(rng)
+    name_weights = _zipf_weights(len(names), skew)
+    sets = _set_pool()
+    set_weights = _zipf_weights(len(sets), skew)
+    group_names = [f"Binder {i}" for i in range(groups)]
+    group_weights = _zipf_weights(groups, skew)
+
+    if source == "shiny":
+        writer = csv.writer(out, lineterminator="\r\n")
+        writer.writerow(SHINY_FIELDS)
+        base_ts = 1754600000
+        for i in range(rows):
+            name = rng.choices(names, name_weights)[0]
+            rarity = rng.choice(_RARITIES) + (" Foil" if rng.random() < foil_rate else "")
+            qty = rng.choice((1, 1, 1, 2, 4))
+            value = rng.randint(1, 5000)
+            paid = rng.randint(1, 5000)
+            ts = time.gmtime(base_ts + i * 7)
+            date_added = time.strftime("%Y-%m-%dT%H:%M:%S", ts) + f".{rng.randint(0, 999):03d}"
+            writer.writerow([
+                f"{rng.getrandbits(128):032x}", name, rng.choices(sets, set_weights)[0],
+                "Magic The Gathering", f"#{rng.randint(1, 400)}", rarity, qty,
+                f"{value * qty / 100:.2f}", f"{value / 100:.2f}", "USD",
+                f"{paid * qty / 100:.2f}", f"{paid / 100:.2f}", "USD",
+                "Ungraded", rng.choice(_GRADES), rng.choices(group_names, group_weights)[0], "false",
+                rng.randint(1, 700000), rng.randint(1, 9000000), "", date_added,
+                "proxy" if rng.random() < proxy_rate else "",
+            ])
+    elif source == "tcgplayer":
+        writer = csv.writer(out)
+        writer.writerow(TCGPLAYER_FIELDS)
+        for _ in range(rows):
+            name = " " + rng.choices(names, name_weights)[0]
+            if rng.random() < foil_rate:
+                name += " - [Foil]"
+            low = rng.randint(1, 500)
+            writer.writerow([
+                rng.choice((1, 1, 2, 4, 10)), 0, 0, name, rng.choices(sets, set_weights)[0],
+                f"${low / 100:,.2f}", f"${low * 2 / 100:,.2f}", f"${low * 150 / 100:,.2f}",
+            ])
+    else:
+        raise ValueError(f"unknown source: {source}")
+
+# --- Measurements --------------------------------------------------------------
+def _timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+# Runs a converter script and records its peak RSS. VmHWM is per address space
+# and reset by exec(), unlike ru_maxrss, which would include the benchmark
+# process itself.
+_MEASURE_SNIPPET = """
+import os, sys, resource, runpy
+report, script = sys.argv[1], sys.argv[2]
+sys.argv = sys.argv[2:]
+sys.path.insert(0, os.path.dirname(script))
+try:
+    runpy.run_path(script, run_name="__main__")
+finally:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024  # bytes on macOS
+    try:
+        with open("/proc/self/status") as f:
+            peak_kb = next(int(l.split()[1]) for l in f if l.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        pass
+    with open(report, "w") as f:
+        f.write(str(peak_kb))
+"""
+
+def _write_syscalls() -> Optional[int]:
+    """write() syscalls made so far by this process (all threads), from /proc; None elsewhere."""
+    try:
+        with open("/proc/self/io") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("syscw:"))
+    except (OSError, StopIteration):
+        return None
+
+def run_converter(source: str, input_path: str, workdir: str, extra_args: List[str] = ()) -> Dict[str, Any]:
+    """Run a converter script in a child process; return wall time and peak RSS."""
+    report = os.path.join(workdir, ".peak_rss")
+    script = os.path.join(this_dir_path, CONVERTERS[source])
+    cmd = [sys.executable, "-c", _MEASURE_SNIPPET, report, script, input_path, *extra_args]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{CONVERTERS[source]} exited with {proc.returncode}:\n{proc.stderr}")
+    with open(report) as f:
+        peak_rss_kb = int(f.read())
+    os.remove(report)
+    return {"seconds": elapsed, "peak_rss_kb": peak_rss_kb}
+
+def shiny_stages(input_path: str, workdir: str) -> Dict[str, Any]:
+    import shiny_to_moxfield as s2m
+    from csv_chunks import MappedCsv
+    from deck_output import DeckExporter
+    from prices import PriceAnalytics
+    from set_index import load_set_resolver
+
+    sets = load_set_resolver()
+    prices = PriceAnalytics()
+    normalizer = s2m._normalizer
+    normalizer.clear()
+    stages: Dict[str, float] = {}
+    with open(input_path, newline="", encoding="utf-8") as f:
+        stages["parse"] = _timed(lambda: sum(1 for _ in csv.DictReader(f)))
+        f.seek(0)
+        raw_rows = list(csv.DictReader(f))
+
+    def mapped_parse():
+        with MappedCsv(input_path) as data:
+            return sum(1 for _ in data.rows(s2m.SHINY_FAST_COLUMNS + s2m.SHINY_PRICE_COLUMNS))
+    stages["mapped_parse"] = _timed(mapped_parse)
+
+    shiny_rows: List[s2m.ShinyAppRow] = []
+    stages["row_model"] = _timed(lambda: shiny_rows.extend(s2m.ShinyAppRow.from_csv_row(r) for r in raw_rows))
+    stages["name_cleaning"] = _timed(lambda: [s2m.clean_name(r.product_name) for r in shiny_rows])
+    stages["set_lookup"] = _timed(lambda: [s2m._edition_code(r.set_name, sets) for r in shiny_rows])
+    stages["date_format"] = _timed(lambda: [s2m._format_last_modified(r.date_added) for r in shiny_rows])
+    stages["prices"] = _timed(lambda: [s2m.add_prices(prices, r) for r in shiny_rows])
+    mox_rows = [s2m.MoxfieldAppRow.from_shiny(r, sets) for r in shiny_rows]
+    stages["card_index"], stages["card_check"] = card_stages(mox_rows, workdir)
+
+    def write_csv():
+        writer = csv.DictWriter(io.StringIO(), fieldnames=s2m.MOXFIELD_FIELDS, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        for mox in mox_rows:
+            writer.writerow(mox.to_csv_dict())
+    stages["csv_write"] = _timed(write_csv)
+
+    deck_writer = DeckExporter(sets, directory=workdir)
+
+    def write_decks():
+        with deck_writer:
+            for mox in mox_rows:
+                deck_writer.add_row(mox)
+    syscw_before = _write_syscalls()
+    stages["deck_write"] = _timed(write_decks)
+    syscw_after = _write_syscalls()
+
+    decks = len(deck_writer.filenames())
+    return {
+        "stages": stages,
+        "name_cache": normalizer.stats(),
+        "deck_output": {
+            "decks": decks,
+            # open()/write() calls counted by the exporter itself
+            "opens": deck_writer.opens,
+            "writes": deck_writer.writes,
+            # write() syscalls measured from /proc/self/io (None where unavailable)
+            "write_syscalls": syscw_after - syscw_before if syscw_before is not None else None,
+            # modeled, not measured: one open()+write() per row plus one
+            # truncating open() per deck, as the old per-row appends did
+            "legacy_opens": len(mox_rows) + decks,
+            "legacy_writes": len(mox_rows),
+        },
+    }
+
+def card_stages(mox_rows: List[Any], workdir: str) -> Tuple[float, float]:
+    """
+    Build a card index from a Scryfall-style file of the converted printings
+    (every 10th name misspelled, so the check also takes the fuzzy path), then
+    time checking every row against it.
+    """
+    from card_index import CardIndex, CardValidator, build_index, validate_rows
+
+    source = os.path.join(workdir, "cards.json")
+    index_path = os.path.join(workdir, "cards.idx")
+    printings = sorted({(m.name, m.edition, m.collector_number) for m in mox_rows})
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump([{"name": name + ("x" if i % 10 == 0 else ""), "set": edition, "collector_number": number}
+                   for i, (name, edition, number) in enumerate(printings)], f)
+    build = _timed(lambda: build_index(source, index_path))
+    with CardIndex(index_path) as index:
+        cards = CardValidator(index)
+        check = _timed(lambda: sum(1 for _ in validate_rows(mox_rows, cards)))
+    return build, check
+
+def tcgplayer_stages(input_path: str, workdir: str) -> Dict[str, Any]:
+    import tcgplayer_to_moxfield as t2m
+    from set_index import load_set_resolver
+
+    sets = load_set_resolver()
+    normalizer = t2m._normalizer
+    normalizer.clear()
+    stages: Dict[str, float] = {}
+    with open(input_path, newline="", encoding="utf-8") as f:
+        stages["parse"] = _timed(lambda: sum(1 for _ in csv.DictReader(f)))
+        f.seek(0)
+        raw_rows = list(csv.DictReader(f))
+    stages["name_cleaning"] = _timed(lambda: [t2m.clean_name(r["Name"]) for r in raw_rows])
+    stages["set_lookup"] = _timed(lambda: [sets.resolve(r["Set"]) for r in raw_rows])
+    stages["csv_write"] = _timed(lambda: t2m.process(iter(raw_rows), csv.DictWriter(
+        io.StringIO(), fieldnames=t2m.MOXFIELD_FIELDS, quoting=csv.QUOTE_ALL), sets))
+    return {"stages": stages, "name_cache": normalizer.stats()}
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+def _wall_times(cmd: List[str], cwd: str, runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        times.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} exited with {proc.returncode}:\n{proc.stderr}")
+    return times
+
+def slowest_imports(module: str, top: int = 5) -> List[Dict[str, Any]]:
+    """The modules with the most self time when importing `module` (python -X importtime)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=this_dir_path, capture_output=True, text=True)
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            imports.append({"module": fields[2].strip(), "self_ms": int(fields[0]) / 1000,
+                            "cumulative_ms": int(fields[1]) / 1000})
+        except (IndexError, ValueError):
+            continue  # the column header line
+    return sorted(imports, key=lambda i: i["self_ms"], reverse=True)[:top]
+
+def measure_startup(source: str, runs: int = STARTUP_RUNS, budget_ms: float = STARTUP_BUDGET_MS) -> Dict[str, Any]:
+    """Median wall time of a converter on a tiny input, against `budget_ms`."""
+    with tempfile.TemporaryDirectory(prefix="mtg-startup-") as workdir:
+        input_path = os.path.join(workdir, f"{source}-{STARTUP_ROWS}.csv")
+        with open(input_path, "w", newline="", encoding="utf-8") as out:
+            generate(source, STARTUP_ROWS, out)
+        script = os.path.join(this_dir_path, CONVERTERS[source])
+        times = _wall_times([sys.executable, script, input_path], workdir, runs)
+        interpreter = _wall_times([sys.executable, "-c", "pass"], workdir, runs)
+    median_ms = _median(times) * 1000
+    return {
+        "source": source,
+        "rows": STARTUP_ROWS,
+        "runs": runs,
+        "median_ms": median_ms,
+        "min_ms": min(times) * 1000,
+        "interpreter_ms": _median(interpreter) * 1000,
+        "budget_ms": budget_ms,
+        "over_budget": median_ms > budget_ms,
+        "slowest_imports": slowest_imports(os.path.splitext(CONVERTERS[source])[0]),
+    }
+
+STAGE_RUNNERS = {
+    "shiny": shiny_stages,
+    "tcgplayer": tcgplayer_stages,
+}
+
+def bench_case(source: str, rows: int, seed: int, skew: float, extra_args: List[str]) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="mtg-bench-") as workdir:
+        input_path = os.path.join(workdir, f"{source}-{rows}.csv")
+        with open(input_path, "w", newline="", encoding="utf-8") as out:
+            generate(source, rows, out, seed=seed, skew=skew)
+        outdir = os.path.join(workdir, "out")
+        os.mkdir(outdir)
+        result: Dict[str, Any] = {"source": source, "rows": rows, "input_bytes": os.path.getsize(input_path)}
+        end_to_end = run_converter(source, input_path, outdir, extra_args)
+        end_to_end["rows_per_sec"] = rows / end_to_end["seconds"] if end_to_end["seconds"] else None
+        result["end_to_end"] = end_to_end
+        stage_dir = os.path.join(workdir, "stages")
+        os.mkdir(stage_dir)
+        result.update(STAGE_RUNNERS[source](input_path, stage_dir))
+        return result
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=this_dir_path,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# --- Reporting -----------------------------------------------------------------
+def _case_key(case: Dict[str, Any]) -> str:
+    return f"{case['source']}/{case['rows']}"
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None, file=sys.stdout) -> None:
+    base_cases = {_case_key(c): c for c in (baseline or {}).get("cases", [])}
+    for case in results["cases"]:
+        e2e = case["end_to_end"]
+        rate = f"{e2e['rows_per_sec']:>12,.0f}" if e2e["rows_per_sec"] is not None else f"{'n/a':>12}"
+        line = (f"{_case_key(case):>20}  {rate} rows/s  "
+                f"{e2e['seconds']:8.3f}s  peak RSS {e2e['peak_rss_kb'] / 1024:8.1f} MiB")
+        base = base_cases.get(_case_key(case))
+        base_rate = base["end_to_end"].get("rows_per_sec") if base else None
+        if e2e["rows_per_sec"] and base_rate:
+            line += f"  ({e2e['rows_per_sec'] / base_rate:.2f}x vs {baseline.get('commit')})"
+        print(line, file=file)
+        for stage, seconds in case["stages"].items():
+            base_s = base["stages"].get(stage) if base else None
+            delta = f"  ({base_s / seconds:.2f}x)" if base_s and seconds else ""
+            print(f"{'':>22}{stage:<14}{seconds:8.3f}s{delta}", file=file)
+        if "deck_output" in case:
+            d = case["deck_output"]
+            measured = d.get("write_syscalls")
+            measured = f", {measured} write syscalls measured" if measured is not None else ""
+            print(f"{'':>22}deck output: {d['decks']} decks, {d['opens']} opens / {d['writes']} writes "
+                  f"counted{measured} (per-row appends, modeled: {d['legacy_opens']} / {d['legacy_writes']})",
+                  file=file)
+    base_startup = {s["source"]: s for s in (baseline or {}).get("startup", [])}
+    for startup in results.get("startup", []):
+        line = (f"{'startup/' + startup['source']:>20}  {startup['median_ms']:8.1f} ms median "
+                f"(min {startup['min_ms']:.1f}, interpreter {startup['interpreter_ms']:.1f}, "
+                f"budget {startup['budget_ms']:.0f})")
+        base = base_startup.get(startup["source"])
+        if base:
+            line += f"  ({base['median_ms'] / startup['median_ms']:.2f}x vs {baseline.get('commit')})"
+        if startup["over_budget"]:
+            line += "  OVER BUDGET"
+        print(line, file=file)
+        imports = ", ".join(f"{i['module']} {i['self_ms']:.1f}" for i in startup["slowest_imports"])
+        print(f"{'':>22}slowest imports (self ms): {imports}", file=file)
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark the MTG collection converters.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    g = sub.add_parser("generate", help="Write a synthetic export")
+    g.add_argument("source", choices=sorted(CONVERTERS))
+    g.add_argument("rows", type=int)
+    g.add_argument("-o", "--output", default="-", help="Output CSV path (default: stdout)")
+    g.add_argument("--seed", type=int, default=0)
+    g.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for names / sets / groups")
+    g.add_argument("--groups", type=int, default=50, help="Number of distinct group_name values")
+    g.add_argument("--foil-rate", type=float, default=0.3)
+    g.add_argument("--proxy-rate", type=float, default=0.05)
+
+    r = sub.add_parser("run", help="Run the benchmark suite")
+    r.add_argument("--source", nargs="+", choices=sorted(CONVERTERS), default=sorted(CONVERTERS))
+    r.add_argument("--rows", nargs="+", type=int, default=[10000, 100000])
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--skew", type=float, default=1.1)
+    r.add_argument("-o", "--output", help="Save results as JSON")
+    r.add_argument("--compare", help="Previous results JSON to compare against")
+    r.add_argument("--startup-runs", type=int, default=STARTUP_RUNS,
+                   help=f"Runs per converter for the startup measurement (0 to skip; default: {STARTUP_RUNS})")
+    r.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS, metavar="MS",
+                   help=f"Median startup time allowed per converter (default: {STARTUP_BUDGET_MS:.0f} ms)")
+    r.add_argument("converter_args", nargs=argparse.REMAINDER,
+                   help="Extra arguments passed to the converter (after --)")
+    return p.parse_args(argv)
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    if args.command == "generate":
+        kwargs = dict(seed=args.seed, skew=args.skew, groups=args.groups,
+                      foil_rate=args.foil_rate, proxy_rate=args.proxy_rate)
+        if args.output == "-":
+            generate(args.source, args.rows, sys.stdout, **kwargs)
+        else:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                generate(args.source, args.rows, out, **kwargs)
+        return 0
+
+    extra_args = [a for a in args.converter_args if a != "--"]
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "converter_args": extra_args,
+        "cases": [],
+        "startup": [],
+    }
+    for source in args.source:
+        for rows in args.rows:
+            print(f"benchmarking {source} with {rows} rows ...", file=sys.stderr)
+            results["cases"].append(bench_case(source, rows, args.seed, args.skew, extra_args))
+        if args.startup_runs > 0:
+            print(f"measuring {source} startup ...", file=sys.stderr)
+            results["startup"].append(measure_startup(source, args.startup_runs, args.startup_budget))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(s["over_budget"] for s in results["startup"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
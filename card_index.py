@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+"""
+Card name / printing index for validating converted rows before they are
+uploaded to Moxfield.
+
+The index is compiled once from a Scryfall bulk-data file
+(https://scryfall.com/docs/api/bulk-data, "Default Cards" or "All Cards") into
+mtg_cards.idx: three sorted tables of UTF-8 strings with an offset array each,
+
+  - names:          normalized name -> card name (full names and each face)
+  - printings:      set code, collector number -> card name
+  - name printings: normalized name -> set code, collector number
+
+The file is memory-mapped and searched in place with binary search, so loading
+it costs nothing and processes converting at the same time share its pages.
+Lookups are exact (normalized: case, accents and punctuation ignored), by
+prefix, or fuzzy (difflib over the names that share the first two characters).
+
+CardValidator checks each output row's Name / Edition / Collector Number
+against the index and either flags mismatches or, with fix=True, replaces
+them with the suggested value when there is exactly one.
+
+USAGE:
+    ./card_index.py build default-cards.json
+    ./card_index.py lookup "Lightning Bolt" "Lightnig Bolt"
+    ./card_index.py prefix "Delver of"
+    ./card_index.py check moxfield-converted-collection.csv
+"""
+import os
+import re
+import csv
+import sys
+import json
+import gzip
+import mmap
+import struct
+import argparse
+import unicodedata
+from array import array
+from bisect import bisect_left
+from dataclasses import replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+this_file_path = os.path.realpath(__file__)
+this_dir_path = os.path.dirname(this_file_path)
+default_index_file = os.path.join(this_dir_path, "mtg_cards.idx")
+
+INDEX_VERSION = 1
+REPORT_VERSION = 1
+MAGIC = b"MTGCARDS"
+FUZZY_CUTOFF = 0.85
+# a printing's name is only suggested for a row whose name is at least this close
+PRINTING_CUTOFF = 0.6
+DEFAULT_CACHE_SIZE = 65536
+READ_SIZE = 1 << 20
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DIGIT = re.compile(r"[0-9]")
+# words a store appends to a card name for its treatment ("Lightning Bolt
+# Borderless"); a name guessed by dropping only these is safe to correct
+TREATMENT_WORDS = frozenset(
+    "alt alternate art black border borderless etched extended foil fracture frame full galaxy jp japanese "
+    "old promo retro ripple scrolls serialized showcase surge textured white".split())
+# native byte order: an index copied to a machine with the other byte order
+# reads as another version and is rebuilt
+_PAIR = struct.Struct("=II")
+
+# --- Normalization -------------------------------------------------------------
+def normalize_card_name(name: str) -> str:
+    """'Lim-Dûl the Necromancer' -> 'lim dul the necromancer'."""
+    s = name or ""
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s.replace("Æ", "Ae").replace("æ", "ae"))
+        s = "".join(c for c in s if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", s.lower()).strip()
+
+def face_names(name: str) -> List[str]:
+    """'Fire // Ice' -> ['Fire // Ice', 'Fire', 'Ice']."""
+    faces = [face.strip() for face in name.split(" // ")]
+    return [name] + faces if len(faces) > 1 else [name]
+
+# --- Source loader -------------------------------------------------------------
+def iter_cards(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    The card objects of a Scryfall bulk-data file (a JSON array, optionally
+    gzipped), decoded one at a time so the multi-hundred-MB file is never held
+    in memory. An API list object ({"data": [...]}) is also accepted.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    decoder = json.JSONDecoder()
+    with opener(path, "rt", encoding="utf-8") as f:
+        buf = f.read(READ_SIZE).lstrip()
+        if buf.startswith("{"):
+            raw = json.loads(buf + f.read())
+            if not isinstance(raw.get("data"), list):
+                raise ValueError(f"{path}: expected a Scryfall bulk-data array of cards")
+            yield from raw["data"]
+            return
+        if not buf.startswith("["):
+            raise ValueError(f"{path}: expected a Scryfall bulk-data array of cards")
+        pos, eof = 1, False
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                card, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(READ_SIZE)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            if isinstance(card, dict):
+                yield card
+            pos = end
+
+def _source_stamp(path: str) -> List[List[Any]]:
+    stamp = []
+    # this file too, so changes to the normalization rebuild the index
+    for p in (path, this_file_path):
+        st = os.stat(p)
+        stamp.append([os.path.abspath(p), st.st_mtime_ns, st.st_size])
+    return stamp
+
+# --- Index file ----------------------------------------------------------------
+def _write_table(f, entries: Set[bytes]) -> None:
+    strings = sorted(entries)
+    offsets = array("I", [0])
+    total = 0
+    for s in strings:
+        total += len(s)
+        offsets.append(total)
+    f.write(_PAIR.pack(len(strings), total))
+    f.write(offsets.tobytes())
+    f.write(b"".join(strings))
+    f.write(b"\0" * (-total % 4))
+
+def build_index(source: str, path: str) -> Tuple[int, int]:
+    """Compile a Scryfall bulk-data file into an index at `path`; returns (names, printings)."""
+    names: Set[bytes] = set()
+    printings: Set[bytes] = set()
+    name_printings: Set[bytes] = set()
+    stamp = _source_stamp(source)
+    for card in iter_cards(source):
+        name = card.get("name")
+        if not name:
+            continue
+        set_code = (card.get("set") or "").lower().encode()
+        number = (card.get("collector_number") or "").encode()
+        if set_code:
+            printings.add(set_code + b"\0" + number + b"\0" + name.encode())
+        for face in face_names(name):
+            key = normalize_card_name(face).encode()
+            if not key:
+                continue
+            names.add(key + b"\0" + face.encode())
+            if set_code:
+                name_printings.add(key + b"\0" + set_code + b"\0" + number)
+
+    stamp_bytes = json.dumps(stamp).encode()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_PAIR.pack(INDEX_VERSION, len(stamp_bytes)))
+        f.write(stamp_bytes + b"\0" * (-len(stamp_bytes) % 4))
+        for table in (names, printings, name_printings):
+            _write_table(f, table)
+    os.replace(tmp, path)
+    return len(names), len(printings)
+
+
+class _Table:
+    """
+    A sorted table of byte strings read in place from the mapped index: the
+    entry count and total size, count + 1 offsets, then the strings back to back.
+    """
+    def __init__(self, data: mmap.mmap, pos: int):
+        self._data = data
+        self.count, size = _PAIR.unpack_from(data, pos)
+        offsets = pos + _PAIR.size
+        self._strings = offsets + 4 * (self.count + 1)
+        self.end = self._strings + size + (-size % 4)
+        if self.end > len(data):
+            raise ValueError("truncated card index")
+        self._offsets = memoryview(data)[offsets:self._strings].cast("I")
+
+    def release(self) -> None:
+        """Let go of the mapping (it can't be closed while a view of it exists)."""
+        self._offsets.release()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        offsets, strings = self._offsets, self._strings
+        return self._data[strings + offsets[i]:strings + offsets[i + 1]]
+
+    def range(self, prefix: bytes) -> Tuple[int, int]:
+        """(lo, hi) of the entries that start with `prefix`."""
+        # 0xff never occurs in UTF-8, so it sorts after every entry with this prefix
+        return bisect_left(self, prefix), bisect_left(self, prefix + b"\xff")
+
+    def __contains__(self, entry: bytes) -> bool:
+        i = bisect_left(self, entry)
+        return i < self.count and self[i] == entry
+
+    def find(self, prefix: bytes) -> Optional[bytes]:
+        """The first entry that starts with `prefix`, or None."""
+        i = bisect_left(self, prefix)
+        if i < self.count:
+            entry = self[i]
+            if entry.startswith(prefix):
+                return entry
+        return None
+
+
+class CardIndex:
+    """
+    A compiled index, memory-mapped read-only. Use as a context manager or call
+    close(). Pickles as its path, so worker processes map the same file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            data = self._map
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a card index")
+            version, stamp_size = _PAIR.unpack_from(data, len(MAGIC))
+            if version != INDEX_VERSION:
+                raise ValueError(f"{path} is from another version")
+            pos = len(MAGIC) + _PAIR.size
+            self.stamp = json.loads(data[pos:pos + stamp_size])
+            pos += stamp_size + (-stamp_size % 4)
+            self._tables: List[_Table] = []
+            for _ in range(3):
+                self._tables.append(_Table(data, pos))
+                pos = self._tables[-1].end
+            self.names, self.printings, self.name_printings = self._tables
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CardIndex"]:
+        """Map a compiled index; None if it is missing, damaged or from another version."""
+        try:
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    def __reduce__(self):
+        return (CardIndex, (self.path,))
+
+    def __enter__(self) -> "CardIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for table in getattr(self, "_tables", ()):
+            table.release()
+        self._map.close()
+
+    # --- lookups ---------------------------------------------------------------
+    def name(self, name: str) -> Optional[str]:
+        """The card (or face) name as Scryfall spells it, if the normalized name is known."""
+        return self._name(normalize_card_name(name))
+
+    def _name(self, key: str) -> Optional[str]:
+        if not key:
+            return None
+        entry = self.names.find(key.encode() + b"\0")
+        return entry.split(b"\0", 1)[1].decode() if entry is not None else None
+
+    def prefix(self, text: str, limit: int = 20) -> List[str]:
+        """Up to `limit` names whose normalized form starts with that of `text`, in sorted order."""
+        key = normalize_card_name(text)
+        if not key:
+            return []
+        lo, hi = self.names.range(key.encode())
+        return [self.names[i].split(b"\0", 1)[1].decode() for i in range(lo, min(hi, lo + limit))]
+
+    def fuzzy(self, name: str, cutoff: float = FUZZY_CUTOFF) -> Optional[str]:
+        """The closest name among those sharing the first two characters, if it is close enough."""
+        key = normalize_card_name(name)
+        if len(key) < 2:
+            return None
+        from difflib import SequenceMatcher
+
+        matcher = SequenceMatcher(None, "", key)
+        best, best_ratio = None, cutoff
+        lo, hi = self.names.range(key[:2].encode())
+        for i in range(lo, hi):
+            candidate, display = self.names[i].decode().split("\0", 1)
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() <= best_ratio or matcher.quick_ratio() <= best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio:
+                best, best_ratio = display, ratio
+        return best
+
+    def printing(self, set_code: str, number: str) -> Optional[str]:
+        """The name of the card printed as `number` in the set."""
+        entry = self.printings.find(f"{set_code}\0{number}\0".encode())
+        return entry.split(b"\0", 2)[2].decode() if entry is not None else None
+
+    def has_set(self, set_code: str) -> bool:
+        return bool(set_code) and self.printings.find(set_code.encode() + b"\0") is not None
+
+    def printings_of(self, name: str) -> List[Tuple[str, str]]:
+        """(set code, collector number) of every printing of a card (or face)."""
+        return self._printings_of(normalize_card_name(name))
+
+    def _printings_of(self, key: str) -> List[Tuple[str, str]]:
+        if not key:
+            return []
+        table = self.name_printings
+        lo, hi = table.range(key.encode() + b"\0")
+        printings = []
+        for i in range(lo, hi):
+            _, set_code, number = table[i].decode().split("\0")
+            printings.append((set_code, number))
+        return printings
+
+    # basic lands have thousands of printings, so rows are checked with single
+    # lookups and the printings are only listed for a mismatch
+    def _find_printing(self, key: str, set_code: str, number: str) -> Tuple[bool, bool]:
+        """(printed in the set, printed as that number in the set), with one binary search."""
+        table = self.name_printings
+        prefix = f"{key}\0{set_code}\0".encode()
+        entry = prefix + number.encode()
+        i = bisect_left(table, entry)
+        if i < table.count:
+            found = table[i]
+            if found == entry:
+                return True, True
+            if found.startswith(prefix):
+                return True, False
+        return i > 0 and table[i - 1].startswith(prefix), False
+
+    def _has_printing(self, key: str, set_code: str, number: str) -> bool:
+        return f"{key}\0{set_code}\0{number}".encode() in self.name_printings
+
+    def _only_number_in_set(self, key: str, set_code: str) -> Optional[str]:
+        """The collector number of a card (or face) in a set it was printed in just once."""
+        table = self.name_printings
+        prefix = f"{key}\0{set_code}\0".encode()
+        lo, hi = table.range(prefix)
+        return table[lo][len(prefix):].decode() if hi - lo == 1 else None
+
+
+def load_card_index(source: Optional[str] = None, index_path: str = default_index_file) -> CardIndex:
+    """
+    Map the compiled index. With a Scryfall bulk-data `source`, the index is
+    (re)built first unless it was built from the same, unchanged file.
+    """
+    if source:
+        try:
+            stamp = _source_stamp(source)
+        except FileNotFoundError as e:
+            print(f"ERROR: card data file not found: {e.filename}", file=sys.stderr)
+            sys.exit(2)
+        index = CardIndex.load(index_path)
+        if index is not None and index.stamp == stamp:
+            return index
+        if index is not None:
+            index.close()
+        try:
+            build_index(source, index_path)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: could not build the card index from {source}\n{e}", file=sys.stderr)
+            sys.exit(2)
+    index = CardIndex.load(index_path)
+    if index is None:
+        print(f"ERROR: no usable card index at {index_path}; build one with "
+              "./card_index.py build SCRYFALL_BULK_JSON", file=sys.stderr)
+        sys.exit(2)
+    return index
+
+# --- Validation ----------------------------------------------------------------
+Issue = Tuple[str, str, str, str, bool]  # (field, card name, value, suggestion or "", fix=True applies it)
+Counts = Tuple[int, int, int, Dict[Issue, int]]  # (rows, flagged rows, corrected rows, issues)
+
+
+class CardValidator:
+    """
+    check(name, edition, collector_number) -> the values to write. Each row is
+    checked in order: the name must be a known card or face name, the edition
+    a set the card was printed in, and the collector number one of its numbers
+    in that set. Mismatches are counted in `issues` with a suggestion when
+    exactly one value fits; with fix=True the suggestion replaces the value.
+    A collector number is only replaced by a different one when it has no
+    digits at all; a real number that is not in the set is just reported.
+
+    Some suggestions are only reported, never applied: a name guessed by
+    dropping words that are not a treatment ("Serra Angel's Grace" is not
+    "Serra Angel"), an edition for a guessed name, and anything in a row whose
+    set the index does not know (the bulk file is older than the set, so the
+    card is probably just missing).
+
+    An empty edition or collector number is not checked (Moxfield fills them
+    in). Results are cached per distinct (name, edition, number).
+    """
+    def __init__(self, index: CardIndex, fix: bool = False, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.index = index
+        self.fix = fix
+        self.maxsize = maxsize
+        self._cache: Dict[Tuple[str, str, str], Tuple[Tuple[str, str, str], Tuple[Issue, ...], bool]] = {}
+        # a name repeats in many (name, edition, number) combinations:
+        # name -> (normalized name, index spelling or None), and unknown
+        # normalized name -> (guessed card name, safe to correct)
+        self._names: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._guesses: Dict[str, Tuple[Optional[str], bool]] = {}
+        self.rows = 0
+        self.flagged = 0
+        self.corrected = 0
+        self.issues: Dict[Issue, int] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # workers get the index and settings, not this process's cache or counts
+        return {"index": self.index, "fix": self.fix, "maxsize": self.maxsize}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["index"], state["fix"], state["maxsize"])
+
+    def signature(self) -> str:
+        """Identifies the index and mode, e.g. for the --incremental state context."""
+        return f"{self.index.stamp!r}:{'fix' if self.fix else 'check'}"
+
+    def check(self, name: str, edition: str, number: str) -> Tuple[str, str, str]:
+        self.rows += 1
+        key = (name, edition, number)
+        cached = self._cache.get(key)
+        if cached is None:
+            values, issues = self._check(name, edition, number)
+            cached = (values, tuple(issues), values != key)
+            if len(self._cache) >= self.maxsize:
+                self._cache.clear()
+                self._names.clear()
+                self._guesses.clear()
+            self._cache[key] = cached
+        values, issues, changed = cached
+        if issues:
+            self.flagged += 1
+            self.corrected += changed
+            for issue in issues:
+                self.issues[issue] = self.issues.get(issue, 0) + 1
+        return values
+
+    def _check(self, name: str, edition: str, number: str) -> Tuple[Tuple[str, str, str], List[Issue]]:
+        index = self.index
+        issues: List[Issue] = []
+        looked_up = self._names.get(name)
+        if looked_up is None:
+            key = normalize_card_name(name)
+            looked_up = self._names[name] = (key, index._name(key))
+        key, known = looked_up
+        known_set = not edition or index.has_set(edition)
+        guessed = known is None
+        if guessed:
+            suggestion, safe = self._suggest_name(key, edition, number)
+            applies = safe and known_set
+            issues.append(("name", name, name, suggestion or "", applies))
+            if not applies:
+                return (name, edition, number), issues
+            if self.fix:
+                name = suggestion
+            key = normalize_card_name(suggestion)
+        elif known != name:
+            issues.append(("name", name, name, known, True))
+            if self.fix:
+                name = known
+        if not edition:
+            return (name, edition, number), issues
+
+        in_set, printed = index._find_printing(key, edition, number)
+        if not in_set:
+            printings = index._printings_of(key)
+            candidates = sorted({s for s, n in printings if n == number}) if number else []
+            if len(candidates) != 1:
+                candidates = sorted({s for s, _ in printings})
+            suggestion = candidates[0] if len(candidates) == 1 else ""
+            applies = bool(suggestion) and known_set and not guessed
+            issues.append(("edition", name, edition, suggestion, applies))
+            if not (self.fix and applies):
+                return (name, edition, number), issues
+            edition = suggestion
+            printed = index._has_printing(key, edition, number)
+
+        if number and not printed:
+            # ShinyApp pads some numbers ("0282" for Scryfall's "282")
+            trimmed = number.lstrip("0")
+            if trimmed != number and index._has_printing(key, edition, trimmed):
+                suggestion = trimmed
+            elif not _DIGIT.search(number):
+                # "?", "N/A": not a number at all, so the set's only one is meant
+                suggestion = index._only_number_in_set(key, edition) or ""
+            else:
+                suggestion = ""
+            issues.append(("collector number", name, number, suggestion, bool(suggestion)))
+            if self.fix and suggestion:
+                number = suggestion
+        return (name, edition, number), issues
+
+    def _suggest_name(self, key: str, edition: str, number: str) -> Tuple[Optional[str], bool]:
+        """
+        (the card meant by an unknown name, whether it is safe to correct): the
+        printing's card, a known leading part, or a fuzzy match.
+        """
+        if not key:
+            return None, False
+        index = self.index
+        if edition and number:
+            printed = index.printing(edition, number)
+            if printed is not None:
+                from difflib import SequenceMatcher
+
+                for face in face_names(printed):
+                    face_key = normalize_card_name(face)
+                    if key.startswith(face_key + " "):
+                        return face, TREATMENT_WORDS.issuperset(key[len(face_key):].split())
+                    if SequenceMatcher(None, key, face_key).ratio() >= PRINTING_CUTOFF:
+                        return face, True
+        if key not in self._guesses:
+            self._guesses[key] = self._guess_name(key)
+        return self._guesses[key]
+
+    def _guess_name(self, key: str) -> Tuple[Optional[str], bool]:
+        # "Lightning Bolt Borderless Showcase" -> "Lightning Bolt"
+        words = key.split()
+        for n in range(len(words) - 1, 0, -1):
+            known = self.index._name(" ".join(words[:n]))
+            if known is not None:
+                return known, TREATMENT_WORDS.issuperset(words[n:])
+        fuzzy = self.index.fuzzy(key)
+        return fuzzy, fuzzy is not None
+
+    # --- results ---------------------------------------------------------------
+    def take_counts(self) -> Counts:
+        """The counts so far, which are then reset (e.g. per chunk in a worker)."""
+        counts = (self.rows, self.flagged, self.corrected, self.issues)
+        self.rows = self.flagged = self.corrected = 0
+        self.issues = {}
+        return counts
+
+    def add_counts(self, counts: Counts) -> None:
+        rows, flagged, corrected, issues = counts
+        self.rows += rows
+        self.flagged += flagged
+        self.corrected += corrected
+        for issue, count in issues.items():
+            self.issues[issue] = self.issues.get(issue, 0) + count
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "version": REPORT_VERSION,
+            "index": self.index.path,
+            "fix": self.fix,
+            "rows": self.rows,
+            "flagged_rows": self.flagged,
+            "corrected_rows": self.corrected,
+            "issues": [{"field": field, "card": card, "value": value, "suggestion": suggestion,
+                        "corrected": self.fix and applies, "rows": count}
+                       for (field, card, value, suggestion, applies), count in _sorted_issues(self.issues)],
+        }
+
+    def write(self, path: str) -> Dict[str, Any]:
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        return report
+
+
+def _sorted_issues(issues: Dict[Issue, int]) -> List[Tuple[Issue, int]]:
+    return sorted(issues.items(), key=lambda item: (-item[1], item[0]))
+
+def validate_row(row: Any, cards: CardValidator) -> Any:
+    """check() a dataclass row with name / edition / collector_number; a corrected copy if anything changed."""
+    name, edition, number = cards.check(row.name, row.edition, row.collector_number)
+    if name != row.name or edition != row.edition or number != row.collector_number:
+        return replace(row, name=name, edition=edition, collector_number=number)
+    return row
+
+def validate_rows(rows: Iterable[Any], cards: CardValidator) -> Iterator[Any]:
+    """validate_row() each row on its way to the writers."""
+    for row in rows:
+        yield validate_row(row, cards)
+
+def report_issues(cards: CardValidator, file=sys.stderr, limit: int = 10) -> None:
+    if not cards.issues:
+        return
+    print(f"WARNING: {cards.flagged} of {cards.rows} row(s) do not match the card index "
+          f"({cards.corrected} corrected):", file=file)
+    issues = _sorted_issues(cards.issues)
+    for (field, card, value, suggestion, applies), count in issues[:limit]:
+        where = "" if field == "name" else f" of {card!r}"
+        if not suggestion:
+            hint = "no match"
+        elif cards.fix and applies:
+            hint = f"-> {suggestion!r}"
+        else:
+            hint = f"did you mean {suggestion!r}?"
+        print(f"  {field} {value!r}{where}: {hint} ({count} rows)", file=file)
+    if len(issues) > limit:
+        print(f"  ... {len(issues) - limit} more", file=file)
+
+# --- CLI -----------------------------------------------------------------------
+def check_csv(path: str, cards: CardValidator, output: Optional[str] = None) -> None:
+    """Validate a Moxfield CSV; with `output`, write it again with the checked values."""
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader) if output else reader
+        for row in rows:
+            row["Name"], row["Edition"], row["Collector Number"] = cards.check(
+                row.get("Name") or "", (row.get("Edition") or "").lower(), row.get("Collector Number") or "")
+        fieldnames = reader.fieldnames or []
+    if output:
+        with open(output, "w", newline="", encoding="utf-8") as fout:
+            writer = csv.DictWriter(fout, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            writer.writerows(rows)
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Build or query the card name / printing index, or check a Moxfield CSV.")
+    p.add_argument("command", choices=["build", "lookup", "prefix", "check"])
+    p.add_argument("args", nargs="*",
+                   help="build: the Scryfall bulk-data JSON; lookup / prefix: card names; check: Moxfield CSV files")
+    p.add_argument("--index", default=default_index_file, help="Path to the compiled card index")
+    p.add_argument("--fix", action="store_true", help="check: apply the suggested corrections")
+    p.add_argument("-o", "--output", help="check: write the (corrected) CSV here; one input file only")
+    p.add_argument("--report", metavar="JSON_PATH", help="check: write the mismatches as JSON to JSON_PATH")
+    args = p.parse_args(argv)
+    if args.command == "build" and len(args.args) != 1:
+        p.error("build takes exactly one Scryfall bulk-data file")
+    if args.output and (args.command != "check" or len(args.args) != 1):
+        p.error("-o only works with check and a single input file")
+    return args
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    if args.command == "build":
+        try:
+            names, printings = build_index(args.args[0], args.index)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: could not build the card index from {args.args[0]}\n{e}", file=sys.stderr)
+            return 2
+        print(f"{names} card names, {printings} printings -> {args.index}")
+        return 0
+
+    index = load_card_index(None, args.index)
+    if args.command == "lookup":
+        for name in args.args:
+            print(f"{name}\t{index.name(name) or index.fuzzy(name) or ''}")
+        return 0
+    if args.command == "prefix":
+        for text in args.args:
+            for name in index.prefix(text):
+                print(f"{text}\t{name}")
+        return 0
+
+    cards = CardValidator(index, fix=args.fix)
+    for path in args.args:
+        try:
+            check_csv(path, cards, args.output)
+        except FileNotFoundError as e:
+            print(f"ERROR: input file not found: {e.filename}", file=sys.stderr)
+            return 2
+    print(f"{cards.rows} rows checked, {cards.flagged} do not match the card index, "
+          f"{cards.corrected} corrected", file=sys.stderr)
+    report_issues(cards)
+    if args.report:
+        cards.write(args.report)
+    # non-zero when something is left for the user to fix, so it can gate an upload
+    return 1 if cards.flagged > cards.corrected else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Card name normalization shared by the converters.
+
+Each source (ShinyApp, TCGPlayer, ...) has its own list of precompiled
+(pattern, replacement) rules. Results are memoized in a bounded LRU cache keyed
+on the raw product name, since the same names (basic lands, staples) repeat
+thousands of times in a single export.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Pattern, Tuple
+
+DEFAULT_CACHE_SIZE = 65536
+
+Rule = Tuple[Pattern, str]
+
+def _compile(rules: List[Tuple[str, str]]) -> List[Rule]:
+    return [(re.compile(pattern), repl) for pattern, repl in rules]
+
+# --- Rule sets -----------------------------------------------------------------
+SHINY_RULES: List[Rule] = _compile([
+    # remove trailing parenthesis;
+    # "Thornbite Staff (White Border)"
+    (r"\(.*\)", ""),
+    # remove trailing descriptors
+    # "Mountain - Full Art"
+    (r" - Full Art$", ""),
+    (r" - JP Full Art$", ""),
+    # catch some special cards with alternate names embedded
+    # Anguirus, Armored Killer - Gemrazer
+    # Godzilla, Doom Inevitable - Yidaro, Wandering Monster
+    # Godzilla, King of the Monsters - Zilortha, Strength Incarnate
+    # Godzilla, Primeval Champion - Titanoth Rex
+    (r"^.* - ", ""),
+])
+
+TCGPLAYER_RULES: List[Rule] = _compile([
+    # remove trailing parenthesis;
+    # " Youthful Valkyrie (Borderless) - [Foil]"
+    (r"\(.*\)", ""),
+    # remove trailing descriptors, including the "- [Foil]" marker
+    # " Plains (0282) - [Foil]"
+    (r" - .*$", ""),
+])
+
+# --- Normalizer ----------------------------------------------------------------
+class NameNormalizer:
+    """
+    Apply a rule set to raw product names, memoizing the results.
+
+    `clean(name)` is the cached entry point; hit/miss counters are available
+    from `stats()`.
+    """
+    def __init__(self, rules: List[Rule], maxsize: int = DEFAULT_CACHE_SIZE):
+        self.rules = rules
+        self.clean = lru_cache(maxsize=maxsize)(self._clean)
+
+    def _clean(self, name: str) -> str:
+        for pattern, repl in self.rules:
+            name = pattern.sub(repl, name)
+        return name.strip()
+
+    def stats(self) -> Dict[str, int]:
+        info = self.clean.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+    def clear(self) -> None:
+        self.clean.cache_clear()
+
+
+NORMALIZERS: Dict[str, NameNormalizer] = {
+    "shiny": NameNormalizer(SHINY_RULES),
+    "tcgplayer": NameNormalizer(TCGPLAYER_RULES),
+}
+
+def get_normalizer(source: str) -> NameNormalizer:
+    try:
+        return NORMALIZERS[source]
+    except KeyError:
+        raise ValueError(f"unknown card name source: {source!r} (expected one of {sorted(NORMALIZERS)})")
+
+def clean_name(name: str, source: str = "shiny") -> str:
+    return get_normalizer(source).clean(name)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Split a Moxfield CSV into import-sized chunks.
+
+Moxfield's collection importer struggles with very large files, so the output
+can be written as chunks bounded by row count and/or size in bytes, each with
+its own header row. Rows can be grouped (e.g. by edition): each group gets its
+own series of chunks. Full chunks are written in a thread pool while
+conversion continues.
+
+Given the base path moxfield-converted-collection.csv the files are:
+
+    moxfield-converted-collection-0001.csv            (no grouping)
+    moxfield-converted-collection-<group>-0001.csv    (grouped)
+    moxfield-converted-collection.manifest.json
+
+Group names are made file-name safe; when two groups end up with the same
+name ("Red Binder" and "Red/Binder"), the later one gets a short hash of its
+raw name appended, so every group writes its own files.
+
+The manifest lists every chunk with its group, row count, size and SHA-256, so
+an uploader can resume or import chunks in parallel. It is only written when
+the whole output was: a run that fails leaves no manifest (a manifest from an
+earlier run is removed, as its chunk files may have been replaced).
+
+USAGE:
+    ./chunked_output.py moxfield-converted-collection.csv --max-rows 5000
+    ./chunked_output.py moxfield-converted-collection.csv --max-bytes 2M --group-by Edition
+"""
+import io
+import os
+import re
+import sys
+import csv
+import json
+import hashlib
+import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+MANIFEST_VERSION = 1
+DEFAULT_WORKERS = 4
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+def parse_size(value: str) -> int:
+    """'500000', '512K', '2M', '1G' -> bytes."""
+    m = re.fullmatch(r"\s*(\d+)\s*([KMG]?)B?\s*", value.upper())
+    if not m:
+        raise ValueError(f"not a size: {value!r} (expected e.g. 500000, 512K or 2M)")
+    return int(m.group(1)) * _UNITS[m.group(2)]
+
+def _slug(group: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", group) or "ungrouped"
+
+def _group_hash(group: str, n: int = 0) -> str:
+    return hashlib.sha256(f"{n}:{group}".encode("utf-8")).hexdigest()[:8]
+
+def _write_chunk(path: str, data: bytes) -> str:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Chunk:
+    __slots__ = ("group", "index", "lines", "rows", "size")
+
+    def __init__(self, group: str, index: int, header: bytes):
+        self.group = group
+        self.index = index
+        self.lines = [header]
+        self.rows = 0
+        self.size = len(header)
+
+
+class ChunkedCsvWriter:
+    """
+    csv.writer-like sink that writes size-bounded chunk files and a manifest.
+
+    writerow(row, group="") takes a sequence of fields in `fieldnames` order.
+    A chunk is closed when adding a row would exceed max_rows or max_bytes
+    (header included); a single row larger than max_bytes gets a chunk of its
+    own. close() waits for all writes and writes the manifest; abort() (or an
+    exception in a `with` block) waits for them and writes none.
+    """
+    def __init__(self, path: str, fieldnames: Sequence[str], max_rows: Optional[int] = None,
+                 max_bytes: Optional[int] = None, group_by: Optional[str] = None,
+                 workers: int = DEFAULT_WORKERS, quoting: int = csv.QUOTE_ALL):
+        if max_rows is not None and max_rows < 1:
+            raise ValueError("max_rows must be at least 1")
+        self.path = path
+        self.stem = os.path.splitext(path)[0]
+        self.manifest_path = self.stem + ".manifest.json"
+        self.fieldnames = list(fieldnames)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.group_by = group_by
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, quoting=quoting)
+        self._header = self._encode(self.fieldnames)
+        self._open: Dict[str, _Chunk] = {}
+        self._counts: Dict[str, int] = {}
+        # group -> the name used in its chunk paths, unique per group
+        self._slugs: Dict[str, str] = {}
+        self._taken: Set[str] = set()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._inflight: List[Tuple[Dict[str, Any], Future]] = []
+        self._max_inflight = 2 * workers
+        self.chunks: List[Dict[str, Any]] = []
+        self.rows = 0
+
+    def __enter__(self) -> "ChunkedCsvWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if exc[0] is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def _encode(self, row: Sequence[str]) -> bytes:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._csv.writerow(row)
+        return self._buffer.getvalue().encode("utf-8")
+
+    def writerow(self, row: Sequence[str], group: str = "") -> None:
+        line = self._encode(row)
+        chunk = self._open.get(group)
+        if chunk is not None and chunk.rows and (
+                (self.max_rows is not None and chunk.rows >= self.max_rows)
+                or (self.max_bytes is not None and chunk.size + len(line) > self.max_bytes)):
+            self._seal(chunk)
+            chunk = None
+        if chunk is None:
+            index = self._counts[group] = self._counts.get(group, 0) + 1
+            chunk = self._open[group] = _Chunk(group, index, self._header)
+        chunk.lines.append(line)
+        chunk.rows += 1
+        chunk.size += len(line)
+        self.rows += 1
+
+    def writerows(self, rows) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def _group_slug(self, group: str) -> str:
+        slug = self._slugs.get(group)
+        if slug is None:
+            slug = _slug(group)
+            n = 0
+            while slug in self._taken:
+                slug = f"{_slug(group)}-{_group_hash(group, n)}"
+                n += 1
+            self._taken.add(slug)
+            self._slugs[group] = slug
+        return slug
+
+    def _chunk_path(self, chunk: _Chunk) -> str:
+        if self.group_by is None:
+            return f"{self.stem}-{chunk.index:04d}.csv"
+        return f"{self.stem}-{self._group_slug(chunk.group)}-{chunk.index:04d}.csv"
+
+    def _seal(self, chunk: _Chunk) -> None:
+        del self._open[chunk.group]
+        path = self._chunk_path(chunk)
+        entry = {"file": os.path.basename(path), "group": chunk.group if self.group_by else None,
+                 "index": chunk.index, "rows": chunk.rows, "bytes": chunk.size, "sha256": None}
+        self.chunks.append(entry)
+        # bound the memory held by chunks waiting to be written
+        while len(self._inflight) >= self._max_inflight:
+            self._finish_one()
+        self._inflight.append((entry, self._pool.submit(_write_chunk, path, b"".join(chunk.lines))))
+
+    def _finish_one(self) -> None:
+        entry, future = self._inflight.pop(0)
+        entry["sha256"] = future.result()
+
+    def close(self) -> Dict[str, Any]:
+        """Write the remaining chunks and the manifest; returns the manifest."""
+        if self._pool is None:
+            return self.manifest()
+        try:
+            for chunk in list(self._open.values()):
+                self._seal(chunk)
+            while self._inflight:
+                self._finish_one()
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+        manifest = self.manifest()
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        os.replace(tmp, self.manifest_path)
+        return manifest
+
+    def abort(self) -> None:
+        """Stop after a failed conversion: no more chunks, and no manifest."""
+        if self._pool is None:
+            return
+        self._open.clear()
+        self._inflight.clear()
+        self._pool.shutdown()
+        self._pool = None
+        try:
+            os.remove(self.manifest_path)
+        except FileNotFoundError:
+            pass
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "fields": self.fieldnames,
+            "max_rows": self.max_rows,
+            "max_bytes": self.max_bytes,
+            "group_by": self.group_by,
+            "total_rows": self.rows,
+            "chunks": sorted(self.chunks, key=lambda c: (c["group"] or "", c["index"])),
+        }
+
+
+def split_csv_file(path: str, max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                   group_by: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                   output: Optional[str] = None) -> Dict[str, Any]:
+    """Split an existing CSV, optionally grouped by one of its columns."""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{path}: empty file")
+        column = None
+        if group_by is not None:
+            if group_by not in header:
+                raise ValueError(f"{path}: no column named {group_by!r}")
+            column = header.index(group_by)
+        with ChunkedCsvWriter(output or path, header, max_rows, max_bytes, group_by, workers) as chunks:
+            for row in reader:
+                if not row:
+                    continue
+                if column is None:
+                    chunks.writerow(row)
+                else:
+                    chunks.writerow(row, row[column] if column < len(row) else "")
+    return chunks.manifest()
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Split a Moxfield CSV into size-bounded chunks with a manifest.")
+    p.add_argument("input", help="CSV file to split")
+    p.add_argument("-o", "--output", help="Base path for the chunks and manifest (default: the input path)")
+    p.add_argument("--max-rows", type=int, help="Maximum data rows per chunk")
+    p.add_argument("--max-bytes", type=parse_size, help="Maximum chunk size, header included (e.g. 512K, 2M)")
+    p.add_argument("--group-by", metavar="COLUMN", help="Write separate chunks per value of this column")
+    p.add_argument("-j", "--jobs", type=int, default=DEFAULT_WORKERS, help="Chunks to write at once")
+    args = p.parse_args(argv)
+    if args.max_rows is None and args.max_bytes is None and args.group_by is None:
+        p.error("give at least one of --max-rows, --max-bytes or --group-by")
+    return args
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    try:
+        manifest = split_csv_file(args.input, args.max_rows, args.max_bytes, args.group_by, args.jobs, args.output)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    print(f"{manifest['total_rows']} rows in {len(manifest['chunks'])} chunk(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Readers for collection exports from different apps.
+
+Every reader turns one CSV row of its format into the shared MoxfieldAppRow
+model. The format of a file is detected from its header row: each reader lists
+the columns it requires, and the most specific reader whose columns are all
+present wins.
+
+Supported formats:
+    shiny      ShinyApp collection export
+    tcgplayer  table copied from https://store.tcgplayer.com/collection
+    deckbox    Deckbox inventory export
+    manabox    ManaBox collection / binder export
+    archidekt  Archidekt collection export
+
+To add a format, subclass CollectionReader and register() it.
+"""
+import csv
+from abc import ABC, abstractmethod
+from typing import Dict, FrozenSet, Iterator, List, Optional, TextIO
+
+from card_names import get_normalizer
+from prices import purchase_price
+from set_index import SetResolver
+from shiny_to_moxfield import (MoxfieldAppRow, ShinyAppRow, _collector_number, _edition_code,
+                               _format_last_modified)
+
+_tcgplayer_normalizer = get_normalizer("tcgplayer")
+
+# Moxfield condition names: Mint, Near Mint, Lightly Played, Moderately Played,
+# Heavily Played, Damaged
+CONDITIONS: Dict[str, str] = {
+    "m": "Mint",
+    "mint": "Mint",
+    "nm": "Near Mint",
+    "near mint": "Near Mint",
+    "near_mint": "Near Mint",
+    "excellent": "Lightly Played",
+    "good": "Lightly Played",
+    "good (lightly played)": "Lightly Played",
+    "lp": "Lightly Played",
+    "light_played": "Lightly Played",
+    "lightly played": "Lightly Played",
+    "mp": "Moderately Played",
+    "played": "Moderately Played",
+    "moderately played": "Moderately Played",
+    "hp": "Heavily Played",
+    "heavily played": "Heavily Played",
+    "d": "Damaged",
+    "dmg": "Damaged",
+    "poor": "Damaged",
+    "damaged": "Damaged",
+}
+
+LANGUAGES: Dict[str, str] = {
+    "en": "English",
+    "de": "German",
+    "fr": "French",
+    "it": "Italian",
+    "es": "Spanish",
+    "pt": "Portuguese",
+    "ja": "Japanese",
+    "jp": "Japanese",
+    "ko": "Korean",
+    "kr": "Korean",
+    "ru": "Russian",
+    "zhs": "Chinese Simplified",
+    "cs": "Chinese Simplified",
+    "zht": "Chinese Traditional",
+    "ct": "Chinese Traditional",
+}
+
+def _condition(value: str) -> str:
+    value = (value or "").strip()
+    return CONDITIONS.get(value.lower(), value)
+
+def _language(value: str) -> str:
+    value = (value or "").strip()
+    if not value:
+        return "English"
+    return LANGUAGES.get(value.lower(), value)
+
+def _price(value: str, currency: str = "") -> str:
+    return purchase_price(value or "", currency)
+
+def _flag(value: str) -> bool:
+    return (value or "").strip().lower() in ("true", "yes", "1", "x")
+
+def _header(names: List[str]) -> List[str]:
+    """Column names as the readers match and look them up (exports pad some with spaces)."""
+    return [name.strip() for name in names]
+
+def _edition(code: str, set_name: str, sets: SetResolver) -> str:
+    """The export's own set code if it has one, else the resolved set name."""
+    code = (code or "").strip().lower()
+    if code:
+        return code
+    return _edition_code(set_name, sets).lower()
+
+
+# --- Readers -------------------------------------------------------------------
+class CollectionReader(ABC):
+    """
+    Base class: `required` columns identify the format, convert() maps one row.
+    With `ungrouped_deck`, rows without a group still go to a deck file
+    (deck_.txt), as shiny_to_moxfield.py writes them.
+    """
+    name = ""
+    required: FrozenSet[str] = frozenset()
+    ungrouped_deck = False
+
+    def matches(self, header: List[str]) -> bool:
+        return self.required.issubset(header)
+
+    @abstractmethod
+    def convert(self, row: Dict[str, str], sets: SetResolver) -> MoxfieldAppRow:
+        """Map one CSV row of this format."""
+
+    def rows(self, f: TextIO, sets: SetResolver) -> Iterator[MoxfieldAppRow]:
+        convert = self.convert
+        reader = csv.DictReader(f)
+        if reader.fieldnames is not None:
+            reader.fieldnames = _header(reader.fieldnames)
+        for row in reader:
+            yield convert(row, sets)
+
+
+class ShinyReader(CollectionReader):
+    name = "shiny"
+    required = frozenset(["product_name", "set_name", "quantity"])
+    ungrouped_deck = True
+
+    def convert(self, row, sets):
+        return MoxfieldAppRow.from_shiny(ShinyAppRow.from_csv_row(row), sets)
+
+
+class TCGPlayerReader(CollectionReader):
+    name = "tcgplayer"
+    required = frozenset(["Have", "Name", "Set"])
+
+    def convert(self, row, sets):
+        raw_name = row.get("Name") or ""
+        return MoxfieldAppRow(
+            count=row.get("Have") or "",
+            tradelist_count="",
+            name=_tcgplayer_normalizer.clean(raw_name),
+            edition=sets.resolve(row.get("Set") or "") or "",
+            condition="",
+            language="",
+            foil="TRUE" if "[foil]" in raw_name.lower() else "",
+            tags="",
+            last_modified="",
+            collector_number="",
+            alter="",
+            proxy="",
+            purchase_price="",
+            group_name="",
+        )
+
+
+class DeckboxReader(CollectionReader):
+    name = "deckbox"
+    required = frozenset(["Count", "Tradelist Count", "Name", "Edition", "Card Number"])
+
+    def convert(self, row, sets):
+        g = lambda k: row.get(k) or ""
+        return MoxfieldAppRow(
+            count=g("Count"),
+            tradelist_count=g("Tradelist Count"),
+            name=g("Name"),
+            edition=_edition(g("Edition Code"), g("Edition"), sets),
+            condition=_condition(g("Condition")),
+            language=_language(g("Language")),
+            foil="foil" if g("Foil").strip() else "",
+            tags=g("Tags"),
+            last_modified="",
+            collector_number=g("Card Number"),
+            alter="TRUE" if g("Altered Art").strip() else "",
+            proxy="",
+            purchase_price=_price(g("My Price")),
+            group_name="",
+        )
+
+
+class ManaBoxReader(CollectionReader):
+    name = "manabox"
+    required = frozenset(["Name", "Set code", "Set name", "Collector number", "Foil", "Quantity"])
+
+    def convert(self, row, sets):
+        g = lambda k: row.get(k) or ""
+        foil = g("Foil").strip().lower()
+        return MoxfieldAppRow(
+            count=g("Quantity"),
+            tradelist_count=g("Quantity"),
+            name=g("Name"),
+            edition=_edition(g("Set code"), g("Set name"), sets),
+            condition=_condition(g("Condition")),
+            language=_language(g("Language")),
+            foil=foil if foil in ("foil", "etched") else "",
+            tags="",
+            last_modified="",
+            collector_number=g("Collector number"),
+            alter="TRUE" if _flag(g("Altered")) else "",
+            proxy="",
+            purchase_price=_price(g("Purchase price"), g("Purchase price currency")),
+            group_name=g("Binder Name"),
+        )
+
+
+class ArchidektReader(CollectionReader):
+    name = "archidekt"
+    required = frozenset(["Quantity", "Name", "Finish", "Edition Code"])
+
+    def convert(self, row, sets):
+        g = lambda k: row.get(k) or ""
+        finish = g("Finish").strip().lower()
+        return MoxfieldAppRow(
+            count=g("Quantity"),
+            tradelist_count=g("Quantity"),
+            name=g("Name"),
+            edition=_edition(g("Edition Code"), g("Edition Name"), sets),
+            condition=_condition(g("Condition")),
+            language=_language(g("Language")),
+            foil=finish if finish in ("foil", "etched") else "",
+            tags=g("Tags"),
+            last_modified=_format_last_modified(g("Date Added")),
+            collector_number=_collector_number(g("Collector Number")),
+            alter="",
+            proxy="",
+            purchase_price=_price(g("Purchase Price")),
+            group_name="",
+        )
+
+
+# --- Registry ------------------------------------------------------------------
+READERS: Dict[str, CollectionReader] = {}
+
+def register(reader: CollectionReader) -> CollectionReader:
+    READERS[reader.name] = reader
+    return reader
+
+for _reader in (ShinyReader(), TCGPlayerReader(), DeckboxReader(), ManaBoxReader(), ArchidektReader()):
+    register(_reader)
+
+def detect_format(header: List[str]) -> Optional[CollectionReader]:
+    """The reader whose required columns are all in `header`, preferring the most specific."""
+    header = _header(header)
+    best = None
+    for reader in READERS.values():
+        if reader.matches(header) and (best is None or len(reader.required) > len(best.required)):
+            best = reader
+    return best
+
+def sniff_file(path: str) -> Optional[CollectionReader]:
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), None)
+    return detect_format(header) if header else None
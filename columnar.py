@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Column-at-a-time helpers for bulk conversions.
+
+A CSV is loaded into one list per needed column (regular files through a
+memory map, see csv_chunks.MappedCsv). Per-value work (name
+cleaning, set lookups, date formatting, flag detection) is done once per
+distinct value: the column is factorized into (uniques, codes), the function is
+applied to the uniques, and the result is gathered back by code.
+
+NumPy is used for the gather step when it is installed; otherwise everything
+is plain Python lists. It is only imported for the first large gather, so
+short runs don't pay for the import.
+"""
+import csv
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+_np = None  # numpy once imported, False if it is not installed
+
+def _numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # optional dependency
+            _np = False
+    return _np
+
+Column = List[str]
+
+
+def read_columns(rows: Iterable[List[str]], header: List[str], names: Sequence[str]) -> Tuple[Dict[str, Column], int]:
+    """
+    Load the named columns from csv.reader rows (after the header row).
+
+    Follows csv.DictReader semantics: blank lines are skipped, duplicate header
+    names keep the last position, and missing columns / short rows read as "".
+    Returns ({name: column}, row count).
+    """
+    width = len(header)
+    positions = {name: i for i, name in enumerate(header)}
+    wanted = [(name, positions.get(name, width)) for name in names]
+    columns: Dict[str, Column] = {name: [] for name in names}
+    appends = [(columns[name].append, pos) for name, pos in wanted]
+    padding = [""] * (width + 1)
+    count = 0
+    for row in rows:
+        if not row:
+            continue
+        if len(row) <= width:
+            row.extend(padding[len(row):])
+        else:
+            row = row[:width] + [""]
+        for append, pos in appends:
+            append(row[pos])
+        count += 1
+    return columns, count
+
+def read_csv_columns(f, names: Sequence[str]) -> Tuple[Dict[str, Column], int]:
+    """read_columns() for a CSV file; a regular file is read through a memory map."""
+    from csv_chunks import MappedCsv
+
+    mapped = MappedCsv.from_file(f)
+    if mapped is not None:
+        with mapped:
+            rows = list(mapped.rows(names))
+        if not rows:
+            return {name: [] for name in names}, 0
+        return {name: list(column) for name, column in zip(names, zip(*rows))}, len(rows)
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return {name: [] for name in names}, 0
+    return read_columns(reader, header, names)
+
+def factorize(column: Column) -> Tuple[List[str], List[int]]:
+    """Return (distinct values in first-seen order, code per row)."""
+    index: Dict[str, int] = {}
+    codes = []
+    append = codes.append
+    for value in column:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(index)
+        append(code)
+    return list(index), codes
+
+def take(values: List, codes: List[int]) -> List:
+    """values[code] for every code."""
+    np = _numpy() if len(codes) > 1024 else None
+    if np:
+        table = np.empty(len(values), dtype=object)
+        table[:] = values
+        return table[np.asarray(codes, dtype=np.intp)].tolist()
+    return [values[c] for c in codes]
+
+def map_unique(column: Column, fn: Callable[[str], object]) -> List:
+    """[fn(v) for v in column], calling fn once per distinct value."""
+    uniques, codes = factorize(column)
+    return take([fn(v) for v in uniques], codes)
+
+def value_counts(column: Column) -> Dict[str, int]:
+    """{value: number of rows holding it}."""
+    return dict(Counter(column))
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Long-running conversion server with warm caches.
+
+Callers that convert many small exports pay for interpreter startup, the set
+index load and cold name / set / date caches on every run of the scripts. The
+server loads all of that once and keeps it warm between requests.
+
+It speaks plain HTTP/1.1 (asyncio, no extra dependencies) on localhost or on
+a Unix socket:
+
+    POST /convert[?format=shiny|tcgplayer|deckbox|manabox|archidekt]
+         body: the export CSV. Returns the Moxfield CSV, streamed in chunks.
+         The format is detected from the header row when it is not given.
+         The trailers X-Unresolved-Sets and X-Unparseable-Dates give the
+         number of rows of this request whose set name did not resolve /
+         whose timestamp was copied as-is.
+    GET  /metrics   JSON: request counts and timings per endpoint / format,
+                    cache stats, set index reloads
+    GET  /health    "ok"
+
+Conversions run in a small thread pool, so several requests can be in flight
+and a slow client doesn't hold up the others. The set sources are polled for
+changes (mtg_sets.json, moxfield_set_codes.csv, the catalogue). A changed
+index is rebuilt in the background and then used by new requests. Requests
+already in flight finish with the old index. SIGINT / SIGTERM stop accepting
+connections and let running requests finish.
+
+USAGE:
+    ./conversion_server.py --port 8770
+    ./conversion_server.py --socket /tmp/mtg-convert.sock
+    curl --data-binary @ShinyExport.csv http://127.0.0.1:8770/convert
+    curl --unix-socket /tmp/mtg-convert.sock --data-binary @tcgplayer.csv 'http://localhost/convert?format=tcgplayer'
+"""
+import io
+import os
+import sys
+import csv
+import json
+import stat
+import time
+import signal
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from card_names import NORMALIZERS
+from collection_readers import READERS, CollectionReader, detect_format
+from convert_collection import write_collection, write_headers
+from deck_output import NullDeckExporter
+from set_index import (SetResolver, _source_stamp, catalogue_sources, default_index_file, default_set_codes_csv,
+                       default_sets_json, load_set_resolver)
+from shiny_to_moxfield import _dates
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8770
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_BODY = 64 * 1024 * 1024
+DEFAULT_RELOAD_INTERVAL = 2.0
+DEFAULT_IDLE_TIMEOUT = 30.0
+DEFAULT_SHUTDOWN_TIMEOUT = 10.0
+CHUNK_SIZE = 64 * 1024
+QUEUE_CHUNKS = 8  # chunks a conversion may run ahead of a slow client
+TIMING_WINDOW = 1000  # recent requests per endpoint kept for percentiles
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+# --- HTTP ----------------------------------------------------------------------
+async def read_request(reader: asyncio.StreamReader, max_body: int,
+                       writer: Optional[asyncio.StreamWriter] = None) -> Optional[Request]:
+    """
+    The next request on the connection; None when the client closed it. A
+    client that sent "Expect: 100-continue" is told to go on (through `writer`)
+    once the headers are accepted, before the body is read.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode("latin-1").split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    method, target, _ = parts
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    expect = headers.get("expect", "").lower()
+    if expect and expect != "100-continue":
+        raise HttpError(HTTPStatus.EXPECTATION_FAILED)
+
+    async def go_on() -> None:
+        if expect and writer is not None:
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        await go_on()
+        chunks, size = [], 0
+        while True:
+            n = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if n == 0:
+                await reader.readline()  # no trailers expected
+                break
+            size += n
+            if size > max_body:
+                raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            chunks.append(await reader.readexactly(n))
+            await reader.readline()
+        body = b"".join(chunks)
+    else:
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "bad Content-Length")
+        if length > max_body:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        if length:
+            await go_on()
+        body = await reader.readexactly(length) if length else b""
+    return Request(method, target, headers, body)
+
+def response_head(status: HTTPStatus, content_type: str, length: Optional[int] = None,
+                  keep_alive: bool = True, trailers: Sequence[str] = ()) -> bytes:
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}"]
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    if trailers:
+        lines.append(f"Trailer: {', '.join(trailers)}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class StreamSink:
+    """
+    File-like object the conversion thread writes to. Output is handed to the
+    event loop in CHUNK_SIZE pieces through a bounded queue, so a slow client
+    slows the conversion down instead of buffering the whole response.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue[Optional[bytes]]"):
+        self._loop = loop
+        self._queue = queue
+        self._parts: List[str] = []
+        self._size = 0
+        self.bytes = 0
+        self.cancelled = False
+
+    def write(self, s: str) -> int:
+        self._parts.append(s)
+        self._size += len(s)
+        if self._size >= CHUNK_SIZE:
+            self.flush()
+        return len(s)
+
+    def flush(self) -> None:
+        if self.cancelled:
+            raise ConnectionAbortedError("client went away")
+        if not self._parts:
+            return
+        data = "".join(self._parts).encode("utf-8")
+        self._parts = []
+        self._size = 0
+        self.bytes += len(data)
+        asyncio.run_coroutine_threadsafe(self._queue.put(data), self._loop).result()
+
+    def close(self) -> None:
+        """Signal the end of the output (also after an error); does not wait."""
+        asyncio.run_coroutine_threadsafe(self._queue.put(None), self._loop)
+
+# --- Metrics -------------------------------------------------------------------
+def _percentile(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Metrics:
+    """Request counters and timings per endpoint (e.g. "convert/shiny")."""
+    def __init__(self, window: int = TIMING_WINDOW):
+        self.started = time.time()
+        self.window = window
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+        self._recent: Dict[str, Deque[float]] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool, rows: int = 0,
+               bytes_in: int = 0, bytes_out: int = 0) -> None:
+        m = self.endpoints.get(endpoint)
+        if m is None:
+            m = self.endpoints[endpoint] = {"requests": 0, "errors": 0, "rows": 0, "bytes_in": 0,
+                                            "bytes_out": 0, "seconds": 0.0, "max_seconds": 0.0}
+            self._recent[endpoint] = deque(maxlen=self.window)
+        m["requests"] += 1
+        m["errors"] += 0 if ok else 1
+        m["rows"] += rows
+        m["bytes_in"] += bytes_in
+        m["bytes_out"] += bytes_out
+        m["seconds"] += seconds
+        m["max_seconds"] = max(m["max_seconds"], seconds)
+        self._recent[endpoint].append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        endpoints = {}
+        for name, m in sorted(self.endpoints.items()):
+            recent = sorted(self._recent[name])
+            endpoints[name] = dict(m, mean_seconds=m["seconds"] / m["requests"],
+                                   p50_seconds=_percentile(recent, 0.5), p95_seconds=_percentile(recent, 0.95))
+        return {"uptime_seconds": time.time() - self.started, "endpoints": endpoints}
+
+# --- Server --------------------------------------------------------------------
+class ConversionServer:
+    def __init__(self, sources: List[str], index_path: Optional[str], workers: int = DEFAULT_WORKERS,
+                 max_body: int = DEFAULT_MAX_BODY, reload_interval: float = DEFAULT_RELOAD_INTERVAL,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, quiet: bool = False):
+        self.sources = sources
+        self.index_path = index_path
+        self.max_body = max_body
+        self.reload_interval = reload_interval
+        self.idle_timeout = idle_timeout
+        self.quiet = quiet
+        self.sets: SetResolver = load_set_resolver(sources, index_path)
+        self.metrics = Metrics()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="convert")
+        self.reloads = 0
+        self.unresolved_rows = 0
+        self.unparseable_rows = 0
+        self.reload_errors = 0
+        self.last_reload_error: Optional[str] = None
+        self._failed_stamp = None
+        self._connections: Set[asyncio.Task] = set()
+        self._busy: Set[asyncio.Task] = set()
+        self._in_flight = 0
+
+    def log(self, message: str) -> None:
+        if not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    # --- connections -----------------------------------------------------------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader, self.max_body, writer), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    # the rest of the request can't be trusted; answer and hang up
+                    await self._send_error(writer, e, keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, ValueError):
+                    break
+                if request is None:
+                    break
+                self._busy.add(task)
+                try:
+                    keep_alive = await self.dispatch(request, writer)
+                finally:
+                    self._busy.discard(task)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def dispatch(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        """Handle one request; returns whether the connection can be reused."""
+        start = time.perf_counter()
+        endpoint = "other"
+        status, ok, rows, bytes_out = HTTPStatus.OK, True, 0, 0
+        keep_alive = request.keep_alive
+        try:
+            if request.path == "/convert" and request.method == "POST":
+                endpoint = "convert"
+                endpoint, rows, bytes_out = await self.convert(request, writer)
+            elif request.path == "/metrics" and request.method == "GET":
+                endpoint = "metrics"
+                bytes_out = await self._send(writer, json.dumps(self.metrics_snapshot(), indent=2) + "\n",
+                                             "application/json", keep_alive)
+            elif request.path == "/health" and request.method == "GET":
+                endpoint = "health"
+                bytes_out = await self._send(writer, "ok\n", "text/plain; charset=utf-8", keep_alive)
+            elif request.path in ("/convert", "/metrics", "/health"):
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+            else:
+                raise HttpError(HTTPStatus.NOT_FOUND)
+        except HttpError as e:
+            status, ok = e.status, False
+            await self._send_error(writer, e, keep_alive)
+        except ConnectionError:
+            status, ok, keep_alive = HTTPStatus.BAD_REQUEST, False, False
+        except Exception as e:  # conversion failed after the response started
+            status, ok, keep_alive = HTTPStatus.INTERNAL_SERVER_ERROR, False, False
+            self.log(f"ERROR: {request.method} {request.path}: {e!r}")
+        elapsed = time.perf_counter() - start
+        self.metrics.record(endpoint, elapsed, ok, rows, len(request.body), bytes_out)
+        self.log(f"{request.method} {request.path} {status.value} {rows} rows {elapsed * 1000:.1f} ms")
+        return keep_alive
+
+    async def _send(self, writer: asyncio.StreamWriter, text: str, content_type: str, keep_alive: bool) -> int:
+        body = text.encode("utf-8")
+        writer.write(response_head(HTTPStatus.OK, content_type, len(body), keep_alive) + body)
+        await writer.drain()
+        return len(body)
+
+    async def _send_error(self, writer: asyncio.StreamWriter, error: HttpError, keep_alive: bool) -> None:
+        body = f"{error.status.value} {error}\n".encode("utf-8")
+        writer.write(response_head(error.status, "text/plain; charset=utf-8", len(body), keep_alive) + body)
+        await writer.drain()
+
+    # --- conversion ------------------------------------------------------------
+    def _reader_for(self, request: Request, text: str) -> CollectionReader:
+        name = request.query.get("format")
+        if name:
+            reader = READERS.get(name)
+            if reader is None:
+                raise HttpError(HTTPStatus.BAD_REQUEST, f"unknown format {name!r} (expected one of {sorted(READERS)})")
+            return reader
+        header = next(csv.reader(io.StringIO(text.partition("\n")[0])), None)
+        reader = detect_format(header) if header else None
+        if reader is None:
+            raise HttpError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "unrecognized CSV header (pass ?format=...)")
+        return reader
+
+    async def convert(self, request: Request, writer: asyncio.StreamWriter) -> Tuple[str, int, int]:
+        try:
+            text = request.body.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "body is not UTF-8")
+        reader = self._reader_for(request, text)
+        # a reload swaps self.sets; this request keeps the index it started with,
+        # and counts its own unresolved set names
+        sets = self.sets.scoped()
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+        sink = StreamSink(loop, queue)
+
+        def run() -> Tuple[int, int]:
+            try:
+                with _dates.collecting() as dates:
+                    write_headers(sink, None)
+                    n = write_collection(reader.rows(io.StringIO(text, newline=""), sets), sink, None,
+                                         NullDeckExporter())
+                sink.flush()
+                return n, dates.unparseable_rows()
+            finally:
+                sink.close()
+
+        self._in_flight += 1
+        try:
+            future = loop.run_in_executor(self.pool, run)
+            writer.write(response_head(HTTPStatus.OK, "text/csv; charset=utf-8", keep_alive=request.keep_alive,
+                                       trailers=("X-Unresolved-Sets", "X-Unparseable-Dates")))
+            try:
+                while True:
+                    data = await queue.get()
+                    if data is None:
+                        break
+                    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    await writer.drain()
+            except BaseException:
+                # stop the conversion and let it finish without a reader
+                sink.cancelled = True
+                while await queue.get() is not None:
+                    pass
+                await asyncio.gather(future, return_exceptions=True)
+                raise
+            rows, unparseable = await future
+            unresolved = sum(sets.unresolved.values())
+            self.unresolved_rows += unresolved
+            self.unparseable_rows += unparseable
+            writer.write(b"0\r\nX-Unresolved-Sets: %d\r\nX-Unparseable-Dates: %d\r\n\r\n"
+                         % (unresolved, unparseable))
+            await writer.drain()
+        finally:
+            self._in_flight -= 1
+        return f"convert/{reader.name}", rows, sink.bytes
+
+    # --- set index reload ------------------------------------------------------
+    def _build_sets(self) -> SetResolver:
+        resolver = SetResolver.from_sources(self.sources)
+        if self.index_path:
+            try:
+                resolver.save(self.index_path)
+            except OSError:
+                pass  # read-only checkout; the server keeps the index in memory anyway
+        return resolver
+
+    async def watch_sources(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                stamp = _source_stamp(self.sources)
+            except OSError:
+                continue  # a source is being replaced; look again next time
+            if stamp == self.sets.stamp or stamp == self._failed_stamp:
+                continue
+            try:
+                sets = await loop.run_in_executor(None, self._build_sets)
+            except Exception as e:  # a bad source must not stop the watcher
+                self._failed_stamp = stamp
+                self.reload_errors += 1
+                self.last_reload_error = f"{type(e).__name__}: {e}"
+                self.log(f"ERROR: set index reload failed, keeping the current index\n{e!r}")
+                continue
+            self.sets = sets
+            self._failed_stamp = None
+            self.reloads += 1
+            self.log(f"reloaded the set index ({len(sets.keys)} set names)")
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        snapshot = self.metrics.snapshot()
+        snapshot["in_flight"] = self._in_flight
+        snapshot["caches"] = {f"clean_name/{name}": n.stats() for name, n in sorted(NORMALIZERS.items())}
+        snapshot["caches"]["set fuzzy match"] = self.sets.stats()
+        snapshot["caches"]["last_modified"] = _dates.stats()
+        snapshot["set_index"] = {
+            "sources": self.sources,
+            "set_names": len(self.sets.keys),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_reload_error": self.last_reload_error,
+            "unresolved_rows": self.unresolved_rows,
+        }
+        snapshot["unparseable_dates"] = self.unparseable_rows
+        return snapshot
+
+    # --- lifecycle -------------------------------------------------------------
+    async def serve(self, host: str, port: int, socket_path: Optional[str],
+                    shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT) -> None:
+        if socket_path:
+            if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                os.remove(socket_path)  # left over from a previous run
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            self.log(f"listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            self.log(f"listening on http://{host}:{port}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        watcher = asyncio.create_task(self.watch_sources())
+        try:
+            await stop.wait()
+        finally:
+            self.log("shutting down")
+            watcher.cancel()
+            server.close()
+            # idle keep-alive connections go now, running requests get to finish
+            for task in self._connections - self._busy:
+                task.cancel()
+            if self._busy:
+                await asyncio.wait(set(self._busy), timeout=shutdown_timeout)
+            for task in list(self._connections):
+                task.cancel()
+            await server.wait_closed()
+            self.pool.shutdown(wait=False)
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Serve collection conversions over HTTP with warm caches.")
+    p.add_argument("--host", default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    p.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    p.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS, help="Conversions to run at once")
+    p.add_argument("--max-body", type=int, default=DEFAULT_MAX_BODY, help="Largest accepted request body in bytes")
+    p.add_argument("--reload-interval", type=float, default=DEFAULT_RELOAD_INTERVAL,
+                   help="Seconds between checks of the set source files")
+    p.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                   help="Seconds to keep an idle keep-alive connection open")
+    p.add_argument("--sets", default=default_sets_json, help="Path to JSON file with { 'Set Name': 'setcode', ... }")
+    p.add_argument("--set-codes", default=default_set_codes_csv,
+                   help="Path to Moxfield set codes CSV, used before the other set sources")
+    p.add_argument("--catalogue", help="Path to a set catalogue from set_catalogue.py "
+                                       "(default: mtg_sets_catalogue.json if it exists)")
+    p.add_argument("--set-index", default=default_index_file, help="Path to the compiled set index cache")
+    p.add_argument("-q", "--quiet", action="store_true", help="Don't log requests")
+    args = p.parse_args(argv)
+    if args.workers < 1:
+        p.error("--workers must be at least 1")
+    return args
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    sources = [p for p in [args.set_codes] + catalogue_sources(args.catalogue) + [args.sets] if p]
+    server = ConversionServer(sources, args.set_index, workers=args.workers, max_body=args.max_body,
+                              reload_interval=args.reload_interval, idle_timeout=args.idle_timeout,
+                              quiet=args.quiet)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.socket))
+    except OSError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
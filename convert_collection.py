@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Convert collection exports of any supported format to one Moxfield CSV.
+
+The format of each input is detected from its header row (see
+collection_readers.py); inputs can be files or directories of *.csv files and
+can mix formats. All rows go through one write path into a single Moxfield
+CSV, simple TSV and deck_<group>.txt files (for formats that have groups,
+e.g. ShinyApp groups or ManaBox binders).
+
+With --out-dir, each input is converted on its own into OUT_DIR/<input name>/
+instead, in a pool of worker processes that share one loaded set index.
+--merged additionally writes one collection CSV with the counts of identical
+printings added up (see aggregate.py).
+
+--split-rows / --split-bytes / --split-by write each Moxfield CSV as import-
+sized chunks plus a manifest instead of one file (see chunked_output.py).
+
+--validate-cards / --fix-cards check every row against the card index built by
+card_index.py before it is written (see card_index.py).
+
+USAGE:
+    ./convert_collection.py exports/
+    ./convert_collection.py ShinyExport.csv tcgplayer.csv manabox.csv -o moxfield.csv
+    ./convert_collection.py --format deckbox inventory.csv
+    ./convert_collection.py 'exports/*.csv' --out-dir converted --merged converted/merged.csv -j 8
+    ./convert_collection.py exports/ --split-bytes 2M --split-by edition
+    ./convert_collection.py exports/ --fix-cards --card-data default-cards.json
+"""
+import os
+import sys
+import csv
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, TextIO, Tuple, Union
+
+from aggregate import DEFAULT_MAX_KEYS, Aggregator, Entry, Key
+from chunked_output import ChunkedCsvWriter, parse_size
+from collection_readers import READERS, CollectionReader, sniff_file
+from dates import report_unparseable
+from deck_output import DeckExporter, NullDeckExporter, DEFAULT_MAX_OPEN_FILES
+from set_index import (SetResolver, catalogue_sources, default_index_file, default_set_codes_csv,
+                       default_sets_json, load_set_resolver, report_unresolved)
+from shiny_to_moxfield import (MOXFIELD_FIELDS, SIMPLE_FIELDNAMES, MoxfieldAppRow, MoxfieldCsvRow, _dates,
+                               checked_rows, default_card_index_file, default_output_filename,
+                               default_simple_filename, finish_cards, load_cards)
+
+if TYPE_CHECKING:
+    from card_index import CardValidator  # imported when card validation is asked for
+
+# --- Inputs --------------------------------------------------------------------
+def expand_inputs(paths: List[str]) -> List[str]:
+    """
+    Files as given, directories expanded to their *.csv files and glob patterns
+    to the files they match (both sorted, not recursive).
+    """
+    files = []
+    for path in paths:
+        if not os.path.exists(path) and glob.has_magic(path):
+            files.extend(sorted(p for p in glob.glob(path) if os.path.isfile(p)))
+        elif os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(".csv") and os.path.isfile(os.path.join(path, name)))
+        else:
+            files.append(path)
+    return files
+
+def plan_inputs(files: List[str], forced: Optional[CollectionReader] = None
+                ) -> Tuple[List[Tuple[str, CollectionReader]], List[str]]:
+    """Pair each file with its reader; returns (plan, files whose format is unknown)."""
+    plan = []
+    unknown = []
+    for path in files:
+        reader = forced or sniff_file(path)
+        if reader is None:
+            unknown.append(path)
+        else:
+            plan.append((path, reader))
+    return plan, unknown
+
+# --- Output --------------------------------------------------------------------
+@dataclass(frozen=True)
+class SplitOptions:
+    max_rows: Optional[int] = None
+    max_bytes: Optional[int] = None
+    by: Optional[str] = None  # a key of SPLIT_BY
+
+# --split-by choice -> MoxfieldAppRow attribute
+SPLIT_BY = {
+    "edition": "edition",
+    "group": "group_name",
+}
+
+Output = Union[TextIO, ChunkedCsvWriter]
+
+def open_output(path: str, split: Optional[SplitOptions]) -> Output:
+    """A plain file, or a chunked writer (which writes its own headers) when splitting."""
+    if split is None:
+        return open(path, "w")
+    return ChunkedCsvWriter(path, MOXFIELD_FIELDS, split.max_rows, split.max_bytes, split.by)
+
+def write_collection(
+        rows: Iterable[MoxfieldAppRow],
+        fout: Output,
+        simple_fout: Optional[TextIO],
+        deck_writer: DeckExporter,
+        ungrouped_deck: bool = False,
+        ) -> int:
+    """
+    Write rows as plain tuples with csv.writer; returns the number of rows.
+    Rows without a group only go to a deck file with `ungrouped_deck`.
+    """
+    group_attr = None
+    if isinstance(fout, ChunkedCsvWriter):
+        write_row = fout.writerow
+        group_attr = SPLIT_BY.get(fout.group_by)
+    else:
+        write_row = csv.writer(fout, quoting=csv.QUOTE_ALL).writerow
+    write_simple = csv.writer(simple_fout, delimiter="\t").writerow if simple_fout is not None else None
+    add_deck = deck_writer.add_row
+    count = 0
+    for mox in rows:
+        row = MoxfieldCsvRow(
+            mox.count, mox.tradelist_count, mox.name, mox.edition, mox.condition, mox.language,
+            mox.foil, mox.tags, mox.last_modified, mox.collector_number, mox.alter, mox.proxy,
+            mox.proxy, mox.purchase_price)
+        if group_attr is None:
+            write_row(row)
+        else:
+            write_row(row, getattr(mox, group_attr))
+        if write_simple is not None:
+            write_simple((mox.count, mox.name, mox.proxy))
+        if mox.group_name or ungrouped_deck:
+            add_deck(mox)
+        count += 1
+    return count
+
+def write_headers(fout: Output, simple_fout: Optional[TextIO]) -> None:
+    if not isinstance(fout, ChunkedCsvWriter):
+        csv.writer(fout, quoting=csv.QUOTE_ALL).writerow(MOXFIELD_FIELDS)
+    if simple_fout is not None:
+        csv.writer(simple_fout, delimiter="\t").writerow(SIMPLE_FIELDNAMES)
+
+def convert_files(
+        plan: List[Tuple[str, CollectionReader]],
+        fout: Output,
+        sets: SetResolver,
+        simple_fout: Optional[TextIO],
+        deck_writer: DeckExporter,
+        cards: Optional["CardValidator"] = None,
+        ) -> List[Tuple[str, str, int]]:
+    """Convert every (path, reader) in one pass; returns [(path, format, rows)]."""
+    write_headers(fout, simple_fout)
+    counts = []
+    for path, reader in plan:
+        _dates.reset()  # each export has its own timestamp layout
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            n = write_collection(checked_rows(reader.rows(f, sets), cards), fout, simple_fout, deck_writer,
+                                 reader.ungrouped_deck)
+        counts.append((path, reader.name, n))
+    return counts
+
+# --- Batch mode ----------------------------------------------------------------
+def output_dirs(files: List[str], out_dir: str) -> List[str]:
+    """OUT_DIR/<input file name without extension>, made unique with -2, -3, ..."""
+    dirs = []
+    seen = set()
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0] or "input"
+        name, n = stem, 1
+        while name in seen:
+            n += 1
+            name = f"{stem}-{n}"
+        seen.add(name)
+        dirs.append(os.path.join(out_dir, name))
+    return dirs
+
+# the set index (and card validator) is handed to each worker once, not pickled
+# with every file
+_worker_sets: Optional[SetResolver] = None
+_worker_cards: Optional["CardValidator"] = None
+
+def _init_worker(sets: SetResolver, cards: Optional["CardValidator"] = None) -> None:
+    global _worker_sets, _worker_cards
+    _worker_sets = sets
+    _worker_cards = cards
+
+def convert_to_dir(
+        path: str,
+        reader_name: str,
+        out_dir: str,
+        output_name: str,
+        simple_name: str,
+        decks: bool,
+        merge: bool,
+        max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+        split: Optional[SplitOptions] = None,
+        ) -> Tuple[int, Optional[List[Tuple[Key, Entry]]], Dict[str, int], Any, Tuple[Dict[str, int], int]]:
+    """
+    Convert one input into out_dir (run in a worker). Returns (rows, rows
+    aggregated within this file or None, set names that did not resolve, card
+    validation counts or None, timestamps that did not parse).
+    """
+    sets = _worker_sets
+    _dates.reset()  # each export has its own timestamp layout
+    reader = READERS[reader_name]
+    os.makedirs(out_dir, exist_ok=True)
+    aggregator = Aggregator() if merge else None
+    simple_fout = open(os.path.join(out_dir, simple_name), "w") if simple_name else None
+    deck_writer_cls = DeckExporter if decks else NullDeckExporter
+    deck_writer = deck_writer_cls(sets, directory=out_dir, max_open_files=max_open_files)
+    try:
+        with deck_writer, open(path, "r", newline="", encoding="utf-8-sig") as f, \
+                open_output(os.path.join(out_dir, output_name), split) as fout:
+            write_headers(fout, simple_fout)
+            rows = checked_rows(reader.rows(f, sets), _worker_cards)
+            if aggregator is not None:
+                rows = aggregator.passthrough(rows)
+            n = write_collection(rows, fout, simple_fout, deck_writer, reader.ungrouped_deck)
+        partial = list(aggregator.entries()) if aggregator is not None else None
+    finally:
+        if simple_fout is not None:
+            simple_fout.close()
+        if aggregator is not None:
+            aggregator.close()
+    unresolved = dict(sets.unresolved)
+    sets.unresolved.clear()
+    card_counts = _worker_cards.take_counts() if _worker_cards is not None else None
+    return n, partial, unresolved, card_counts, _dates.take_unparseable()
+
+def convert_batch(
+        plan: List[Tuple[str, CollectionReader]],
+        out_dir: str,
+        sets: SetResolver,
+        jobs: int,
+        output_name: str = default_output_filename,
+        simple_name: str = default_simple_filename,
+        decks: bool = True,
+        merged_path: Optional[str] = None,
+        max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+        max_keys: int = DEFAULT_MAX_KEYS,
+        split: Optional[SplitOptions] = None,
+        cards: Optional["CardValidator"] = None,
+        ) -> List[Tuple[str, str, int]]:
+    """
+    Convert each input into its own directory under out_dir, `jobs` files at a
+    time, and optionally write the merged collection. Returns [(path, format, rows)].
+    """
+    dirs = output_dirs([path for path, _ in plan], out_dir)
+    tasks = [(path, reader.name, d, output_name, simple_name, decks, merged_path is not None, max_open_files,
+              split)
+             for (path, reader), d in zip(plan, dirs)]
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=_init_worker,
+                                 initargs=(sets, cards)) as pool:
+            results = list(pool.map(convert_to_dir, *zip(*tasks)))
+    else:
+        _init_worker(sets, cards)
+        results = [convert_to_dir(*task) for task in tasks]
+
+    for _, _, unresolved, card_counts, unparseable in results:
+        for name, count in unresolved.items():
+            sets.unresolved[name] = sets.unresolved.get(name, 0) + count
+        if card_counts is not None:
+            cards.add_counts(card_counts)
+        _dates.merge_unparseable(unparseable)
+    if merged_path is not None:
+        # partials are merged in input order, so the first occurrence of a card wins
+        with Aggregator(max_keys=max_keys) as aggregator, open_output(merged_path, split) as fout:
+            for _, partial, _, _, _ in results:
+                aggregator.add_entries(partial)
+            write_headers(fout, None)
+            write_collection(aggregator.rows(), fout, None, NullDeckExporter())
+    return [(path, reader.name, n) for (path, reader), (n, _, _, _, _) in zip(plan, results)]
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Convert collection exports (any supported format) to one Moxfield CSV.")
+    p.add_argument("inputs", nargs="+", help="Input CSV files or directories of CSV files")
+    p.add_argument("--format", choices=sorted(READERS), help="Skip detection and read every input as this format")
+    p.add_argument("-o", "--output", default=default_output_filename,
+                   help="Path to the Moxfield CSV to write (use '-' for stdout)")
+    p.add_argument("--simple-output", help=f"Path to the simple TSV (default: {default_simple_filename}; "
+                                           "use '' to skip it)")
+    p.add_argument("--decks", action=argparse.BooleanOptionalAction, default=None,
+                   help="Write deck_<group_name>.txt files (default: on, unless writing to stdout)")
+    p.add_argument("--sets", default=default_sets_json, help="Path to JSON file with { 'Set Name': 'setcode', ... }")
+    p.add_argument("--set-codes", default=default_set_codes_csv,
+                   help="Path to Moxfield set codes CSV, used before the other set sources")
+    p.add_argument("--catalogue",
+                   help="Set catalogue built by set_catalogue.py, used after --set-codes, before --sets "
+                        "(default: mtg_sets_catalogue.json, if it exists)")
+    p.add_argument("--set-index", default=default_index_file, help="Path to the compiled set index cache")
+    p.add_argument("--max-open-files", type=int, default=DEFAULT_MAX_OPEN_FILES,
+                   help="Maximum number of deck files kept open (or written) at once")
+    p.add_argument("--out-dir", help="Batch mode: convert each input separately into OUT_DIR/<input name>/ "
+                                     "(-o and --simple-output then name the files inside those directories)")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                   help="Batch mode: number of inputs to convert at once (default: CPU count)")
+    p.add_argument("--merged", metavar="CSV_PATH",
+                   help="Batch mode: also write one Moxfield CSV with the counts of identical printings added up")
+    p.add_argument("--aggregate-max-keys", type=int, default=DEFAULT_MAX_KEYS,
+                   help="Distinct printings to hold in memory for --merged before spilling to temporary files")
+    p.add_argument("--split-rows", type=int, metavar="N",
+                   help="Write the Moxfield CSV as chunks of at most N rows, plus a manifest")
+    p.add_argument("--split-bytes", type=parse_size, metavar="SIZE",
+                   help="Write the Moxfield CSV as chunks of at most SIZE bytes (e.g. 512K, 2M), plus a manifest")
+    p.add_argument("--split-by", choices=sorted(SPLIT_BY),
+                   help="Write separate chunks per edition or per group (ShinyApp group / ManaBox binder)")
+    p.add_argument("--validate-cards", action="store_true",
+                   help="Check every Name / Edition / Collector Number against the card index and report the "
+                        "rows Moxfield would not recognize (build the index with card_index.py, or use --card-data)")
+    p.add_argument("--fix-cards", action="store_true",
+                   help="Like --validate-cards, but replace mismatches with the suggested value when there is one")
+    p.add_argument("--card-data", metavar="SCRYFALL_JSON",
+                   help="Scryfall bulk-data file to (re)build the card index from when it is missing or out of date")
+    p.add_argument("--card-index", default=default_card_index_file, help="Path to the compiled card index")
+    p.add_argument("--validation-report", metavar="JSON_PATH",
+                   help="Write the card index mismatches as JSON to JSON_PATH (implies --validate-cards)")
+    args = p.parse_args(argv)
+    args.validate_cards = args.validate_cards or args.fix_cards or bool(args.validation_report)
+    args.split = None
+    if args.split_rows is not None or args.split_bytes is not None or args.split_by is not None:
+        if args.output == "-":
+            p.error("--split-* options write files; they cannot be combined with -o -")
+        if args.split_rows is not None and args.split_rows < 1:
+            p.error("--split-rows must be at least 1")
+        args.split = SplitOptions(args.split_rows, args.split_bytes, args.split_by)
+    if args.out_dir is None and args.merged:
+        p.error("--merged requires --out-dir")
+    if args.out_dir is not None and args.output == "-":
+        p.error("--out-dir writes files; it cannot be combined with -o -")
+    if args.jobs < 1:
+        p.error("--jobs must be at least 1")
+    streaming = args.output == "-"
+    if args.simple_output is None:
+        args.simple_output = "" if streaming else default_simple_filename
+    if args.decks is None:
+        args.decks = not streaming
+    return args
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    files = expand_inputs(args.inputs)
+    missing = [path for path in files if not os.path.isfile(path)]
+    if missing:
+        print(f"ERROR: input file not found: {missing[0]}", file=sys.stderr)
+        return 2
+    plan, unknown = plan_inputs(files, READERS[args.format] if args.format else None)
+    for path in unknown:
+        print(f"WARNING: skipped {path}: unrecognized header (use --format to force one)", file=sys.stderr)
+    if not plan:
+        print("ERROR: no convertible input files", file=sys.stderr)
+        return 2
+
+    sets = load_set_resolver([args.set_codes] + catalogue_sources(args.catalogue) + [args.sets],
+                             args.set_index, lazy=True)
+    cards = load_cards(args)
+    if args.out_dir is not None:
+        counts = convert_batch(plan, args.out_dir, sets, args.jobs,
+                               output_name=os.path.basename(args.output),
+                               simple_name=os.path.basename(args.simple_output),
+                               decks=args.decks, merged_path=args.merged,
+                               max_open_files=args.max_open_files, max_keys=args.aggregate_max_keys,
+                               split=args.split, cards=cards)
+        for path, fmt, n in counts:
+            print(f"{path}: {n} rows ({fmt})", file=sys.stderr)
+        finish_cards(cards, args.validation_report)
+        report_unresolved(sets)
+        report_unparseable(_dates)
+        return 0
+
+    fout = sys.stdout if args.output == "-" else open_output(args.output, args.split)
+    simple_fout = open(args.simple_output, "w") if args.simple_output else None
+    deck_writer_cls = DeckExporter if args.decks else NullDeckExporter
+    deck_writer = deck_writer_cls(sets, max_open_files=args.max_open_files)
+    try:
+        with deck_writer:
+            counts = convert_files(plan, fout, sets, simple_fout, deck_writer, cards)
+    except BaseException:
+        if isinstance(fout, ChunkedCsvWriter):
+            fout.abort()
+        raise
+    finally:
+        if simple_fout is not None:
+            simple_fout.close()
+        if fout is not sys.stdout:
+            fout.close()
+        else:
+            fout.flush()
+    for path, fmt, n in counts:
+        print(f"{path}: {n} rows ({fmt})", file=sys.stderr)
+    finish_cards(cards, args.validation_report)
+    report_unresolved(sets)
+    report_unparseable(_dates)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # downstream of a pipe went away (e.g. `| head`); don't print a traceback
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped CSV input: row-aligned byte ranges and column selection.
+
+MappedCsv maps the input file read-only, so nothing is read or decoded up
+front and worker processes that map the same file share the page cache. It
+can:
+
+  - split the data rows into byte ranges that start and end on row
+    boundaries (for parallel workers, each scanning its own range)
+  - yield only the named columns of the rows in a range, without building a
+    dict or a full field list per row
+  - hand a range to csv.DictReader as text (read_chunk_text)
+
+Quoted fields may contain newlines (and TCGPlayer quotes prices such as
+"$1,000.12"), so a boundary is the first newline after the target offset that
+is not inside a quoted field. Quote state is tracked by counting '"' bytes from
+the start of the data; escaped quotes ("") toggle twice and cancel out.
+
+Rows are read a block at a time: each block is decoded in one call and split
+into lines, and its pages are released again once it has been read. Lines without quotes or stray carriage returns are split on commas
+directly; anything else (quoted fields, multi-line records) goes through
+csv.reader, so the columns match what csv.DictReader would return.
+"""
+import io
+import os
+import re
+import csv
+import mmap
+import stat
+from operator import itemgetter
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+BLOCK_SIZE = 1 << 20
+_MADV_DONTNEED = getattr(mmap, "MADV_DONTNEED", None)  # Linux / BSD / macOS, Python 3.8+
+_QUOTE_OR_NEWLINE = re.compile(rb'["\n]')
+
+
+class MappedCsv:
+    """
+    A CSV file mapped read-only into memory. `header` is the first row and
+    `data_start` the offset of the first data row. Use as a context manager or
+    call close(); an empty file maps to no data.
+    """
+    def __init__(self, source: Union[str, int]):
+        """`source` is a path, or the file descriptor of an open regular file."""
+        fd = os.open(source, os.O_RDONLY) if isinstance(source, str) else source
+        try:
+            self.size = os.fstat(fd).st_size
+            self._map: Union[mmap.mmap, bytes] = (
+                mmap.mmap(fd, 0, access=mmap.ACCESS_READ) if self.size else b"")
+        finally:
+            if isinstance(source, str):
+                os.close(fd)
+        end = self._map.find(b"\n")
+        self.data_start = self.size if end < 0 else end + 1
+        self.header: List[str] = next(csv.reader([self._map[:self.data_start].decode("utf-8")]), [])
+
+    @classmethod
+    def from_file(cls, f) -> Optional["MappedCsv"]:
+        """Map an open file that is still at its start; None for stdin, pipes and other streams."""
+        try:
+            fd = f.fileno()
+            if f.tell() != 0 or not stat.S_ISREG(os.fstat(fd).st_mode):
+                return None
+        except (AttributeError, OSError, ValueError):
+            return None
+        return cls(fd)
+
+    def __enter__(self) -> "MappedCsv":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = b""
+
+    # --- ranges ----------------------------------------------------------------
+    def boundaries(self, parts: int) -> List[Tuple[int, int]]:
+        """
+        Up to `parts` (start, end) byte ranges covering every data row of the
+        file (the header row is excluded).
+        """
+        data, size = self._map, self.size
+        if self.data_start >= size:
+            return []
+        parts = max(1, parts)
+        targets = [self.data_start + (size - self.data_start) * i // parts for i in range(1, parts)]
+
+        starts = [self.data_start]
+        pos = self.data_start
+        in_quotes = False
+        for target in targets:
+            if target <= pos:
+                continue
+            # carry the quote state forward to the target offset
+            while pos < target:
+                end = min(pos + BLOCK_SIZE, target)
+                if data[pos:end].count(b'"') & 1:
+                    in_quotes = not in_quotes
+                self._release(pos, end)
+                pos = end
+            # then look for the next newline outside of quotes
+            boundary = None
+            while boundary is None and pos < size:
+                end = min(pos + BLOCK_SIZE, size)
+                for m in _QUOTE_OR_NEWLINE.finditer(data, pos, end):
+                    if m.group() == b'"':
+                        in_quotes = not in_quotes
+                    elif not in_quotes:
+                        boundary = m.end()
+                        break
+                pos = end
+            if boundary is None or boundary >= size:
+                break
+            pos = boundary
+            starts.append(pos)
+
+        ends = starts[1:] + [size]
+        return [(s, e) for s, e in zip(starts, ends) if e > s]
+
+    def text(self, start: int, end: int) -> io.StringIO:
+        """Decode the byte range [start, end) as a csv-ready text stream."""
+        return io.StringIO(self._map[start:end].decode("utf-8"), newline="")
+
+    # --- rows ------------------------------------------------------------------
+    def _blocks(self, start: int, end: int) -> Iterator[Tuple[List[str], str, bool]]:
+        """
+        The lines of [start, end), one decoded block at a time, with the line
+        separator used to split them ("\r\n" if the block has no other line
+        breaks, else "\n") and whether the lines may still contain a "\r".
+        """
+        data = self._map
+        pos = start
+        while pos < end:
+            stop = end
+            if end - pos > BLOCK_SIZE:
+                # blocks end after a newline, so no line or UTF-8 sequence is cut
+                cut = data.rfind(b"\n", pos, pos + BLOCK_SIZE)
+                if cut >= 0:
+                    stop = cut + 1
+            text = data[pos:stop].decode("utf-8")
+            newlines = text.count("\n")
+            sep = "\r\n" if newlines and text.count("\r") == newlines == text.count("\r\n") else "\n"
+            lines = text.split(sep)
+            if lines[-1] == "":
+                lines.pop()  # the block ended with a line break
+            yield lines, sep, sep == "\n" and "\r" in text
+            self._release(pos, stop)
+            pos = stop
+
+    def _release(self, start: int, end: int) -> None:
+        """
+        Drop the pages of [start, end) from this process (they stay in the page
+        cache), so resident memory doesn't grow with the size of the file.
+        """
+        if isinstance(self._map, mmap.mmap) and _MADV_DONTNEED is not None:
+            start -= start % mmap.PAGESIZE
+            end -= end % mmap.PAGESIZE
+            if end > start:
+                self._map.madvise(_MADV_DONTNEED, start, end - start)
+
+    def records(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[List[str]]:
+        """The non-blank rows of [start, end) (default: all data rows) as field lists."""
+        start = self.data_start if start is None else start
+        end = self.size if end is None else end
+        pending: List[str] = []  # lines (and separators) of an unfinished multi-line record
+        quotes = 0
+        for lines, sep, check_cr in self._blocks(start, end):
+            # with check_cr, a "\r" is either the end of a "\r\n" or a line break of its own
+            for line in lines:
+                if pending:
+                    pending.append(line)
+                    pending.append(sep)
+                    quotes += line.count('"')
+                    if not quotes & 1:
+                        yield from csv.reader(io.StringIO("".join(pending), newline=""))
+                        pending = []
+                    continue
+                if '"' in line:
+                    quotes = line.count('"')
+                    if quotes & 1:
+                        pending = [line, sep]
+                    elif check_cr and "\r" in line:
+                        yield from csv.reader(io.StringIO(line + sep, newline=""))
+                    else:
+                        yield next(csv.reader([line]))
+                    continue
+                if check_cr and "\r" in line:
+                    if line[-1] == "\r" and line.count("\r") == 1:
+                        line = line[:-1]
+                    else:
+                        yield from csv.reader(io.StringIO(line + sep, newline=""))
+                        continue
+                if line:
+                    yield line.split(",")
+        if pending:
+            yield from csv.reader(io.StringIO("".join(pending), newline=""))
+
+    def rows(self, names: Sequence[str], start: Optional[int] = None,
+             end: Optional[int] = None) -> Iterator[Tuple[str, ...]]:
+        """
+        The named columns of each row in [start, end), as tuples in `names` order.
+        Follows csv.DictReader semantics: blank lines are skipped, duplicate
+        header names keep the last position, and missing columns / short rows
+        read as "".
+        """
+        return select_columns(self.records(start, end), self.header, names)
+
+
+def select_columns(rows: Iterator[List[str]], header: List[str], names: Sequence[str]
+                   ) -> Iterator[Tuple[str, ...]]:
+    """The named columns of csv.reader-style rows (see MappedCsv.rows)."""
+    width = len(header)
+    positions = {name: i for i, name in enumerate(header)}
+    # position `width` is always padding
+    indexes = [positions.get(name, width) for name in names]
+    pick = itemgetter(*indexes)
+    if len(indexes) == 1:
+        pick = lambda row, get=pick: (get(row),)
+    padding = [""] * (width + 1)
+    # full-width rows can be picked from as they are, unless a column is missing
+    # from the header
+    full = -1 if width in indexes else width
+    for row in rows:
+        if len(row) != full:
+            if not row:
+                continue
+            if len(row) <= width:
+                row.extend(padding[len(row):])
+            else:
+                row = row[:width] + [""]
+        yield pick(row)
+
+
+def read_header(path: str) -> Tuple[List[str], int]:
+    """Return (fieldnames, offset of the first data row)."""
+    with MappedCsv(path) as data:
+        return data.header, data.data_start
+
+
+def find_row_boundaries(path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Return up to `parts` (start, end) byte ranges covering every data row of
+    the file (the header row is excluded).
+    """
+    with MappedCsv(path) as data:
+        return data.boundaries(parts)
+
+
+def read_chunk_text(path: str, start: int, end: int) -> io.StringIO:
+    """Decode the byte range [start, end) as a csv-ready text stream."""
+    with MappedCsv(path) as data:
+        return data.text(start, end)
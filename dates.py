@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Timestamp normalization for the Moxfield "Last Modified" column.
+
+Moxfield wants "YYYY-MM-DD HH:MM:SS.ffffff" (UTC, no offset). Exports almost
+always use one ISO 8601 layout for every row (ShinyApp: 2025-08-11T15:42:20.783),
+so the normalizer looks at a sample of the values once, picks the dominant
+layout and uses a fast formatter for it: one anchored regex plus string
+slicing, checking the same ranges datetime.fromisoformat does. Values in any
+other layout fall back to the generic parser, whose results are cached for
+repeated values. Values that cannot be parsed are passed through unchanged and
+counted, so the converters can report them (the first DEFAULT_UNPARSEABLE_LIMIT
+distinct values one by one, any others in one total, so a long-running process
+doesn't keep every bad value). collecting() also counts them per thread, e.g.
+for each request of the conversion server.
+"""
+import re
+import sys
+from _thread import get_ident
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CACHE_SIZE = 65536
+DEFAULT_SAMPLE_SIZE = 64
+DEFAULT_UNPARSEABLE_LIMIT = 1000
+
+Formatter = Callable[[str], Optional[str]]
+
+# --- Fast formatters -----------------------------------------------------------
+_valid_days: Dict[str, bool] = {}
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _valid_day(day: str) -> bool:
+    """YYYY-MM-DD (digits) is a real calendar day; the same check as date.fromisoformat."""
+    ok = _valid_days.get(day)
+    if ok is None:
+        year, month, mday = int(day[:4]), int(day[5:7]), int(day[8:10])
+        # strftime("%Y") does not zero-pad years before 1000; leave those to parse_generic
+        ok = year >= 1000 and 1 <= month <= 12 and mday >= 1
+        if ok:
+            leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+            ok = mday <= _DAYS_IN_MONTH[month - 1] + leap
+        if len(_valid_days) >= DEFAULT_CACHE_SIZE:
+            _valid_days.clear()
+        _valid_days[day] = ok
+    return ok
+
+def _iso_formatter(frac_digits: int, utc_suffix: bool) -> Formatter:
+    """
+    Formatter for YYYY-MM-DD<T or space>HH:MM:SS[.fff...][Z] with exactly
+    `frac_digits` fraction digits; returns None for any other value.
+    """
+    frac = rf"\.([0-9]{{{frac_digits}}})" if frac_digits else "()"
+    match = re.compile(rf"([0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}})[T ]((?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]){frac}"
+                       + ("Z" if utc_suffix else "")).fullmatch
+    padding = "0" * (6 - frac_digits)
+    valid_day = _valid_day
+
+    def fmt(s: str) -> Optional[str]:
+        m = match(s)
+        if m is None:
+            return None
+        day, time, fraction = m.groups()
+        if not valid_day(day):
+            return None
+        return f"{day} {time}.{fraction}{padding}"
+    return fmt
+
+# layout name -> (fraction digits, "Z" suffix); "Z" (UTC) needs no conversion
+FAST_LAYOUTS: Dict[str, Tuple[int, bool]] = {
+    "iso-ms": (3, False),
+    "iso-ms-utc": (3, True),
+    "iso-us": (6, False),
+    "iso-us-utc": (6, True),
+    "iso-s": (0, False),
+    "iso-s-utc": (0, True),
+}
+_fast_formatters: Dict[str, Formatter] = {}
+
+def fast_formatter(layout: str) -> Formatter:
+    """The formatter for a FAST_LAYOUTS layout, compiled on first use (not at import)."""
+    fmt = _fast_formatters.get(layout)
+    if fmt is None:
+        fmt = _fast_formatters[layout] = _iso_formatter(*FAST_LAYOUTS[layout])
+    return fmt
+
+def parse_generic(value: str) -> Optional[str]:
+    """Any layout datetime.fromisoformat accepts; offsets are converted to UTC."""
+    from datetime import datetime, timezone
+
+    s = value.strip()
+    try:
+        if s.endswith("Z"):
+            s = s[:-1] + "+00:00"
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+# --- Normalizer ----------------------------------------------------------------
+class DateNormalizer:
+    """
+    format(value) -> Moxfield timestamp, or the value unchanged if it can't be
+    parsed (counted in `unparseable`, or in `unparseable_other` once
+    `unparseable_limit` distinct values are counted). The dominant layout is
+    detected from the first `sample_size` distinct values unless detect() was
+    called.
+    """
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                 unparseable_limit: int = DEFAULT_UNPARSEABLE_LIMIT):
+        self.maxsize = maxsize
+        self.sample_size = sample_size
+        self.unparseable_limit = unparseable_limit
+        self.layout: Optional[str] = None
+        self._fast: Optional[Formatter] = None
+        self._sample: List[str] = []
+        self._cache: Dict[str, str] = {}
+        self.unparseable: Dict[str, int] = {}
+        self.unparseable_other = 0  # rows with values beyond unparseable_limit
+        self._collectors: Dict[int, "DateNormalizer"] = {}  # thread id -> collecting() counts
+        self.hits = 0
+        self.misses = 0
+
+    def detect(self, values: Iterable[str]) -> Optional[str]:
+        """Pick the layout that most of `values` match (e.g. once per input file)."""
+        counts: Dict[str, int] = {}
+        formatters = [(name, fast_formatter(name)) for name in FAST_LAYOUTS]
+        for value in values:
+            for name, fmt in formatters:
+                if value and fmt(value) is not None:
+                    counts[name] = counts.get(name, 0) + 1
+                    break
+        self.layout = max(counts, key=counts.get) if counts else None
+        self._fast = fast_formatter(self.layout) if self.layout else None
+        self._sample = []
+        return self.layout
+
+    def reset(self) -> None:
+        """Forget the detected layout (call between input files)."""
+        self.layout = None
+        self._fast = None
+        self._sample = []
+
+    def format(self, value: str) -> str:
+        fast = self._fast  # read once: another thread may be re-detecting
+        if fast is not None:
+            # the fast formatter is cheaper than a cache insert
+            result = fast(value)
+            if result is not None:
+                self.hits += 1
+                return result
+        result = self._cache.get(value)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        if not value:
+            return ""
+        if self.layout is None:
+            self._sample.append(value)
+            if len(self._sample) >= self.sample_size:
+                self.detect(self._sample)
+                fast = self._fast
+                if fast is not None:
+                    result = fast(value)
+        if result is None:
+            result = parse_generic(value)
+            if result is None:
+                # not cached, so every occurrence is counted
+                self.add_unparseable(value)
+                return value
+        if len(self._cache) >= self.maxsize:
+            self._cache.clear()
+        self._cache[value] = result
+        return result
+
+    def format_column(self, values: List[str]) -> List[str]:
+        """format() for a whole column: detects the layout from it, then converts each distinct value once."""
+        from columnar import factorize, take
+
+        uniques, codes = factorize(values)
+        self.hits += len(values) - len(uniques)  # repeats are converted once
+        self.detect(uniques[:self.sample_size])
+        fmt = self.format
+        results = [fmt(v) for v in uniques]
+        bad = {i for i, v in enumerate(uniques) if v and results[i] is v}
+        if bad:
+            # format() counted each distinct value once; count the rest of its rows
+            rows = dict.fromkeys(bad, -1)
+            for code in codes:
+                if code in rows:
+                    rows[code] += 1
+            for i, n in rows.items():
+                if n:
+                    self.add_unparseable(uniques[i], n)
+        return take(results, codes)
+
+    def add_unparseable(self, value: str, count: int = 1) -> None:
+        if value in self.unparseable or len(self.unparseable) < self.unparseable_limit:
+            self.unparseable[value] = self.unparseable.get(value, 0) + count
+        else:
+            self.unparseable_other += count
+        if self._collectors:
+            collector = self._collectors.get(get_ident())
+            if collector is not None:
+                collector.add_unparseable(value, count)
+
+    @contextmanager
+    def collecting(self) -> Iterator["DateNormalizer"]:
+        """
+        Yield a DateNormalizer whose unparseable counts are this thread's, from
+        here to the end of the block (they are counted here as well).
+        """
+        collector = DateNormalizer(maxsize=0, unparseable_limit=self.unparseable_limit)
+        self._collectors[get_ident()] = collector
+        try:
+            yield collector
+        finally:
+            del self._collectors[get_ident()]
+
+    def take_unparseable(self) -> Tuple[Dict[str, int], int]:
+        """(unparseable, unparseable_other), cleared here (e.g. to merge a worker's counts)."""
+        taken = self.unparseable, self.unparseable_other
+        self.unparseable = {}
+        self.unparseable_other = 0
+        return taken
+
+    def merge_unparseable(self, taken: Tuple[Dict[str, int], int]) -> None:
+        counts, other = taken
+        for value, count in counts.items():
+            self.add_unparseable(value, count)
+        self.unparseable_other += other
+
+    def unparseable_rows(self) -> int:
+        return sum(self.unparseable.values()) + self.unparseable_other
+
+    def stats(self) -> Dict[str, int]:
+        """hits: values answered by the detected layout or the cache; misses: values parsed."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+
+def report_unparseable(normalizer: DateNormalizer, file=sys.stderr, limit: int = 10) -> None:
+    total = normalizer.unparseable_rows()
+    if not total:
+        return
+    print(f"WARNING: {total} timestamp(s) could not be parsed and were copied as-is:", file=file)
+    for value, count in sorted(normalizer.unparseable.items())[:limit]:
+        print(f"  {value!r} ({count} rows)", file=file)
+    if len(normalizer.unparseable) > limit:
+        print(f"  ... {len(normalizer.unparseable) - limit} more", file=file)
+    if normalizer.unparseable_other:
+        print(f"  ... and {normalizer.unparseable_other} rows with other values", file=file)
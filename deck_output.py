@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+deck_*.txt output in Moxfield's deck list format.
+
+Each row with a group becomes a line in that group's deck file:
+
+    <count> <name> (<SET>) <collector number> *F*
+
+The set label is only written for editions that are known Moxfield set codes
+(anything else, e.g. an unresolved set name, would make the line unimportable),
+and the collector number only together with a set. Foils get *F*; etched foils
+get *E* (only readers whose input reports the finish, e.g. ManaBox and
+Archidekt, pass "etched" on; a Shiny foil is always a plain foil).
+
+DeckExporter adds up the counts of identical entries within a deck in memory.
+When more than `max_buffered_entries` entries are held, they are spilled to one
+temporary file per deck, through an LRU pool of at most `max_open_files` open
+handles, so memory stays bounded however large the export is. close() merges
+and sorts each deck on its own (its spilled entries plus those still in memory),
+writes its file once (spread over a few threads when there is a lot to write),
+and writes an index file (deck_index.json) that lists each deck with its card
+count. Leaving a `with` block on an exception writes nothing.
+"""
+import os
+import re
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aggregate import add_counts
+from set_index import SetResolver
+
+DEFAULT_MAX_OPEN_FILES = 64
+DEFAULT_MAX_BUFFERED_ENTRIES = 100_000
+PARALLEL_WRITE_BYTES = 256 * 1024  # less deck text than this is written faster without threads
+DEFAULT_INDEX_NAME = "deck_index.json"
+INDEX_VERSION = 1
+
+FINISH_MARKERS = {"etched": "*E*"}  # any other finish is a plain foil
+
+DeckEntry = Tuple[str, str, str, str]  # (name, set label, collector number, finish)
+
+def deck_filename(group_name: str) -> str:
+    filename = "deck_" + group_name + ".txt"
+    filename = re.sub(r"[^A-Za-z0-9._-]+", "_", filename)
+    return filename
+
+def deck_line(count: str, name: str, set_label: str = "", collector_number: str = "", finish: str = "") -> str:
+    parts = [count, name]
+    if set_label:
+        parts.append(f"({set_label})")
+        if collector_number:
+            parts.append(collector_number)
+    if finish:
+        parts.append(FINISH_MARKERS.get(finish, "*F*"))
+    return " ".join(parts)
+
+def _sort_key(item: Tuple[DeckEntry, str]) -> Tuple[Any, ...]:
+    (name, set_label, number, finish), _ = item
+    m = re.match(r"\d+", number)
+    return (name.lower(), name, set_label, int(m.group()) if m else -1, number, finish)
+
+def _card_count(count: str) -> int:
+    try:
+        return int(count)
+    except ValueError:
+        return 0
+
+def _render(deck: Dict[DeckEntry, str]) -> str:
+    entries = sorted(deck.items(), key=_sort_key)
+    return "".join(deck_line(count, *entry) + "\n" for entry, count in entries)
+
+def _write_file(path: str, text: str) -> None:
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class DeckExporter:
+    """
+    Collect deck entries and write each deck file once.
+
+    - add() / add_row() take one card; identical entries in a deck are merged
+    - set labels come from a per-edition mapping built with sets.is_known_code
+      (no labels without a SetResolver)
+    - at most `max_buffered_entries` entries are held in memory; then they are
+      spilled per deck, with at most `max_open_files` spill files open
+    - close() writes every deck file plus the index, at most `max_open_files`
+      at once; discard() (or an exception in a `with` block) writes nothing
+    - filenames are relative to `directory` (default: the current directory)
+    """
+    def __init__(self, sets: Optional[SetResolver] = None, directory: str = "",
+                 max_open_files: int = DEFAULT_MAX_OPEN_FILES, index_name: str = DEFAULT_INDEX_NAME,
+                 max_buffered_entries: int = DEFAULT_MAX_BUFFERED_ENTRIES, spill_dir: Optional[str] = None):
+        if max_open_files < 1:
+            raise ValueError("max_open_files must be at least 1")
+        if max_buffered_entries < 1:
+            raise ValueError("max_buffered_entries must be at least 1")
+        self.sets = sets
+        self.directory = directory
+        self.max_open_files = max_open_files
+        self.index_name = index_name
+        self.max_buffered_entries = max_buffered_entries
+        self.spill_dir = spill_dir
+        self._decks: Dict[str, Dict[DeckEntry, str]] = {}  # entries not spilled yet
+        self._buffered = 0
+        self._text_bytes = 0  # rough size of all deck files, to decide on threads
+        self._groups: Dict[str, str] = {}  # group name -> deck filename
+        self._labels: Dict[str, str] = {}  # edition -> set label ("" if not a known code)
+        self._tmpdir: Optional[str] = None
+        self._spilled: Set[str] = set()
+        self._handles: "OrderedDict[str, Any]" = OrderedDict()  # deck filename -> spill file
+        self._closed = False
+        # counters for benchmarking / profiling
+        self.opens = 0
+        self.writes = 0
+        self.spills = 0
+
+    def __enter__(self) -> "DeckExporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if exc[0] is not None:
+            self.discard()
+        else:
+            self.close()
+
+    def set_label(self, edition: str) -> str:
+        label = self._labels.get(edition)
+        if label is None:
+            known = self.sets is not None and self.sets.is_known_code(edition)
+            label = self._labels[edition] = edition.upper() if known else ""
+        return label
+
+    # --- input -----------------------------------------------------------------
+    def add(self, group_name: str, count: str, name: str, edition: str = "",
+            collector_number: str = "", finish: str = "") -> None:
+        filename = self._groups.get(group_name)
+        if filename is None:
+            filename = self._groups[group_name] = deck_filename(group_name)
+        deck = self._decks.get(filename)
+        if deck is None:
+            deck = self._decks[filename] = {}
+        key = (name, self.set_label(edition), collector_number, finish)
+        total = deck.get(key)
+        if total is not None:
+            deck[key] = add_counts(total, count)
+            return
+        deck[key] = count
+        self._text_bytes += len(name) + len(collector_number) + 16
+        self._buffered += 1
+        if self._buffered > self.max_buffered_entries:
+            self._spill()
+
+    def add_row(self, mox) -> None:
+        """add() for a MoxfieldAppRow."""
+        self.add(mox.group_name, mox.count, mox.name, mox.edition, mox.collector_number, mox.foil)
+
+    def filenames(self) -> List[str]:
+        return sorted(set(self._groups.values()))
+
+    # --- spilling --------------------------------------------------------------
+    def _spill_path(self, filename: str) -> str:
+        return os.path.join(self._tmpdir, filename + ".pickle")
+
+    def _spill_file(self, filename: str):
+        f = self._handles.get(filename)
+        if f is not None:
+            self._handles.move_to_end(filename)
+            return f
+        if len(self._handles) >= self.max_open_files:
+            _, oldest = self._handles.popitem(last=False)
+            oldest.close()
+        f = self._handles[filename] = open(self._spill_path(filename), "ab")
+        self.opens += 1
+        self._spilled.add(filename)
+        return f
+
+    def _spill(self) -> None:
+        """Append the entries held in memory to each deck's spill file."""
+        import pickle
+        import tempfile
+
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="mtg-decks-", dir=self.spill_dir)
+        for filename, deck in self._decks.items():
+            pickle.dump(list(deck.items()), self._spill_file(filename), protocol=pickle.HIGHEST_PROTOCOL)
+            self.writes += 1
+        self._decks = {}
+        self._buffered = 0
+        self.spills += 1
+
+    def _entries(self, filename: str) -> Dict[DeckEntry, str]:
+        """One deck's merged entries: spilled ones first, then those still in memory."""
+        deck: Dict[DeckEntry, str] = {}
+        parts = []
+        if filename in self._spilled:
+            import pickle
+
+            with open(self._spill_path(filename), "rb") as f:
+                while True:
+                    try:
+                        parts.append(pickle.load(f))
+                    except EOFError:
+                        break
+        parts.append(self._decks.get(filename, {}).items())
+        for items in parts:
+            for key, count in items:
+                total = deck.get(key)
+                deck[key] = count if total is None else add_counts(total, count)
+        return deck
+
+    # --- output ----------------------------------------------------------------
+    def render(self, filename: str) -> str:
+        """The deck file's contents: merged entries sorted by name, set and collector number."""
+        return _render(self._entries(filename))
+
+    def _finish_deck(self, filename: str, write: bool) -> Tuple[int, int]:
+        """Merge one deck, write its file if asked; returns (entries, cards)."""
+        deck = self._entries(filename)
+        if write:
+            _write_file(os.path.join(self.directory, filename), _render(deck))
+        return len(deck), sum(_card_count(count) for count in deck.values())
+
+    def write(self, only: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Write the deck files (only those in `only`, if given) and the index,
+        which always lists every deck. Returns the index.
+        """
+        self._close_handles()
+        filenames = self.filenames()
+        jobs = [(f, only is None or f in only) for f in filenames]
+        written = sum(write for _, write in jobs)
+        if written > 1 and self.max_open_files > 1 and self._text_bytes >= PARALLEL_WRITE_BYTES:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(self.max_open_files, written)) as pool:
+                stats = list(pool.map(lambda job: self._finish_deck(*job), jobs))
+        else:
+            stats = [self._finish_deck(*job) for job in jobs]
+        self.opens += written
+        self.writes += written
+
+        groups = {filename: group for group, filename in self._groups.items()}
+        decks = [{"file": filename, "group": groups[filename], "entries": entries, "cards": cards}
+                 for filename, (entries, cards) in zip(filenames, stats)]
+        index = {"version": INDEX_VERSION, "decks": decks, "total_cards": sum(d["cards"] for d in decks)}
+        if decks:
+            with open(os.path.join(self.directory, self.index_name), "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+        return index
+
+    def close(self, only: Optional[Set[str]] = None) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.write(only)
+        finally:
+            self._cleanup()
+
+    def discard(self) -> None:
+        """Drop everything collected without writing (e.g. after a failed conversion)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._cleanup()
+
+    def _close_handles(self) -> None:
+        for f in self._handles.values():
+            f.close()
+        self._handles.clear()
+
+    def _cleanup(self) -> None:
+        self._close_handles()
+        self._decks = {}
+        if self._tmpdir is not None:
+            import shutil
+
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+
+class NullDeckExporter(DeckExporter):
+    """Drop-in DeckExporter that writes nothing (deck output disabled)."""
+    def add(self, group_name: str, count: str, name: str, edition: str = "",
+            collector_number: str = "", finish: str = "") -> None:
+        pass
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+State store for incremental conversions.
+
+Keeps, per input row key (the Shiny `id`, with "#2", "#3", ... for rows that
+repeat an id), a hash of the raw input row and the converted output fields from
+the previous run. Rows whose hash did not change
+are reused as-is instead of being converted again, and the added / changed /
+removed keys tell the caller which outputs need rewriting.
+"""
+import os
+import json
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+STATE_VERSION = 1
+
+
+class StateFileError(ValueError):
+    """The state file can't be used (corrupt, or written by another version)."""
+
+
+def row_hash(values: Iterable[str]) -> str:
+    joined = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.blake2b(joined.encode("utf-8"), digest_size=16).hexdigest()
+
+@dataclass
+class Delta:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def summary(self) -> str:
+        return f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed"
+
+class ConversionState:
+    """
+    rows: {key: (row hash, converted fields)}, in input order.
+
+    `context` identifies whatever else the converted fields depend on (e.g. the
+    set index sources); rows saved under a different context are never reused,
+    so every surviving row is reconverted and reported as changed.
+    """
+    def __init__(self, rows: Dict[str, Tuple[str, List[str]]] = None, context: str = "",
+                 reusable: bool = True):
+        self.rows: Dict[str, Tuple[str, List[str]]] = rows if rows is not None else {}
+        self.context = context
+        self.reusable = reusable
+
+    @classmethod
+    def load(cls, path: str, context: str = "") -> "ConversionState":
+        """
+        Load a state file; a missing file is an empty state (first run).
+        Raises StateFileError if the file can't be used.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return cls(context=context)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise StateFileError(f"{path}: not a conversion state file ({e})")
+        if not isinstance(raw, dict) or raw.get("version") != STATE_VERSION:
+            raise StateFileError(f"{path}: not a version {STATE_VERSION} conversion state file")
+        try:
+            rows = {k: (v[0], v[1]) for k, v in raw["rows"].items()}
+        except (AttributeError, IndexError, KeyError, TypeError):
+            raise StateFileError(f"{path}: the stored rows are damaged")
+        if not all(isinstance(digest, str) and isinstance(fields, list) for digest, fields in rows.values()):
+            raise StateFileError(f"{path}: the stored rows are damaged")
+        return cls(rows, context, reusable=raw.get("context", "") == context)
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": STATE_VERSION, "context": self.context, "rows": self.rows},
+                      f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def get(self, key: str, digest: str):
+        """Return the stored fields for key if its row hash is unchanged, else None."""
+        prev = self.rows.get(key)
+        if self.reusable and prev is not None and prev[0] == digest:
+            return prev[1]
+        return None
+
+def diff(old: ConversionState, new: ConversionState) -> Delta:
+    delta = Delta()
+    for key, (digest, _) in new.rows.items():
+        prev = old.rows.get(key)
+        if prev is None:
+            delta.added.append(key)
+        elif prev[0] != digest or not old.reusable:
+            delta.changed.append(key)
+    delta.removed = [key for key in old.rows if key not in new.rows]
+    return delta
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for scraped pages.
+
+Layout under the cache directory:
+
+    objects/ab/abcdef...   raw page bytes, named by their SHA-256
+    parsed/<key>.json      parsed results, keyed by content hash + parser version
+    index.json             {url: {"sha256", "etag", "last_modified", "fetched_at"}}
+
+Refreshing a URL sends If-None-Match / If-Modified-Since from the last fetch,
+so an unchanged page costs a 304 and no re-parse. With offline=True the
+last snapshot is used without touching the network; when a fetch fails
+(HTTP error, no network) the last snapshot is used with a warning.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+DEFAULT_TIMEOUT = 30
+USER_AGENT = "mtg-scripts set scraper (https://github.com/tazzuu/mtg-scripts)"
+
+
+class PageCache:
+    def __init__(self, root: str):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()  # fetch() may be called from several threads
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "parsed"), exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index: Dict[str, Dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self.index = {}
+
+    # --- raw objects -----------------------------------------------------------
+    def _object_path(self, sha: str) -> str:
+        return os.path.join(self.root, "objects", sha[:2], sha)
+
+    def put(self, data: bytes) -> str:
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, data)
+        return sha
+
+    def get(self, sha: str) -> bytes:
+        with open(self._object_path(sha), "rb") as f:
+            return f.read()
+
+    def _save_index(self) -> None:
+        with self._lock:
+            _atomic_write(self.index_path, json.dumps(self.index, indent=2, sort_keys=True).encode("utf-8"))
+
+    def snapshot(self, url: str) -> Optional[str]:
+        """SHA-256 of the last stored snapshot of url, if any."""
+        entry = self.index.get(url)
+        if entry and os.path.exists(self._object_path(entry["sha256"])):
+            return entry["sha256"]
+        return None
+
+    def import_snapshot(self, url: str, data: bytes) -> str:
+        """Store a page saved elsewhere (e.g. an archived copy) as the snapshot for url."""
+        sha = self.put(data)
+        self.index[url] = {"sha256": sha, "etag": None, "last_modified": None,
+                           "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        self._save_index()
+        return sha
+
+    # --- fetching --------------------------------------------------------------
+    def fetch(self, url: str, offline: bool = False, timeout: float = DEFAULT_TIMEOUT) -> Tuple[bytes, str, bool]:
+        """
+        Return (page bytes, sha256, changed) where changed is False when the
+        content is the same as the previous snapshot.
+        """
+        previous = self.snapshot(url)
+        if offline:
+            if previous is None:
+                raise FileNotFoundError(f"no cached snapshot of {url}; run once without --offline "
+                                        "or pass --snapshot")
+            return self.get(previous), previous, False
+
+        headers = {"User-Agent": USER_AGENT}
+        entry = self.index.get(url, {}) if previous else {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            with urlopen(Request(url, headers=headers), timeout=timeout) as resp:
+                data = resp.read()
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+        except OSError as e:  # HTTPError, URLError (no network, DNS), timeouts
+            if isinstance(e, HTTPError) and e.code == 304 and previous is not None:
+                entry["fetched_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                self._save_index()
+                return self.get(previous), previous, False
+            if previous is None:
+                raise
+            print(f"WARNING: {url}: {e}; using the cached snapshot", file=sys.stderr)
+            return self.get(previous), previous, False
+
+        sha = self.put(data)
+        self.index[url] = {"sha256": sha, "etag": etag, "last_modified": last_modified,
+                           "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        self._save_index()
+        return data, sha, sha != previous
+
+    # --- parsed results --------------------------------------------------------
+    def _parsed_path(self, sha: str, parser_version: str) -> str:
+        return os.path.join(self.root, "parsed", f"{sha}-{parser_version}.json")
+
+    def load_parsed(self, sha: str, parser_version: str) -> Optional[Any]:
+        try:
+            with open(self._parsed_path(sha, parser_version), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_parsed(self, sha: str, parser_version: str, value: Any) -> None:
+        _atomic_write(self._parsed_path(sha, parser_version),
+                      json.dumps(value, indent=2, ensure_ascii=False).encode("utf-8"))
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
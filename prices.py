@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Money parsing and collection price analytics.
+
+Exports carry prices as text ("15.30", "$1,000.12", ".50", "1,50",
+"Unavailable"). parse_cents turns one into integer cents once (results are
+cached, since the same prices repeat throughout an export), so totals are exact
+and no floats are involved. format_money gives the Moxfield "Purchase Price"
+form ("15.30"); purchase_price leaves prices in other currencies than
+PURCHASE_CURRENCY blank rather than mixing currencies in one column.
+
+PriceAnalytics sees every input row once and keeps, in one pass:
+
+  - overall card count, value and paid totals
+  - the same totals per set, per group and per rarity
+  - the top-N rows by total value (a bounded min-heap)
+
+so memory depends on the number of sets / groups / rarities and N, not on the
+number of rows. Partial results (e.g. from worker processes) can be merged.
+report() returns the summary as a JSON-ready dict; amounts are in cents.
+"""
+import re
+import sys
+import json
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TOP_N = 20
+DEFAULT_CACHE_SIZE = 65536
+REPORT_VERSION = 1
+PURCHASE_CURRENCY = "USD"  # Moxfield reads Purchase Price in its default currency
+
+# --- Money ---------------------------------------------------------------------
+_MONEY = re.compile(r"\$?([0-9][0-9,]*)?(?:\.([0-9]*))?").fullmatch
+# one comma and two digits after it: "1,50" is 1.50, while "1,500" stays 1500
+_DECIMAL_COMMA = re.compile(r"\$?[0-9]+,[0-9]{2}").fullmatch
+_cents_cache: Dict[str, Optional[int]] = {}
+
+def parse_cents(value: str) -> Optional[int]:
+    """'15.30', '$1,000.12', '2.5', '.50', '1,50' -> cents; None for '' or anything that isn't a price."""
+    cents = _cents_cache.get(value, -1)
+    if cents != -1:
+        return cents
+    return _parse_cents(value)
+
+def _parse_cents(value: str) -> Optional[int]:
+    cents = None
+    s = value.strip() if value else ""
+    if _DECIMAL_COMMA(s):
+        s = s.replace(",", ".")
+    m = _MONEY(s) if s else None
+    if m is not None and (m.group(1) or m.group(2)):
+        whole, fraction = m.groups()
+        fraction = fraction or ""
+        cents = int((whole or "0").replace(",", "")) * 100 + int(fraction[:2].ljust(2, "0"))
+        if len(fraction) > 2 and fraction[2] >= "5":
+            cents += 1  # round half up
+    if len(_cents_cache) >= DEFAULT_CACHE_SIZE:
+        _cents_cache.clear()
+    _cents_cache[value] = cents
+    return cents
+
+def format_cents(cents: int) -> str:
+    return f"{cents // 100}.{cents % 100:02d}"
+
+def format_money(value: str) -> str:
+    """A price as Moxfield wants it ('1000.12'), or '' if it can't be parsed."""
+    cents = parse_cents(value)
+    return "" if cents is None else format_cents(cents)
+
+def is_purchase_currency(currency: str) -> bool:
+    """Whether a price in `currency` can go in Purchase Price (no currency given counts as yes)."""
+    currency = (currency or "").strip().upper()
+    return not currency or currency == PURCHASE_CURRENCY
+
+def purchase_price(value: str, currency: str = "") -> str:
+    """format_money() for Moxfield's Purchase Price; '' for a price in another currency (not converted)."""
+    return format_money(value) if is_purchase_currency(currency) else ""
+
+_quantities: Dict[str, int] = {}
+
+def _quantity(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if len(_quantities) < DEFAULT_CACHE_SIZE:
+        _quantities[value] = n
+    return n
+
+# --- Analytics -----------------------------------------------------------------
+Totals = List[int]  # [rows, cards, value cents, paid cents]
+Cell = Tuple[str, str, str]  # (set, group, rarity)
+TopEntry = Tuple[int, int, Tuple[str, ...]]  # (value cents, -row number, (name, set, group, rarity, quantity))
+
+def _add_totals(table: Dict[Any, Totals], key: Any, totals: Totals) -> None:
+    current = table.get(key)
+    if current is None:
+        table[key] = list(totals)
+    else:
+        for i in range(4):
+            current[i] += totals[i]
+
+
+class PriceAnalytics:
+    """
+    add() takes one input row's fields as text. The row's value is value_total,
+    or value_per_unit x quantity if there is no total (same for paid); rows
+    without a parseable value are counted in `unpriced` and add 0 to the totals.
+
+    Rows are summed per (set, group, rarity) cell; the per-set, per-group and
+    per-rarity tables are built from the cells when asked for.
+    """
+    def __init__(self, top_n: int = DEFAULT_TOP_N):
+        if top_n < 0:
+            raise ValueError("top_n must not be negative")
+        self.top_n = top_n
+        self.totals: Totals = [0, 0, 0, 0]
+        self._cells: Dict[Cell, Totals] = {}
+        self.currencies: Dict[str, int] = {}
+        self.unpriced = 0
+        self._top: List[TopEntry] = []
+
+    def add(self, name: str, set_name: str, group: str, rarity: str, quantity: str,
+            value_total: str = "", value_per_unit: str = "", paid_total: str = "",
+            paid_per_unit: str = "", currency: str = "") -> None:
+        cards = _quantities.get(quantity)
+        if cards is None:
+            cards = _quantity(quantity)
+        # parse_cents, with the cache lookup inlined
+        value = _cents_cache.get(value_total, -1)
+        if value == -1:
+            value = _parse_cents(value_total)
+        if value is None:
+            value = parse_cents(value_per_unit)
+            if value is not None:
+                value *= cards
+        paid = _cents_cache.get(paid_total, -1)
+        if paid == -1:
+            paid = _parse_cents(paid_total)
+        if paid is None:
+            paid = parse_cents(paid_per_unit)
+            paid = 0 if paid is None else paid * cards
+        if value is None:
+            self.unpriced += 1
+            value = 0
+        elif currency:
+            self.currencies[currency] = self.currencies.get(currency, 0) + 1
+
+        totals = self.totals
+        totals[0] += 1
+        totals[1] += cards
+        totals[2] += value
+        totals[3] += paid
+        cell = self._cells.get((set_name, group, rarity))
+        if cell is None:
+            self._cells[(set_name, group, rarity)] = [1, cards, value, paid]
+        else:
+            cell[0] += 1
+            cell[1] += cards
+            cell[2] += value
+            cell[3] += paid
+
+        top = self._top
+        if len(top) < self.top_n:
+            heapq.heappush(top, (value, -totals[0], (name, set_name, group, rarity, quantity)))
+        elif top and value > top[0][0]:
+            # on equal value the earlier row stays
+            heapq.heapreplace(top, (value, -totals[0], (name, set_name, group, rarity, quantity)))
+
+    def merge(self, other: "PriceAnalytics") -> None:
+        """Add another instance's results (rows from `other` count as coming after these)."""
+        offset = self.totals[0]
+        for i in range(4):
+            self.totals[i] += other.totals[i]
+        for cell, totals in other._cells.items():
+            _add_totals(self._cells, cell, totals)
+        for currency, count in other.currencies.items():
+            self.currencies[currency] = self.currencies.get(currency, 0) + count
+        self.unpriced += other.unpriced
+        for value, row, fields in other._top:
+            entry = (value, row - offset, fields)
+            if len(self._top) < self.top_n:
+                heapq.heappush(self._top, entry)
+            elif self._top and entry > self._top[0]:
+                heapq.heapreplace(self._top, entry)
+
+    def by(self, field: int) -> Dict[str, Totals]:
+        """Totals per set (field 0), group (1) or rarity (2)."""
+        table: Dict[str, Totals] = {}
+        for cell, totals in self._cells.items():
+            _add_totals(table, cell[field], totals)
+        return table
+
+    def top(self) -> List[Dict[str, Any]]:
+        rows = []
+        for value, _, (name, set_name, group, rarity, quantity) in sorted(self._top, reverse=True):
+            rows.append({"name": name, "set": set_name, "group": group, "rarity": rarity,
+                         "quantity": quantity, "value_cents": value})
+        return rows
+
+    def report(self) -> Dict[str, Any]:
+        def table(totals: Dict[str, Totals]) -> List[Dict[str, Any]]:
+            items = sorted(totals.items(), key=lambda item: (-item[1][2], item[0]))
+            return [{"key": key, "rows": rows, "cards": cards, "value_cents": value, "paid_cents": paid}
+                    for key, (rows, cards, value, paid) in items]
+
+        rows, cards, value, paid = self.totals
+        return {
+            "version": REPORT_VERSION,
+            "currencies": dict(sorted(self.currencies.items())),
+            "rows": rows,
+            "unpriced_rows": self.unpriced,
+            "cards": cards,
+            "value_cents": value,
+            "paid_cents": paid,
+            "by_set": table(self.by(0)),
+            "by_group": table(self.by(1)),
+            "by_rarity": table(self.by(2)),
+            "top": self.top(),
+        }
+
+    def write(self, path: str) -> Dict[str, Any]:
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        return report
+
+
+def print_summary(prices: PriceAnalytics, file=sys.stderr, limit: int = 5) -> None:
+    rows, cards, value, paid = prices.totals
+    currency = "/".join(sorted(prices.currencies)) or "?"
+    print(f"prices: {cards} cards in {rows} rows, value {format_cents(value)} {currency}, "
+          f"paid {format_cents(paid)} {currency}", file=file)
+    if prices.unpriced:
+        print(f"  {prices.unpriced} rows without a value", file=file)
+    if len(prices.currencies) > 1:
+        print(f"WARNING: totals add up amounts in different currencies ({currency})", file=file)
+    for entry in prices.top()[:limit]:
+        print(f"  {format_cents(entry['value_cents']):>10}  {entry['quantity']} x {entry['name']} ({entry['set']})",
+              file=file)
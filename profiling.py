@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-stage instrumentation for the converters.
+
+Nothing is patched unless profiling is enabled (--profile, or the MTG_PROFILE
+environment variable), so a normal run pays no overhead. When enabled, the
+converter swaps selected functions / methods for timing wrappers that record
+call counts and cumulative (inclusive) time, and registers cache counters.
+At the end of the run a summary table is printed to stderr and, optionally,
+written as JSON.
+
+MTG_PROFILE=1 enables the summary table; MTG_PROFILE=path.json also writes the
+JSON report to that path.
+"""
+import os
+import sys
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+ENV_VAR = "MTG_PROFILE"
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.output_path: Optional[str] = None
+        self.timings: Dict[str, List[float]] = {}  # name -> [calls, seconds]
+        self.caches: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._patched: List[tuple] = []
+        self._started = time.perf_counter()
+
+    def enable(self, output_path: Optional[str] = None) -> None:
+        self.enabled = True
+        self.output_path = output_path
+        self._started = time.perf_counter()
+
+    def enable_from_env(self) -> None:
+        value = os.environ.get(ENV_VAR, "")
+        if value and value != "0":
+            self.enable(None if value in ("1", "true", "yes") else value)
+
+    # --- recording ---------------------------------------------------------
+    def _slot(self, name: str) -> List[float]:
+        slot = self.timings.get(name)
+        if slot is None:
+            slot = self.timings[name] = [0, 0.0]
+        return slot
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        slot = self._slot(name)
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                slot[0] += 1
+                slot[1] += perf_counter() - start
+        timed.__wrapped__ = fn
+        return timed
+
+    def wrap_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Time each next() call of an iterable (e.g. a csv reader)."""
+        slot = self._slot(name)
+        perf_counter = time.perf_counter
+        it = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                slot[0] += 1
+                slot[1] += perf_counter() - start
+            yield item
+
+    def instrument(self, owner: Any, attr: str, name: Optional[str] = None) -> None:
+        """
+        Replace owner.attr (a module function, class method / classmethod, or
+        an instance's bound method) with a timing wrapper, until restore().
+        """
+        import inspect  # only needed once profiling is on
+
+        name = name or attr
+        static = inspect.getattr_static(owner, attr)
+        if isinstance(static, classmethod):
+            replacement = classmethod(self.wrap(name, static.__func__))
+        elif isinstance(static, staticmethod):
+            replacement = staticmethod(self.wrap(name, static.__func__))
+        else:
+            replacement = self.wrap(name, getattr(owner, attr))
+        had_own = not inspect.isclass(owner) and attr in getattr(owner, "__dict__", {})
+        self._patched.append((owner, attr, static, had_own))
+        setattr(owner, attr, replacement)
+
+    def add_cache(self, name: str, stats: Callable[[], Dict[str, int]]) -> None:
+        """Register a callable returning {"hits": n, "misses": m, ...}."""
+        self.caches[name] = stats
+
+    def restore(self) -> None:
+        import inspect
+
+        for owner, attr, original, had_own in reversed(self._patched):
+            if inspect.isclass(owner) or had_own:
+                setattr(owner, attr, original)
+            else:
+                delattr(owner, attr)  # was looked up from the class
+        self._patched = []
+
+    # --- reporting ---------------------------------------------------------
+    def report(self) -> Dict[str, Any]:
+        stages = {}
+        for name, (calls, seconds) in self.timings.items():
+            stages[name] = {
+                "calls": int(calls),
+                "seconds": seconds,
+                "mean_us": seconds / calls * 1e6 if calls else 0.0,
+            }
+        caches = {}
+        for name, stats in self.caches.items():
+            info = dict(stats())
+            lookups = info.get("hits", 0) + info.get("misses", 0)
+            info["hit_rate"] = info.get("hits", 0) / lookups if lookups else None
+            caches[name] = info
+        return {
+            "wall_seconds": time.perf_counter() - self._started,
+            "stages": stages,
+            "caches": caches,
+        }
+
+    def print_summary(self, report: Dict[str, Any], file=sys.stderr) -> None:
+        print(f"--- profile (wall {report['wall_seconds']:.3f}s, inclusive times) ---", file=file)
+        print(f"{'stage':<28}{'calls':>12}{'total s':>12}{'mean us':>12}", file=file)
+        for name, s in sorted(report["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+            print(f"{name:<28}{s['calls']:>12,}{s['seconds']:>12.3f}{s['mean_us']:>12.2f}", file=file)
+        for name, c in report["caches"].items():
+            rate = "n/a" if c["hit_rate"] is None else f"{c['hit_rate']:.1%}"
+            print(f"cache {name}: {c.get('hits', 0):,} hits / {c.get('misses', 0):,} misses ({rate})", file=file)
+
+    def finish(self) -> None:
+        """Print the summary and write the JSON report, if profiling is enabled."""
+        if not self.enabled:
+            return
+        report = self.report()
+        self.print_summary(report)
+        if self.output_path:
+            with open(self.output_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        self.restore()
+
+
+PROFILER = Profiler()
@@ -0,0 +1 @@
+scrape_set_names.py
\ No newline at end of file
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# ChatGPT 5
+import os
+import sys
+import re
+import argparse
+from html.parser import HTMLParser
+from urllib.request import urlopen
+import json
+
+from page_cache import DEFAULT_TIMEOUT, PageCache
+
+# get the MTG Set Names and their three-letter codes from Wikipedia
+# alternate URL; https://web.archive.org/web/20250812090737/https://en.wikipedia.org/wiki/List_of_Magic:_The_Gathering_sets
+
+# SEE ALSO: https://gatherer.wizards.com/sets -> maybe there is an API we can get the list from here instead
+# SEE ALSO: https://scryfall.com/docs/api/sets -> maybe easier to get the set ID's from here instead
+
+WIKI_URL = "https://en.wikipedia.org/wiki/List_of_Magic:_The_Gathering_sets"
+
+this_file_path = os.path.realpath(__file__)
+this_dir_path = os.path.dirname(this_file_path)
+default_cache_dir = os.path.join(this_dir_path, ".scrape_cache")
+# bump when build_set_mapping output changes, so cached parses are redone
+PARSER_VERSION = "2"
+
+# --- streaming set table scraper (stdlib only) --------------------------------
+_FOOTNOTES = re.compile(r"\[[^\]]*\]")
+_SPACES = re.compile(r"\s+")
+
+def clean_cell(text):
+    # drop refs/footnotes like [VI], [ 123 ] and collapse whitespace
+    return _SPACES.sub(" ", _FOOTNOTES.sub("", text)).strip()
+
+def find_set_columns(header_cells):
+    """
+    Return (set_idx, code_idx) for a header row, or (None, None) when the
+    table is not a set table. We need a "Set" column and either "Set code" or
+    "Expansion code".
+    """
+    set_idx = None
+    code_idx = None
+    for i, h in enumerate(h.lower() for h in header_cells):
+        if h == "set":
+            set_idx = i
+        if "set code" in h or "expansion code" in h or h == "code":
+            code_idx = i
+    if set_idx is None or code_idx is None:
+        return None, None
+    return set_idx, code_idx
+
+def clean_set_code(code):
+    """Return the normalized set code, or None if it does not look like one."""
+    # clean code (avoid "none", punctuation, oddities)
+    code_clean = code.strip()
+    if code_clean.lower() == "none":
+        return None
+    code_clean = re.sub(r"[^A-Za-z0-9]", "", code_clean)
+    # Wikipedia sometimes lists weird entries; keep plausible 2–5 char codes
+    if not (2 <= len(code_clean) <= 5):
+        return None
+    return code_clean
+
+
+class _TableState:
+    __slots__ = ("set_idx", "code_idx", "header_seen", "skip", "spans",
+                 "row", "row_has_th", "col", "cell", "cell_tag", "cell_span")
+
+    def __init__(self):
+        self.set_idx = None
+        self.code_idx = None
+        self.header_seen = False
+        self.skip = False       # not a set table: stop collecting cell text
+        self.spans = {}         # column -> [rows left, text] from rowspan cells
+        self.row = None         # {column: text} for the open <tr>
+        self.row_has_th = False
+        self.col = 0
+        self.cell = None        # text parts of the open <td>/<th>
+        self.cell_tag = None
+        self.cell_span = (1, 1)
+
+
+class SetTableExtractor(HTMLParser):
+    """
+    Streaming scraper for set tables.
+
+    The header row (first row with a <th>) is checked as soon as it closes;
+    tables without "Set" and "Set code" / "Expansion code" columns are skipped
+    without buffering their cells. For set tables, each data row is turned
+    into a (set name, code) pair as soon as it closes, and passed to `emit`.
+    rowspan / colspan are expanded so columns line up across rows. Nested
+    tables are handled with a stack.
+
+    Feed it the page in chunks of any size with feed() and close() at the end.
+    """
+    def __init__(self, emit):
+        super().__init__()
+        self.emit = emit
+        self._tables = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._tables.append(_TableState())
+            return
+        if not self._tables:
+            return
+        t = self._tables[-1]
+        if t.skip:
+            return
+        if tag == "tr":
+            self._end_row(t)
+            t.row = {}
+            t.row_has_th = False
+            t.col = 0
+        elif tag in ("td", "th"):
+            if t.row is None:
+                return
+            self._end_cell(t)
+            attrs = dict(attrs)
+            t.cell = []
+            t.cell_tag = tag
+            t.cell_span = (_span(attrs.get("rowspan")), _span(attrs.get("colspan")))
+            if tag == "th":
+                t.row_has_th = True
+        elif tag == "br" and t.cell is not None:
+            t.cell.append(" ")
+
+    def handle_startendtag(self, tag, attrs):
+        # keep self-closing tags minimal (e.g., <br/>)
+        if tag == "br" and self._tables and self._tables[-1].cell is not None:
+            self._tables[-1].cell.append(" ")
+
+    def handle_endtag(self, tag):
+        if not self._tables:
+            return
+        t = self._tables[-1]
+        if tag == "table":
+            self._end_row(t)
+            self._tables.pop()
+        elif t.skip:
+            return
+        elif tag in ("td", "th"):
+            self._end_cell(t)
+        elif tag == "tr":
+            self._end_row(t)
+
+    def handle_data(self, data):
+        if self._tables:
+            cell = self._tables[-1].cell
+            if cell is not None:
+                cell.append(data)
+
+    # --- row assembly ----------------------------------------------------------
+    def _fill_spans(self, t):
+        # place cells carried down by rowspan from earlier rows
+        while t.col in t.spans:
+            t.row[t.col] = t.spans[t.col][1]
+            t.col += 1
+
+    def _end_cell(self, t):
+        if t.cell is None:
+            return
+        text = clean_cell("".join(t.cell))
+        t.cell = None
+        self._fill_spans(t)
+        rowspan, colspan = t.cell_span
+        for _ in range(colspan):
+            t.row[t.col] = text
+            if rowspan > 1:
+                t.spans[t.col] = [rowspan, text]  # decremented when this row ends
+            t.col += 1
+
+    def _end_row(self, t):
+        if t.row is None or t.skip:
+            return
+        self._end_cell(t)
+        # trailing cells carried down from previous rows
+        if t.spans:
+            for col in sorted(t.spans):
+                t.row.setdefault(col, t.spans[col][1])
+        row, has_th = t.row, t.row_has_th
+        t.row = None
+        for col in list(t.spans):
+            t.spans[col][0] -= 1
+            if t.spans[col][0] <= 0:
+                del t.spans[col]
+        if not row:
+            return
+
+        if not t.header_seen:
+            if not has_th:
+                return  # rows before the header row are ignored
+            t.header_seen = True
+            width = max(row) + 1
+            t.set_idx, t.code_idx = find_set_columns([row.get(i, "") for i in range(width)])
+            if t.set_idx is None:
+                t.skip = True  # not a table we want
+                t.spans.clear()
+            return
+        if has_th:
+            return  # skip secondary header rows
+
+        set_name = row.get(t.set_idx)
+        code = row.get(t.code_idx)
+        if not set_name or not code:
+            return
+        code_clean = clean_set_code(code)
+        if code_clean is None:
+            return
+        # Avoid table sections that aren't actual set names (like "Deck Builder's Toolkit")
+        # still, user might want those; we keep them if code looks valid.
+        self.emit(set_name, code_clean)
+
+
+def _span(value):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+def iter_set_pairs(chunks):
+    """Yield (set name, code) pairs while feeding an iterable of HTML text chunks."""
+    pending = []
+    parser = SetTableExtractor(lambda name, code: pending.append((name, code)))
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from pending
+        pending.clear()
+    parser.close()
+    yield from pending
+
+
+def read_chunks(path, size=1 << 16):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def fetch_html(url, timeout=DEFAULT_TIMEOUT):
+    with urlopen(url, timeout=timeout) as resp:
+        return resp.read().decode("utf-8", errors="ignore")
+
+
+def build_set_mapping(html=None):
+    """
+    Scrape Wikipedia for all tables that contain either:
+      - headers: ["Set", "...", "Set code"] OR
+      - headers: ["Set", "...", "Expansion code"]
+    and return dict: {Set Name -> Set Code}
+    """
+    if html is None:
+        html = fetch_html(WIKI_URL)
+    return dict(iter_set_pairs([html]))
+
+
+def cached_set_mapping(cache, url=WIKI_URL, offline=False, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetch url through the page cache (conditional request, or the stored
+    snapshot when offline) and only re-parse when the page content changed.
+    """
+    data, sha, _ = cache.fetch(url, offline=offline, timeout=timeout)
+    mapping = cache.load_parsed(sha, PARSER_VERSION)
+    if mapping is None:
+        mapping = build_set_mapping(data.decode("utf-8", errors="ignore"))
+        cache.save_parsed(sha, PARSER_VERSION, mapping)
+    return mapping
+
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv):
+    p = argparse.ArgumentParser(description="Scrape MTG set names and codes from Wikipedia as JSON.")
+    p.add_argument("--url", default=WIKI_URL, help="Page to scrape")
+    p.add_argument("--cache-dir", default=default_cache_dir,
+                   help="Directory for page snapshots and parsed results")
+    p.add_argument("--no-cache", action="store_true", help="Always download and parse, store nothing")
+    p.add_argument("--offline", action="store_true", help="Use the cached snapshot, no network access")
+    p.add_argument("--snapshot", metavar="HTML_FILE",
+                   help="Use a saved copy of the page (stored in the cache as the snapshot for --url)")
+    p.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Network timeout in seconds")
+    p.add_argument("--html", nargs="+", metavar="HTML_FILE",
+                   help="Scrape saved pages (e.g. web.archive.org snapshots) in a single streaming pass "
+                        "instead of fetching; later files win on duplicate set names")
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.html:
+        set_name_to_code = {}
+        for path in args.html:
+            set_name_to_code.update(iter_set_pairs(read_chunks(path)))
+        print(json.dumps(set_name_to_code, indent=4))
+        return 0
+    if args.no_cache:
+        if args.snapshot:
+            with open(args.snapshot, "r", encoding="utf-8", errors="ignore") as f:
+                html = f.read()
+        else:
+            try:
+                html = fetch_html(args.url, timeout=args.timeout)
+            except OSError as e:  # urllib's HTTPError / URLError, timeouts
+                print(f"ERROR: could not fetch {args.url}: {e}", file=sys.stderr)
+                return 2
+        set_name_to_code = build_set_mapping(html)
+    else:
+        cache = PageCache(args.cache_dir)
+        if args.snapshot:
+            with open(args.snapshot, "rb") as f:
+                cache.import_snapshot(args.url, f.read())
+        try:
+            set_name_to_code = cached_set_mapping(cache, args.url, offline=args.offline or bool(args.snapshot),
+                                                  timeout=args.timeout)
+        except FileNotFoundError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+        except OSError as e:  # the fetch failed and there is no cached snapshot
+            print(f"ERROR: could not fetch {args.url}: {e}", file=sys.stderr)
+            return 2
+    print(json.dumps(set_name_to_code, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
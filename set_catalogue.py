@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Build one set catalogue from several set sources at once.
+
+Each source is an adapter that returns SetRecords (name, code, and whatever
+else it knows: release date, card count). Sources are read concurrently, then
+reconciled by set code into one canonical table:
+
+  - the name from the first source that lists the code is the canonical name,
+    names from other sources become aliases
+  - release date / card count come from the first source that has them
+  - disagreements (one name claimed by two codes, different release dates or
+    card counts for one code) are reported as conflicts
+
+The catalogue is written as JSON (mtg_sets_catalogue.json next to this file by
+default) and, when present, is used by the converters after
+moxfield_set_codes.csv (the codes Moxfield accepts) and ahead of
+mtg_sets.json.
+
+Every source can be pointed at a local file instead of the network, e.g. a
+saved Scryfall /sets response or an archived Wikipedia page:
+
+USAGE:
+    ./set_catalogue.py
+    ./set_catalogue.py --source scryfall=saved/scryfall-sets.json --source moxfield --source sets-json
+    ./set_catalogue.py --offline --conflicts conflicts.json
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from page_cache import DEFAULT_TIMEOUT, PageCache
+from scrape_set_names import WIKI_URL, iter_set_pairs
+from set_index import (default_catalogue_file, default_set_codes_csv, default_sets_json,
+                       normalize_set_name, read_sets_json)
+
+this_file_path = os.path.realpath(__file__)
+this_dir_path = os.path.dirname(this_file_path)
+default_cache_dir = os.path.join(this_dir_path, ".scrape_cache")
+
+SCRYFALL_SETS_URL = "https://api.scryfall.com/sets"
+CATALOGUE_VERSION = 1
+
+
+@dataclass
+class SetRecord:
+    name: str
+    code: str
+    released_at: Optional[str] = None   # ISO date, YYYY-MM-DD
+    card_count: Optional[int] = None
+
+
+@dataclass
+class CatalogueSet:
+    code: str
+    name: str
+    aliases: List[str] = field(default_factory=list)
+    released_at: Optional[str] = None
+    card_count: Optional[int] = None
+    sources: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Conflict:
+    kind: str       # "name", "released_at" or "card_count"
+    key: str        # the set name (kind == "name") or the set code
+    values: Dict[str, str]  # source -> value
+
+
+# --- Source adapters -----------------------------------------------------------
+class SetSource(ABC):
+    """
+    Base class for set sources. `location` is a URL or a local file path;
+    subclasses implement load(). Network sources go through the page cache so
+    unchanged pages cost a 304, and `offline` uses the last snapshot.
+    """
+    name = ""
+    default_location = ""
+
+    def __init__(self, location: Optional[str] = None):
+        self.location = location or self.default_location
+
+    def is_remote(self) -> bool:
+        return self.location.startswith(("http://", "https://"))
+
+    def read_bytes(self, cache: Optional[PageCache], offline: bool, timeout: float,
+                   location: Optional[str] = None) -> bytes:
+        location = location or self.location
+        if not location.startswith(("http://", "https://")):
+            with open(location, "rb") as f:
+                return f.read()
+        if cache is None:
+            cache = PageCache(default_cache_dir)
+        data, _, _ = cache.fetch(location, offline=offline, timeout=timeout)
+        return data
+
+    @abstractmethod
+    def load(self, cache: Optional[PageCache], offline: bool, timeout: float) -> List[SetRecord]:
+        """Read the source and return its sets."""
+
+
+class ScryfallSource(SetSource):
+    """Scryfall's /sets API (or a saved copy of its JSON response)."""
+    name = "scryfall"
+    default_location = SCRYFALL_SETS_URL
+
+    def load(self, cache, offline, timeout):
+        records = []
+        location = self.location
+        while location:
+            page = json.loads(self.read_bytes(cache, offline, timeout, location))
+            for s in page.get("data", []):
+                records.append(SetRecord(s.get("name") or "", s.get("code") or "",
+                                         s.get("released_at"), s.get("card_count")))
+            location = page.get("next_page") if page.get("has_more") else None
+        return records
+
+
+class WikipediaSource(SetSource):
+    """The Wikipedia list of sets, parsed with the set name scraper."""
+    name = "wikipedia"
+    default_location = WIKI_URL
+
+    def load(self, cache, offline, timeout):
+        html = self.read_bytes(cache, offline, timeout).decode("utf-8", errors="ignore")
+        return [SetRecord(name, code) for name, code in iter_set_pairs([html])]
+
+
+class MoxfieldCsvSource(SetSource):
+    """moxfield_set_codes.csv (copied from https://moxfield.com/sets)."""
+    name = "moxfield"
+    default_location = default_set_codes_csv
+
+    def load(self, cache, offline, timeout):
+        text = self.read_bytes(cache, offline, timeout).decode("utf-8")
+        records = []
+        for row in csv.DictReader(text.splitlines()):
+            records.append(SetRecord(row.get("Set Name") or "", row.get("SetCode") or "",
+                                     _parse_date(row.get("ReleaseDate")), _parse_int(row.get("TotalCards"))))
+        return records
+
+
+class SetsJsonSource(SetSource):
+    """mtg_sets.json ({set name: set code}, as written by scrape-set-names.py)."""
+    name = "sets-json"
+    default_location = default_sets_json
+
+    def load(self, cache, offline, timeout):
+        if self.is_remote():
+            raw = json.loads(self.read_bytes(cache, offline, timeout))
+            return [SetRecord(str(k), str(v)) for k, v in raw.items()]
+        return [SetRecord(name, code) for name, code in read_sets_json(self.location)]
+
+
+# in priority order: earlier sources win when picking names, dates and counts
+SOURCES = {
+    "scryfall": ScryfallSource,
+    "moxfield": MoxfieldCsvSource,
+    "sets-json": SetsJsonSource,
+    "wikipedia": WikipediaSource,
+}
+
+def _parse_date(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip()
+    for fmt in ("%Y-%m-%d", "%b %d, %Y", "%B %d, %Y"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return None
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int((value or "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+def parse_source_spec(spec: str) -> SetSource:
+    """"scryfall" or "scryfall=path/or/url" -> a source adapter."""
+    name, _, location = spec.partition("=")
+    cls = SOURCES.get(name)
+    if cls is None:
+        raise ValueError(f"unknown set source: {name} (choose from {', '.join(SOURCES)})")
+    return cls(location or None)
+
+
+# --- Fetching ------------------------------------------------------------------
+def load_sources(sources: List[SetSource], cache: Optional[PageCache], offline: bool = False,
+                 timeout: float = DEFAULT_TIMEOUT, workers: Optional[int] = None
+                 ) -> Tuple[Dict[str, List[SetRecord]], Dict[str, str], Dict[str, float]]:
+    """
+    Load all sources concurrently (I/O bound, so threads).
+    Returns ({source: records}, {source: error message}, {source: seconds}).
+    """
+    def run(source: SetSource):
+        start = time.perf_counter()
+        try:
+            return source.name, source.load(cache, offline, timeout), None, time.perf_counter() - start
+        except Exception as e:  # one broken source should not stop the others
+            return source.name, [], f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+    records: Dict[str, List[SetRecord]] = {}
+    errors: Dict[str, str] = {}
+    timings: Dict[str, float] = {}
+    with ThreadPoolExecutor(max_workers=workers or len(sources) or 1) as pool:
+        for name, recs, error, seconds in pool.map(run, sources):
+            timings[name] = seconds
+            if error is not None:
+                errors[name] = error
+            else:
+                records[name] = recs
+    return records, errors, timings
+
+
+# --- Reconciling ---------------------------------------------------------------
+def reconcile(records: Dict[str, List[SetRecord]]) -> Tuple[List[CatalogueSet], List[Conflict]]:
+    """
+    Merge per-source records into one entry per set code. `records` must be
+    ordered by source priority.
+    """
+    sets: Dict[str, CatalogueSet] = {}
+    name_claims: Dict[str, List[Tuple[str, str]]] = {}  # normalized name -> [(source, code)]
+    display_names: Dict[str, str] = {}              # normalized name -> first spelling seen
+    dates: Dict[str, Dict[str, str]] = {}
+    counts: Dict[str, Dict[str, int]] = {}
+
+    for source, recs in records.items():
+        for rec in recs:
+            name, code = rec.name.strip(), rec.code.strip().lower()
+            if not name or not code:
+                continue
+            entry = sets.get(code)
+            if entry is None:
+                entry = sets[code] = CatalogueSet(code, name)
+            if source not in entry.sources:
+                entry.sources.append(source)
+            if name != entry.name and name not in entry.aliases:
+                entry.aliases.append(name)
+            if rec.released_at:
+                dates.setdefault(code, {}).setdefault(source, rec.released_at)
+                entry.released_at = entry.released_at or rec.released_at
+            if rec.card_count is not None:
+                counts.setdefault(code, {}).setdefault(source, rec.card_count)
+                if entry.card_count is None:
+                    entry.card_count = rec.card_count
+            key = normalize_set_name(name) or name.lower()
+            claims = name_claims.setdefault(key, [])
+            if (source, code) not in claims:
+                claims.append((source, code))
+            display_names.setdefault(key, name)
+
+    conflicts: List[Conflict] = []
+    for key, claims in name_claims.items():
+        codes = {code for _, code in claims}
+        if len(codes) > 1:
+            by_source: Dict[str, str] = {}
+            for source, code in claims:
+                by_source[source] = f"{by_source[source]}/{code}" if source in by_source else code
+            conflicts.append(Conflict("name", display_names[key], by_source))
+            # the name belongs to the first code it was seen with (highest priority source)
+            winner = claims[0][1]
+            for code in codes - {winner}:
+                entry = sets.get(code)
+                if entry is None:
+                    continue
+                entry.aliases = [a for a in entry.aliases if (normalize_set_name(a) or a.lower()) != key]
+                if (normalize_set_name(entry.name) or entry.name.lower()) == key:
+                    if entry.aliases:
+                        entry.name = entry.aliases.pop(0)
+                    else:
+                        del sets[code]  # the code had no other name
+    for code, by_source in dates.items():
+        if len(set(by_source.values())) > 1:
+            conflicts.append(Conflict("released_at", code, dict(by_source)))
+    for code, by_source in counts.items():
+        if len(set(by_source.values())) > 1:
+            conflicts.append(Conflict("card_count", code, {s: str(n) for s, n in by_source.items()}))
+
+    catalogue = sorted(sets.values(), key=lambda s: (s.released_at or "9999", s.code))
+    return catalogue, conflicts
+
+
+# --- Output --------------------------------------------------------------------
+def write_catalogue(path: str, catalogue: List[CatalogueSet], sources: List[str]) -> None:
+    payload = {
+        "version": CATALOGUE_VERSION,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "sources": sources,
+        "sets": [
+            {"code": s.code, "name": s.name, "aliases": s.aliases, "released_at": s.released_at,
+             "card_count": s.card_count, "sources": s.sources}
+            for s in catalogue
+        ],
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+
+def report_conflicts(conflicts: List[Conflict], file=sys.stderr, limit: int = 20) -> None:
+    if not conflicts:
+        return
+    print(f"WARNING: {len(conflicts)} conflict(s) between set sources:", file=file)
+    for c in conflicts[:limit]:
+        values = ", ".join(f"{source}={value}" for source, value in c.values.items())
+        print(f"  {c.kind} {c.key}: {values}", file=file)
+    if len(conflicts) > limit:
+        print(f"  ... {len(conflicts) - limit} more (see --conflicts)", file=file)
+
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Build the unified set catalogue from several set sources.")
+    p.add_argument("-o", "--output", default=default_catalogue_file, help="Catalogue JSON to write")
+    p.add_argument("--source", action="append", dest="sources", metavar="NAME[=PATH_OR_URL]",
+                   help=f"Set source, in priority order; repeatable. One of: {', '.join(SOURCES)}. "
+                        "Defaults to all of them, in that order")
+    p.add_argument("--cache-dir", default=default_cache_dir,
+                   help="Directory for page snapshots of network sources")
+    p.add_argument("--offline", action="store_true", help="Use cached snapshots, no network access")
+    p.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Network timeout in seconds")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Sources to load at once (default: all)")
+    p.add_argument("--conflicts", metavar="JSON_PATH", help="Also write all conflicts to this JSON file")
+    return p.parse_args(argv)
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    try:
+        sources = [parse_source_spec(spec) for spec in (args.sources or SOURCES)]
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    names = [s.name for s in sources]
+    if len(set(names)) != len(names):
+        print("ERROR: each --source may only be given once", file=sys.stderr)
+        return 2
+
+    cache = PageCache(args.cache_dir)
+    records, errors, timings = load_sources(sources, cache, args.offline, args.timeout, args.jobs)
+    for name in names:
+        if name in errors:
+            print(f"WARNING: skipped set source {name}: {errors[name]}", file=sys.stderr)
+        else:
+            print(f"{name}: {len(records[name])} sets in {timings[name]:.2f}s", file=sys.stderr)
+    if not records:
+        print("ERROR: no set source could be loaded", file=sys.stderr)
+        return 2
+
+    # keep priority order regardless of which source finished first
+    catalogue, conflicts = reconcile({name: records[name] for name in names if name in records})
+    write_catalogue(args.output, catalogue, [name for name in names if name in records])
+    report_conflicts(conflicts)
+    if args.conflicts:
+        with open(args.conflicts, "w", encoding="utf-8") as f:
+            json.dump([{"kind": c.kind, "key": c.key, "values": c.values} for c in conflicts],
+                      f, indent=2, ensure_ascii=False)
+    print(f"{len(catalogue)} sets -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Set name -> set code resolution for the converters.
+
+Merges the set sources shipped with the repo (moxfield_set_codes.csv and
+mtg_sets.json, plus mtg_sets_catalogue.json when set_catalogue.py has built
+one) into one index with:
+  - exact and normalized keys (case, punctuation, "Edition"/"Core Set" etc. ignored)
+  - an alias table for names that differ between ShinyApp / TCGPlayer and Moxfield
+  - a trigram fuzzy fallback, cached per unseen name
+
+Earlier sources win when they disagree. The converters all list the Moxfield
+set codes CSV first (those are the codes Moxfield accepts), then the
+catalogue, then mtg_sets.json.
+
+The built index is pickled next to the sources (mtg_sets.idx) and reused as long
+as none of the source files changed, so loading it takes a few milliseconds.
+
+USAGE:
+    ./set_index.py build
+    ./set_index.py lookup "Duskmourn House of Horror" "Magic 2010 Core Set"
+"""
+import os
+import re
+import csv
+import sys
+import copy
+import json
+import pickle
+import argparse
+from typing import Dict, List, Optional, Set, Tuple
+
+this_file_path = os.path.realpath(__file__)
+this_dir_path = os.path.dirname(this_file_path)
+default_sets_json = os.path.join(this_dir_path, "mtg_sets.json")
+default_set_codes_csv = os.path.join(this_dir_path, "moxfield_set_codes.csv")
+default_index_file = os.path.join(this_dir_path, "mtg_sets.idx")
+default_catalogue_file = os.path.join(this_dir_path, "mtg_sets_catalogue.json")
+
+INDEX_VERSION = 1
+FUZZY_CUTOFF = 0.85
+FUZZY_CACHE_SIZE = 65536
+
+# names used by ShinyApp / TCGPlayer that normalization alone does not fix
+ALIASES: Dict[str, str] = {
+    "Alpha": "Limited Edition Alpha",
+    "Beta": "Limited Edition Beta",
+    "Unlimited": "Unlimited Edition",
+    "Revised": "Revised Edition",
+    "Warhammer 40,000": "Warhammer 40,000 Commander",
+    "Commander: Adventures in the Forgotten Realms": "Forgotten Realms Commander",
+    "Commander: Innistrad: Crimson Vow": "Crimson Vow Commander",
+    "Commander: Innistrad: Midnight Hunt": "Midnight Hunt Commander",
+    "Commander: Streets of New Capenna": "New Capenna Commander",
+    "Commander: The Lord of the Rings: Tales of Middle-earth": "Tales of Middle-earth Commander",
+    "The List Reprints": "The List",
+    "March of the Machine: Multiverse Legends": "Multiverse Legends",
+    "The Brothers' War: Retro Frame Artifacts": "The Brothers' War Retro Artifacts",
+}
+
+# "Commander: Bloomburrow" is listed as "Bloomburrow Commander" by Moxfield
+_PREFIX_REWRITES: List[Tuple[str, str]] = [
+    ("commander:", " commander"),
+]
+_STOPWORDS = {"the", "edition", "core", "set", "series", "of", "magic"}
+# words that mark a different product; fuzzy matches must agree on them
+_QUALIFIERS = {"commander", "promos", "promo", "jumpstart", "minigames", "tokens",
+               "art", "timeshifts", "expeditions", "remastered", "alchemy", "eternal"}
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DIGITS = re.compile(r"\d+")
+
+# --- Normalization -------------------------------------------------------------
+def normalize_set_name(name: str) -> str:
+    s = (name or "").lower().replace("&", " and ")
+    for prefix, suffix in _PREFIX_REWRITES:
+        if s.startswith(prefix):
+            s = s[len(prefix):] + suffix
+    s = _NON_ALNUM.sub(" ", s).strip()
+    return " ".join(w for w in s.split() if w not in _STOPWORDS)
+
+def _signature(key: str) -> Tuple[List[str], Set[str]]:
+    words = key.split()
+    return _DIGITS.findall(key), _QUALIFIERS.intersection(words)
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# --- Source loaders ------------------------------------------------------------
+def read_sets_json(path: str) -> List[Tuple[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path}: mapping JSON must be an object of {{set_name: set_code}}")
+    if isinstance(raw.get("sets"), list):
+        return read_set_catalogue(raw)
+    return [(str(k), str(v)) for k, v in raw.items() if k is not None and v is not None]
+
+def read_set_catalogue(raw: dict) -> List[Tuple[str, str]]:
+    """(name, code) pairs from a set_catalogue.py catalogue: canonical names, then aliases."""
+    pairs = [(s["name"], s["code"]) for s in raw["sets"]]
+    pairs.extend((alias, s["code"]) for s in raw["sets"] for alias in s.get("aliases") or ())
+    return pairs
+
+def catalogue_sources(path: Optional[str] = None) -> List[str]:
+    """[the catalogue] if it exists (an explicitly given path must exist), else []."""
+    if path:
+        return [path]
+    return [default_catalogue_file] if os.path.exists(default_catalogue_file) else []
+
+def read_set_codes_csv(path: str) -> List[Tuple[str, str]]:
+    """(name, code) pairs; a name listed twice keeps its last code, as the Moxfield list is read."""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        codes = {row["Set Name"] or "": row["SetCode"] or "" for row in csv.DictReader(f)}
+    return list(codes.items())
+
+SOURCE_READERS = {
+    ".json": read_sets_json,
+    ".csv": read_set_codes_csv,
+}
+
+def _source_stamp(paths: List[str]) -> List[Tuple[str, int, int]]:
+    stamp = []
+    # this file too, so edits to ALIASES or the normalization rules rebuild the index
+    for path in paths + [this_file_path]:
+        st = os.stat(path)
+        stamp.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+    return stamp
+
+# --- Index ---------------------------------------------------------------------
+class SetResolver:
+    """
+    Resolve set names to lowercase set codes.
+
+    resolve() returns None when no source matches; callers decide what to
+    fall back to (the raw set name for Shiny, an empty Edition for TCGPlayer).
+    Names that did not resolve are counted in `unresolved`; scoped() gives a
+    resolver with its own counts (e.g. per server request). The fuzzy-match
+    cache is cleared when it holds FUZZY_CACHE_SIZE names.
+    """
+    def __init__(self, exact: Dict[str, str], normalized: Dict[str, str],
+                 trigrams: Dict[str, List[int]], keys: List[str], stamp=None):
+        self.exact = exact
+        self.ci: Dict[str, str] = {}
+        for k, v in exact.items():  # in source order, so earlier sources win here too
+            self.ci.setdefault(k.lower(), v)
+        self.normalized = normalized
+        self.trigrams = trigrams
+        self.keys = keys
+        self.codes = set(normalized.values())
+        self.stamp = stamp or []
+        self._fuzzy_cache: Dict[str, Optional[str]] = {}
+        self._fuzzy_counts = {"hits": 0, "misses": 0}  # shared with scoped() resolvers, like the cache
+        self.unresolved: Dict[str, int] = {}
+
+    @classmethod
+    def from_pairs(cls, pairs: List[Tuple[str, str]], stamp=None) -> "SetResolver":
+        """Build from (set name, code) pairs; earlier pairs win on conflicts."""
+        exact: Dict[str, str] = {}
+        normalized: Dict[str, str] = {}
+        for name, code in pairs:
+            name, code = name.strip(), code.strip().lower()
+            if not name or not code:
+                continue
+            exact.setdefault(name, code)
+            key = normalize_set_name(name)
+            if key:
+                normalized.setdefault(key, code)
+        for alias, target in ALIASES.items():
+            code = exact.get(target)
+            if code:
+                exact.setdefault(alias, code)
+                normalized.setdefault(normalize_set_name(alias), code)
+        keys = sorted(normalized)
+        trigrams: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            for gram in _trigrams(key):
+                trigrams.setdefault(gram, []).append(i)
+        return cls(exact, normalized, trigrams, keys, stamp)
+
+    @classmethod
+    def from_sources(cls, paths: List[str]) -> "SetResolver":
+        pairs: List[Tuple[str, str]] = []
+        for path in paths:
+            reader = SOURCE_READERS.get(os.path.splitext(path)[1].lower())
+            if reader is None:
+                raise ValueError(f"unsupported set source file type: {path}")
+            pairs.extend(reader(path))
+        return cls.from_pairs(pairs, stamp=_source_stamp(paths))
+
+    # --- lookups ---------------------------------------------------------------
+    def resolve(self, set_name: str) -> Optional[str]:
+        name = (set_name or "").strip()
+        if not name:
+            return None
+        code = self.exact.get(name) or self.ci.get(name.lower())
+        if code:
+            return code
+        key = normalize_set_name(name)
+        code = self.normalized.get(key)
+        if code:
+            return code
+        cache = self._fuzzy_cache
+        if key in cache:
+            code = cache[key]
+            self._fuzzy_counts["hits"] += 1
+        else:
+            code = self._fuzzy(key)
+            self._fuzzy_counts["misses"] += 1
+            if len(cache) >= FUZZY_CACHE_SIZE:
+                cache.clear()
+            cache[key] = code
+        if code is None:
+            self.unresolved[name] = self.unresolved.get(name, 0) + 1
+        return code
+
+    def _fuzzy(self, key: str) -> Optional[str]:
+        if not key:
+            return None
+        from difflib import SequenceMatcher
+
+        # candidates share at least a third of the query's trigrams
+        grams = _trigrams(key)
+        hits: Dict[int, int] = {}
+        for gram in grams:
+            for i in self.trigrams.get(gram, ()):
+                hits[i] = hits.get(i, 0) + 1
+        min_hits = max(1, len(grams) // 3)
+        signature = _signature(key)
+        best, best_ratio = None, FUZZY_CUTOFF
+        for i, n in hits.items():
+            if n < min_hits:
+                continue
+            candidate = self.keys[i]
+            # never match "Commander 2013" to "Commander 2017", or a set to its
+            # Commander / promo companion
+            if _signature(candidate) != signature:
+                continue
+            ratio = SequenceMatcher(None, key, candidate).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        return self.normalized[best] if best is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for the fuzzy-match cache (exact / normalized hits are not counted)."""
+        return dict(self._fuzzy_counts, size=len(self._fuzzy_cache))
+
+    def scoped(self) -> "SetResolver":
+        """A resolver sharing this one's tables and fuzzy-match cache, with its own `unresolved` counts."""
+        scoped = copy.copy(self)
+        scoped.unresolved = {}
+        return scoped
+
+    def is_known_code(self, code: str) -> bool:
+        return (code or "").lower() in self.codes
+
+    # --- persistence -----------------------------------------------------------
+    def save(self, path: str) -> None:
+        payload = (INDEX_VERSION, self.stamp, self.exact, self.normalized, self.trigrams, self.keys)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SetResolver"]:
+        """Load a saved index; None if it is missing or from another version."""
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(payload, tuple) or payload[0] != INDEX_VERSION:
+            return None
+        _, stamp, exact, normalized, trigrams, keys = payload
+        return cls(exact, normalized, trigrams, keys, stamp)
+
+
+class LazySetResolver:
+    """
+    Stand-in for a SetResolver that loads it on first use, so runs that never
+    look up a set (empty input, exports that carry their own set codes) don't
+    read the index. Attributes are copied over as they are first used, so
+    lookups cost the same as on the real resolver after that.
+    """
+    def __init__(self, sources: List[str], index_path: Optional[str]):
+        self._sources = sources
+        self._index_path = index_path
+        self._resolver: Optional[SetResolver] = None
+        # shared with the real resolver once it is loaded
+        self.unresolved: Dict[str, int] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._resolver is not None
+
+    def load(self) -> SetResolver:
+        if self._resolver is None:
+            resolver = load_set_resolver(self._sources, self._index_path)
+            resolver.unresolved = self.unresolved
+            self._resolver = resolver
+        return self._resolver
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        value = getattr(self.load(), name)
+        setattr(self, name, value)
+        return value
+
+
+def load_set_resolver(sources: Optional[List[str]] = None,
+                      index_path: Optional[str] = default_index_file,
+                      lazy: bool = False) -> SetResolver:
+    """
+    Return a resolver for the given source files, reusing the on-disk index
+    when it was built from the same (unchanged) files. With lazy=True the
+    sources are only checked for existence now and the index is loaded on the
+    first lookup (a LazySetResolver).
+    """
+    if sources is None:
+        sources = [default_set_codes_csv] + catalogue_sources() + [default_sets_json]
+    sources = [p for p in sources if p]
+    try:
+        stamp = _source_stamp(sources)
+    except FileNotFoundError as e:
+        print(f"ERROR: set source file not found: {e.filename}", file=sys.stderr)
+        sys.exit(2)
+    if lazy:
+        return LazySetResolver(sources, index_path)
+
+    if index_path:
+        cached = SetResolver.load(index_path)
+        if cached is not None and cached.stamp == stamp:
+            return cached
+
+    try:
+        resolver = SetResolver.from_sources(sources)
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"ERROR: could not read set sources\n{e}", file=sys.stderr)
+        sys.exit(2)
+    if index_path:
+        try:
+            resolver.save(index_path)
+        except OSError:
+            pass  # read-only checkout; just rebuild next time
+    return resolver
+
+def report_unresolved(resolver: SetResolver, file=sys.stderr) -> None:
+    if not resolver.unresolved:
+        return
+    print(f"WARNING: {len(resolver.unresolved)} set name(s) could not be resolved to a set code:", file=file)
+    for name, count in sorted(resolver.unresolved.items()):
+        print(f"  {name} ({count} rows)", file=file)
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Build or query the set name -> set code index.")
+    p.add_argument("command", choices=["build", "lookup"])
+    p.add_argument("names", nargs="*", help="Set names to look up")
+    p.add_argument("--source", action="append", dest="sources",
+                   help="Set source file (.json or .csv); repeatable, earlier sources win")
+    p.add_argument("--index", default=default_index_file, help="Path to the compiled index file")
+    return p.parse_args(argv)
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    if args.command == "build":
+        if os.path.exists(args.index):
+            os.remove(args.index)
+    resolver = load_set_resolver(args.sources, args.index)
+    if args.command == "build":
+        print(f"{len(resolver.exact)} set names, {len(resolver.codes)} set codes -> {args.index}")
+        return 0
+    for name in args.names:
+        print(f"{name}\t{resolver.resolve(name) or ''}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,42 @@
 #!/usr/bin/env python3
+import io
 import os
-import re
 import csv
 import sys
-import json
 import argparse
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Dict, Any, List, Tuple
+from dataclasses import astuple, dataclass
+from itertools import repeat
+from typing import (TYPE_CHECKING, Dict, Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence,
+                    TextIO, Tuple)
+
+from aggregate import DEFAULT_MAX_KEYS, Aggregator
+from card_names import get_normalizer
+from columnar import map_unique, read_csv_columns, value_counts
+from dates import DateNormalizer, report_unparseable
+from csv_chunks import MappedCsv, find_row_boundaries, read_chunk_text, read_header, select_columns
+from deck_output import DeckExporter, NullDeckExporter, DEFAULT_MAX_OPEN_FILES, deck_filename, deck_line
+from prices import DEFAULT_TOP_N, PriceAnalytics, is_purchase_currency, print_summary, purchase_price
+from profiling import PROFILER
+from set_index import (SetResolver, catalogue_sources, default_index_file, default_set_codes_csv,
+                       load_set_resolver, report_unresolved)
+
+if TYPE_CHECKING:
+    from card_index import CardValidator  # imported when card validation is asked for
+    from incremental import Delta  # imported when --incremental is used
 
 this_file_path = os.path.realpath(__file__)
 this_dir_path = os.path.dirname(this_file_path)
 default_sets_json = os.path.join(this_dir_path, "mtg_sets.json")
 default_output_filename = "moxfield-converted-collection.csv"
+default_simple_filename = "collection_simple.tsv"
+default_delta_filename = "moxfield-delta.csv"
+default_removed_filename = "moxfield-removed.csv"
+default_card_index_file = os.path.join(this_dir_path, "mtg_cards.idx")  # card_index.default_index_file
+CHUNKS_PER_JOB = 4
+# part of the --incremental state context: bump it when the conversion of a
+# row changes, so rows stored by older versions are converted again
+CONVERSION_REVISION = 4
+_normalizer = get_normalizer("shiny")
 
 # --- Output CSV schema ---------------------------------------------------------
 MOXFIELD_FIELDS: List[str] = [
@@ -38,60 +62,22 @@ SIMPLE_FIELDNAMES = [
     "Proxy"
 ]
 # --- Helpers -------------------------------------------------------------------
+_dates = DateNormalizer()
+
 def _format_last_modified(date_str: str) -> str:
-    if not date_str:
-        return ""
-    s = date_str.strip()
-    try:
-        if s.endswith("Z"):
-            s = s[:-1] + "+00:00"
-        dt = datetime.fromisoformat(s)
-        if dt.tzinfo is not None:
-            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
-        return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
-    except Exception:
-        return date_str
+    return _dates.format(date_str)
+
+def _purchase_price(paid_per_unit: str, paid_currency: str = "") -> str:
+    return purchase_price(paid_per_unit, paid_currency)
 
 def _collector_number(discriminator: str) -> str:
     return (discriminator or "").lstrip("#").strip()
 
-def _edition_code(set_name: str, exact_map: Dict[str, str], ci_map: Dict[str, str]) -> str:
+def _edition_code(set_name: str, sets: SetResolver) -> str:
     name = (set_name or "").strip()
     if not name:
         return ""
-    if name in exact_map:
-        return exact_map[name]
-    return ci_map.get(name.lower(), name)  # fallback to original set_name
-
-def load_set_mapping(path: str) -> Tuple[Dict[str, str], Dict[str, str]]:
-    """
-    Load JSON mapping { "Set Name": "setcode", ... } from file.
-    Returns (exact_map, case_insensitive_map).
-    """
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-    except FileNotFoundError:
-        print(f"ERROR: mapping file not found: {path}", file=sys.stderr)
-        sys.exit(2)
-    except json.JSONDecodeError as e:
-        print(f"ERROR: mapping file is not valid JSON: {path}\n{e}", file=sys.stderr)
-        sys.exit(2)
-
-    if not isinstance(raw, dict):
-        print("ERROR: mapping JSON must be an object of {set_name: set_code}", file=sys.stderr)
-        sys.exit(2)
-
-    exact, ci = {}, {}
-    for k, v in raw.items():
-        if k is None or v is None:
-            continue
-        ks, vs = str(k).strip(), str(v).strip()
-        if not ks or not vs:
-            continue
-        exact[ks] = vs
-        ci[ks.lower()] = vs
-    return exact, ci
+    return sets.resolve(name) or name  # fallback to original set_name
 
 # --- Domain row models ---------------------------------------------------------
 @dataclass(frozen=True)
@@ -167,7 +153,7 @@ class MoxfieldAppRow:
     group_name: str
 
     @classmethod
-    def from_shiny(cls, shiny: ShinyAppRow, exact_map: Dict[str, str], ci_map: Dict[str, str]) -> "MoxfieldAppRow":
+    def from_shiny(cls, shiny: ShinyAppRow, sets: SetResolver) -> "MoxfieldAppRow":
         is_foil = ""
         is_proxy = ""
         if "foil" in shiny.rarity.lower():
@@ -178,7 +164,7 @@ class MoxfieldAppRow:
             count=shiny.quantity,
             tradelist_count=shiny.quantity,
             name=clean_name(shiny.product_name),
-            edition=_edition_code(shiny.set_name, exact_map, ci_map).lower(), # always use lowercase edition names for Moxfield
+            edition=_edition_code(shiny.set_name, sets).lower(), # always use lowercase edition names for Moxfield
             condition=shiny.grade_subtype,
             language="English",
             foil=is_foil,
@@ -187,7 +173,7 @@ class MoxfieldAppRow:
             collector_number=_collector_number(shiny.discriminator),
             alter="",
             proxy=is_proxy,
-            purchase_price="",
+            purchase_price=_purchase_price(shiny.paid_per_unit, shiny.paid_currency),
             group_name = shiny.group_name
         )
 
@@ -209,24 +195,13 @@ class MoxfieldAppRow:
             "Purchase Price": self.purchase_price,
         }
 
-    def to_deck_txt(self) -> str:
-        parts = [
-            self.count,
-            self.name,
-            # "(" +
-            # "" +
-            # # self.edition.upper()  + // TODO: need to get the Set labels to match what Moxfield wants for this format
-            # ")",
-            # self.collector_number
-        ]
-        if self.foil != "":
-            parts.append("*F*")
-        return " ".join(parts)
+    def to_deck_txt(self, sets: Optional[SetResolver] = None) -> str:
+        # the set label and collector number are only usable for known Moxfield set codes
+        set_label = self.edition.upper() if sets is not None and sets.is_known_code(self.edition) else ""
+        return deck_line(self.count, self.name, set_label, self.collector_number, self.foil)
 
     def make_deck_filename(self) -> str:
-        filename = "deck_" + self.group_name + ".txt"
-        filename = re.sub(r"[^A-Za-z0-9._-]+", "_", filename)
-        return filename
+        return deck_filename(self.group_name)
 
 # make a simplified version that is just the first three columns
 @dataclass(frozen=True)
@@ -247,78 +222,742 @@ class MoxfieldSimpleRow:
             }
 
 # --- Core processing -----------------------------------------------------------
+def convert_rows(
+        reader: Iterable[Dict[str, Any]],
+        sets: SetResolver,
+        prices: Optional[PriceAnalytics] = None,
+        ) -> Iterator[MoxfieldAppRow]:
+    for row in reader:
+        shiny = ShinyAppRow.from_csv_row(row)
+        if prices is not None:
+            add_prices(prices, shiny)
+        yield MoxfieldAppRow.from_shiny(shiny, sets)
+
+def add_prices(prices: PriceAnalytics, shiny: ShinyAppRow) -> None:
+    prices.add(shiny.product_name, shiny.set_name, shiny.group_name, shiny.rarity, shiny.quantity,
+               shiny.value_total, shiny.value_per_unit, shiny.paid_total, shiny.paid_per_unit,
+               shiny.value_currency)
+
+def checked_rows(rows: Iterable[MoxfieldAppRow], cards: Optional["CardValidator"]) -> Iterable[MoxfieldAppRow]:
+    """The rows with their name / edition / collector number checked against the card index, if one is used."""
+    if cards is None:
+        return rows
+    from card_index import validate_rows
+
+    return validate_rows(rows, cards)
+
+def write_rows(
+        rows: Iterable[MoxfieldAppRow],
+        writer: csv.DictWriter,
+        simple_writer: Optional[csv.DictWriter],
+        deck_writer: DeckExporter,
+        ) -> None:
+    add_deck = deck_writer.add_row
+    for mox in rows:
+        add_deck(mox)
+        writer.writerow(mox.to_csv_dict())
+        if simple_writer is not None:
+            simpleMoxRow = MoxfieldSimpleRow.from_MoxfieldAppRow(mox)
+            simple_writer.writerow(simpleMoxRow.to_csv_dict())
+
+def write_aggregated(
+        rows: Iterable[MoxfieldAppRow],
+        writer: csv.DictWriter,
+        simple_writer: Optional[csv.DictWriter],
+        deck_writer: DeckExporter,
+        aggregator: Aggregator,
+        ) -> None:
+    """Deck files get every row (decks are per group); the CSV and TSV get the merged rows."""
+    add = aggregator.add
+    add_deck = deck_writer.add_row
+    for mox in rows:
+        add_deck(mox)
+        add(mox)
+    write_rows(aggregator.rows(), writer, simple_writer, NullDeckExporter())
+
 def process(
         reader: csv.DictReader,
         writer: csv.DictWriter,
-        exact_map: Dict[str, str],
-        ci_map: Dict[str, str],
-        simple_writer: csv.DictWriter
+        sets: SetResolver,
+        simple_writer: Optional[csv.DictWriter],
+        deck_writer: Optional[DeckExporter] = None,
+        aggregator: Optional[Aggregator] = None,
+        prices: Optional[PriceAnalytics] = None,
+        cards: Optional["CardValidator"] = None,
         ) -> None:
-    decks_created = set()
+    if deck_writer is None:
+        with DeckExporter(sets) as deck_writer:
+            return process(reader, writer, sets, simple_writer, deck_writer, aggregator, prices, cards)
     writer.writeheader()
-    simple_writer.writeheader()
-    for row in reader:
-        shiny = ShinyAppRow.from_csv_row(row)
-        mox = MoxfieldAppRow.from_shiny(shiny, exact_map, ci_map)
-        simpleMoxRow = MoxfieldSimpleRow.from_MoxfieldAppRow(mox)
-        deck_filename = mox.make_deck_filename()
-        # clear the file contents for writing
-        if deck_filename not in decks_created:
-            with open(deck_filename, "w") as _:
-                pass
-            decks_created.add(deck_filename)
-        append_line_to_file(mox.make_deck_filename(), mox.to_deck_txt())
-        writer.writerow(mox.to_csv_dict())
-        simple_writer.writerow(simpleMoxRow.to_csv_dict())
+    if simple_writer is not None:
+        simple_writer.writeheader()
+    rows = checked_rows(convert_rows(reader, sets, prices), cards)
+    if aggregator is not None:
+        write_aggregated(rows, writer, simple_writer, deck_writer, aggregator)
+    else:
+        write_rows(rows, writer, simple_writer, deck_writer)
+
+# --- Fast path -----------------------------------------------------------------
+class MoxfieldCsvRow(NamedTuple):
+    """One output row as a plain tuple in MOXFIELD_FIELDS order, for csv.writer."""
+    count: str
+    tradelist_count: str
+    name: str
+    edition: str
+    condition: str
+    language: str
+    foil: str
+    tags: str
+    last_modified: str
+    collector_number: str
+    alter: str
+    proxy: str
+    playtest_card: str
+    purchase_price: str
+
+SHINY_FAST_COLUMNS = [
+    "product_name", "set_name", "discriminator", "rarity", "quantity",
+    "grade_subtype", "group_name", "date_added", "tag", "paid_per_unit", "paid_currency",
+]
+# only read for the price analytics
+SHINY_PRICE_COLUMNS = ["value_total", "value_per_unit", "paid_total", "value_currency"]
+
+def _fast_rows(f: TextIO, mapped: Optional[MappedCsv]) -> Iterator[Tuple[str, ...]]:
+    """SHINY_FAST_COLUMNS + SHINY_PRICE_COLUMNS of each row, from the mapping if there is one."""
+    if mapped is not None:
+        return mapped.rows(SHINY_FAST_COLUMNS + SHINY_PRICE_COLUMNS)
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return iter(())
+    return select_columns(reader, header, SHINY_FAST_COLUMNS + SHINY_PRICE_COLUMNS)
+
+def convert_fast(
+        rows: Iterable[Tuple[str, ...]],
+        sets: SetResolver,
+        write_row: Callable[[Sequence[str]], Any],
+        write_simple: Optional[Callable[[Sequence[str]], Any]],
+        add_deck: Callable[..., None],
+        add_prices: Optional[Callable[..., None]] = None,
+        check: Optional[Callable[[str, str, str], Tuple[str, str, str]]] = None,
+        ) -> None:
+    """
+    The fast engine's per-row loop, over tuples from _fast_rows(). `check` is
+    CardValidator.check, when the rows are validated.
+    """
+    editions: Dict[str, str] = {}
+    # set name -> the name counted in sets.unresolved, so memo hits count their rows too
+    unresolved: Dict[str, str] = {}
+    purchase_prices: Dict[str, str] = {}
+    purchase_currencies: Dict[str, bool] = {}
+    for (product, set_name, discriminator, rarity, quantity, grade, group, date_added, tag, paid, paid_currency,
+         value_total, value, paid_total, currency) in rows:
+        name = clean_name(product)
+        edition = editions.get(set_name)
+        if edition is None:
+            edition = editions[set_name] = _edition_code(set_name, sets).lower()
+            if set_name.strip() in sets.unresolved:
+                unresolved[set_name] = set_name.strip()
+        elif set_name in unresolved:
+            key = unresolved[set_name]
+            sets.unresolved[key] = sets.unresolved.get(key, 0) + 1
+        foil = "foil" if "foil" in rarity.lower() else ""
+        proxy = "TRUE" if "proxy" in tag.lower() else ""
+        number = _collector_number(discriminator)
+        if check is not None:
+            name, edition, number = check(name, edition, number)
+        purchase_price = purchase_prices.get(paid)
+        if purchase_price is None:
+            purchase_price = purchase_prices[paid] = _purchase_price(paid)
+        if paid_currency and purchase_price:
+            ok = purchase_currencies.get(paid_currency)
+            if ok is None:
+                ok = purchase_currencies[paid_currency] = is_purchase_currency(paid_currency)
+            if not ok:
+                purchase_price = ""
+
+        write_row(MoxfieldCsvRow(
+            quantity, quantity, name, edition, grade, "English", foil, tag,
+            _format_last_modified(date_added), number, "", proxy, proxy, purchase_price))
+        if write_simple is not None:
+            write_simple((quantity, name, proxy))
+        add_deck(group, quantity, name, edition, number, foil)
+        if add_prices is not None:
+            add_prices(product, set_name, group, rarity, quantity, value_total, value, paid_total, paid, currency)
+
+def process_fast(
+        f: TextIO,
+        fout: TextIO,
+        sets: SetResolver,
+        simple_fout: Optional[TextIO],
+        deck_writer: DeckExporter,
+        prices: Optional[PriceAnalytics] = None,
+        cards: Optional["CardValidator"] = None,
+        ) -> None:
+    """
+    Low-allocation equivalent of process(): only touches the columns Moxfield
+    needs and writes tuples with csv.writer. A regular input file is memory-
+    mapped and read a block at a time (see csv_chunks.MappedCsv); stdin goes
+    through csv.reader. Produces byte-identical output.
+    """
+    writer = csv.writer(fout, quoting=csv.QUOTE_ALL)
+    writer.writerow(MOXFIELD_FIELDS)
+    simple_writer = None
+    if simple_fout is not None:
+        simple_writer = csv.writer(simple_fout, delimiter="\t")
+        simple_writer.writerow(SIMPLE_FIELDNAMES)
+
+    mapped = MappedCsv.from_file(f)
+    try:
+        rows = _fast_rows(f, mapped)
+        if PROFILER.enabled:
+            rows = PROFILER.wrap_iter("csv read", rows)
+        convert_fast(rows, sets, _timed("csv write", writer.writerow),
+                     _timed("csv write", simple_writer.writerow) if simple_writer is not None else None,
+                     deck_writer.add, prices.add if prices is not None else None,
+                     cards.check if cards is not None else None)
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+# --- Columnar engine -----------------------------------------------------------
+def process_columnar(
+        f: TextIO,
+        fout: TextIO,
+        sets: SetResolver,
+        simple_fout: Optional[TextIO],
+        deck_writer: DeckExporter,
+        prices: Optional[PriceAnalytics] = None,
+        cards: Optional["CardValidator"] = None,
+        ) -> None:
+    """
+    Column-at-a-time equivalent of process(): loads the needed columns, converts
+    each distinct name / set / rarity / tag / date once and writes the output in
+    bulk. Holds the input columns in memory; produces byte-identical output.
+    """
+    writer = csv.writer(fout, quoting=csv.QUOTE_ALL)
+    writer.writerow(MOXFIELD_FIELDS)
+    simple_writer = None
+    if simple_fout is not None:
+        simple_writer = csv.writer(simple_fout, delimiter="\t")
+        simple_writer.writerow(SIMPLE_FIELDNAMES)
+
+    wanted = SHINY_FAST_COLUMNS + (SHINY_PRICE_COLUMNS if prices is not None else [])
+    columns, _ = read_csv_columns(f, wanted)
+    quantities = columns["quantity"]
+    tags = columns["tag"]
+    names = map_unique(columns["product_name"], clean_name)
+    editions = map_unique(columns["set_name"], lambda set_name: _edition_code(set_name, sets).lower())
+    if sets.unresolved:
+        # each set name was looked up (and counted) once; count the rest of its rows
+        for set_name, n in value_counts(columns["set_name"]).items():
+            key = set_name.strip()
+            if n > 1 and key in sets.unresolved:
+                sets.unresolved[key] += n - 1
+    foils = map_unique(columns["rarity"], lambda rarity: "foil" if "foil" in rarity.lower() else "")
+    proxies = map_unique(tags, lambda tag: "TRUE" if "proxy" in tag.lower() else "")
+    dates = _dates.format_column(columns["date_added"])
+    numbers = map_unique(columns["discriminator"], _collector_number)
+    purchase_prices = map_unique(columns["paid_per_unit"], _purchase_price)
+    other_currency = map_unique(columns["paid_currency"], lambda currency: not is_purchase_currency(currency))
+    if any(other_currency):
+        purchase_prices = ["" if other else price for price, other in zip(purchase_prices, other_currency)]
+    if cards is not None and quantities:
+        check = cards.check
+        names, editions, numbers = (list(column) for column in zip(*(
+            check(*values) for values in zip(names, editions, numbers))))
+
+    _timed("csv write", writer.writerows)(zip(
+        quantities, quantities, names, editions, columns["grade_subtype"], repeat("English"),
+        foils, tags, dates, numbers, repeat(""), proxies, proxies, purchase_prices))
+    if simple_writer is not None:
+        _timed("csv write", simple_writer.writerows)(zip(quantities, names, proxies))
+
+    add_deck = deck_writer.add
+    for group_name, quantity, name, edition, number, foil in zip(
+            columns["group_name"], quantities, names, editions, numbers, foils):
+        add_deck(group_name, quantity, name, edition, number, foil)
+
+    if prices is not None:
+        add_prices = prices.add
+        for row in zip(columns["product_name"], columns["set_name"], columns["group_name"], columns["rarity"],
+                       quantities, columns["value_total"], columns["value_per_unit"], columns["paid_total"],
+                       columns["paid_per_unit"], columns["value_currency"]):
+            add_prices(*row)
+
+ENGINES = {
+    "fast": process_fast,
+    "columnar": process_columnar,
+}
+
+# --- Parallel processing -------------------------------------------------------
+# the set index (and card validator) is handed to each worker once, not pickled
+# with every chunk; the card index is mapped again by each worker
+_worker_sets: Optional[SetResolver] = None
+_worker_cards: Optional["CardValidator"] = None
+
+def _init_worker(sets: SetResolver, cards: Optional["CardValidator"] = None) -> None:
+    global _worker_sets, _worker_cards
+    _worker_sets = sets
+    _worker_cards = cards
+
+def convert_chunk(path: str, fieldnames: List[str], start: int, end: int, top_n: Optional[int] = None
+                  ) -> Tuple[List[MoxfieldAppRow], Optional[PriceAnalytics], Dict[str, int]]:
+    """
+    Convert the rows in the byte range [start, end) of the input file. Also
+    returns the price analytics of those rows (with `top_n`) and the set names
+    that did not resolve.
+    """
+    reader = csv.DictReader(read_chunk_text(path, start, end), fieldnames=fieldnames)
+    prices = PriceAnalytics(top_n) if top_n is not None else None
+    rows = list(convert_rows(reader, _worker_sets, prices))
+    unresolved = dict(_worker_sets.unresolved)
+    _worker_sets.unresolved.clear()
+    return rows, prices, unresolved
+
+def _merge_unresolved(sets: SetResolver, unresolved: Dict[str, int]) -> None:
+    for name, count in unresolved.items():
+        sets.unresolved[name] = sets.unresolved.get(name, 0) + count
+
+def process_parallel(
+        path: str,
+        jobs: int,
+        writer: csv.DictWriter,
+        sets: SetResolver,
+        simple_writer: Optional[csv.DictWriter],
+        deck_writer: DeckExporter,
+        aggregator: Optional[Aggregator] = None,
+        prices: Optional[PriceAnalytics] = None,
+        cards: Optional["CardValidator"] = None,
+        ) -> None:
+    """
+    Split the input file into row-aligned byte ranges, convert them in a process
+    pool and write the results in the original row order. The rows are checked
+    against the card index (if any) here, as they are written.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    fieldnames, _ = read_header(path)
+    # a few chunks per worker keeps the pool busy when chunks convert unevenly
+    chunks = find_row_boundaries(path, jobs * CHUNKS_PER_JOB)
+    writer.writeheader()
+    if simple_writer is not None:
+        simple_writer.writeheader()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(sets,)) as pool:
+        top_n = prices.top_n if prices is not None else None
+        futures = [pool.submit(convert_chunk, path, fieldnames, start, end, top_n) for start, end in chunks]
+
+        def results() -> Iterator[MoxfieldAppRow]:
+            for future in futures:
+                rows, chunk_prices, unresolved = future.result()
+                if chunk_prices is not None:
+                    prices.merge(chunk_prices)
+                _merge_unresolved(sets, unresolved)
+                yield from rows
+        rows = checked_rows(results(), cards)
+        if aggregator is not None:
+            write_aggregated(rows, writer, simple_writer, deck_writer, aggregator)
+        else:
+            write_rows(rows, writer, simple_writer, deck_writer)
+
+DeckEntry = Tuple[str, str, str, str, str, str]  # DeckExporter.add() arguments
+
+def convert_fast_chunk(path: str, start: int, end: int, simple: bool, top_n: Optional[int] = None
+                       ) -> Tuple[str, str, List[DeckEntry], Optional[PriceAnalytics],
+                                  Tuple[Dict[str, int], int], Dict[str, int], Any]:
+    """
+    Run the fast engine over the byte range [start, end) of the mapped input.
+    Returns the CSV text, the simple TSV text, the deck entries, the price
+    analytics (with `top_n`), the timestamps that could not be parsed (see
+    DateNormalizer.take_unparseable), the set names that did not resolve and
+    the card validation counts (None without a card index).
+    """
+    out = io.StringIO()
+    simple_out = io.StringIO()
+    decks: List[DeckEntry] = []
+    prices = PriceAnalytics(top_n) if top_n is not None else None
+    _dates.take_unparseable()
+    with MappedCsv(path) as data:
+        convert_fast(data.rows(SHINY_FAST_COLUMNS + SHINY_PRICE_COLUMNS, start, end), _worker_sets,
+                     csv.writer(out, quoting=csv.QUOTE_ALL).writerow,
+                     csv.writer(simple_out, delimiter="\t").writerow if simple else None,
+                     lambda *entry: decks.append(entry), prices.add if prices is not None else None,
+                     _worker_cards.check if _worker_cards is not None else None)
+    unresolved = dict(_worker_sets.unresolved)
+    _worker_sets.unresolved.clear()
+    card_counts = _worker_cards.take_counts() if _worker_cards is not None else None
+    return out.getvalue(), simple_out.getvalue(), decks, prices, _dates.take_unparseable(), unresolved, card_counts
+
+def process_fast_parallel(
+        path: str,
+        jobs: int,
+        fout: TextIO,
+        sets: SetResolver,
+        simple_fout: Optional[TextIO],
+        deck_writer: DeckExporter,
+        prices: Optional[PriceAnalytics] = None,
+        cards: Optional["CardValidator"] = None,
+        ) -> None:
+    """
+    process_fast() in a process pool: every worker maps the input file and
+    converts its own row-aligned byte ranges; the results are written in the
+    original row order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    csv.writer(fout, quoting=csv.QUOTE_ALL).writerow(MOXFIELD_FIELDS)
+    if simple_fout is not None:
+        csv.writer(simple_fout, delimiter="\t").writerow(SIMPLE_FIELDNAMES)
+    with MappedCsv(path) as data:
+        chunks = data.boundaries(jobs * CHUNKS_PER_JOB)
+    add_deck = deck_writer.add
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(sets, cards)) as pool:
+        top_n = prices.top_n if prices is not None else None
+        futures = [pool.submit(convert_fast_chunk, path, start, end, simple_fout is not None, top_n)
+                   for start, end in chunks]
+        for future in futures:
+            text, simple_text, decks, chunk_prices, unparseable, unresolved, card_counts = future.result()
+            fout.write(text)
+            if simple_fout is not None:
+                simple_fout.write(simple_text)
+            for entry in decks:
+                add_deck(*entry)
+            if chunk_prices is not None:
+                prices.merge(chunk_prices)
+            _dates.merge_unparseable(unparseable)
+            _merge_unresolved(sets, unresolved)
+            if card_counts is not None:
+                cards.add_counts(card_counts)
+
+# --- Incremental processing ----------------------------------------------------
+def _write_csv(filename: str, rows: Iterable[MoxfieldAppRow]) -> None:
+    with open(filename, "w") as fout:
+        writer = csv.DictWriter(fout, fieldnames=MOXFIELD_FIELDS, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        for mox in rows:
+            writer.writerow(mox.to_csv_dict())
+
+def process_incremental(
+        reader: csv.DictReader,
+        sets: SetResolver,
+        state_path: str,
+        deck_writer: DeckExporter,
+        prices: Optional[PriceAnalytics] = None,
+        cards: Optional["CardValidator"] = None,
+        full: bool = False,
+        ) -> "Delta":
+    """
+    Convert only the rows (keyed by Shiny `id`) that were added or changed since
+    the run that wrote `state_path`; with `full`, convert every row and replace
+    the state. Raises incremental.StateFileError if the state can't be used.
+
+    The added and changed rows go to the delta CSV and removed rows to the
+    removed CSV; both are always rewritten, so an unchanged input leaves them
+    empty instead of holding the previous run's delta. When something changed,
+    the full collection outputs are rewritten from the stored rows, and only
+    the deck files whose contents changed are rewritten. The price analytics (if any)
+    always cover every row; the card index check (if any) only the converted
+    rows, and a different index or mode converts every row again.
+    """
+    from incremental import ConversionState, StateFileError, diff, row_hash
+
+    context = f"{CONVERSION_REVISION}:{sets.stamp!r}"
+    if cards is not None:
+        from card_index import validate_row
+
+        context += f":{cards.signature()}"
+    old = ConversionState(context=context) if full else ConversionState.load(state_path, context=context)
+    new = ConversionState(context=old.context)
+    current: Dict[str, MoxfieldAppRow] = {}
+    seen: Dict[str, int] = {}
+    for line_num, row in enumerate(reader, start=2):
+        values = [row.get(k) for k in reader.fieldnames]
+        key = row.get("id") or f"line:{line_num}"
+        n = seen[key] = seen.get(key, 0) + 1
+        if n > 1:
+            key = f"{key}#{n}"  # rows that repeat an id are kept apart
+        digest = row_hash(values)
+        fields = old.get(key, digest)
+        shiny = ShinyAppRow.from_csv_row(row) if fields is None or prices is not None else None
+        if prices is not None:
+            add_prices(prices, shiny)
+        if fields is not None:
+            mox = MoxfieldAppRow(*fields)
+        else:
+            mox = MoxfieldAppRow.from_shiny(shiny, sets)
+            if cards is not None:
+                mox = validate_row(mox, cards)
+        current[key] = mox
+        new.rows[key] = (digest, list(astuple(mox)))
+
+    delta = diff(old, new)
+    if not delta:
+        _write_csv(default_delta_filename, ())
+        _write_csv(default_removed_filename, ())
+        return delta
+
+    try:
+        previous = {key: MoxfieldAppRow(*old.rows[key][1]) for key in delta.changed + delta.removed}
+    except TypeError:
+        raise StateFileError(f"{state_path}: the stored rows don't match this version's output fields")
+    _write_csv(default_delta_filename, (current[key] for key in delta.added + delta.changed))
+    _write_csv(default_removed_filename, (previous[key] for key in delta.removed))
+    _write_csv(default_output_filename, current.values())
+    with open(default_simple_filename, "w") as simple_fout:
+        simple_writer = csv.DictWriter(simple_fout, fieldnames=SIMPLE_FIELDNAMES, delimiter= '\t')
+        simple_writer.writeheader()
+        for mox in current.values():
+            simple_writer.writerow(MoxfieldSimpleRow.from_MoxfieldAppRow(mox).to_csv_dict())
+
+    # a deck is affected if any row entered, left or changed inside it
+    affected = set()
+    for key in delta.added + delta.changed:
+        affected.add(current[key].make_deck_filename())
+    for mox in previous.values():
+        affected.add(mox.make_deck_filename())
+    # every deck goes into the index, but only the affected files are rewritten
+    for mox in current.values():
+        deck_writer.add_row(mox)
+    deck_writer.close(only=affected)
+    remaining = set(deck_writer.filenames())
+    for filename in affected - remaining:
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    new.save(state_path)
+    return delta
 
 def clean_name(name: str) -> str:
-    # remove trailing parenthesis;
-    # "Thornbite Staff (White Border)"
-    new_name = re.sub('\(.*\)', '', name)
-    # remove trailing descriptors
-    # "Mountain - Full Art"
-    new_name = re.sub(' - Full Art$', '', new_name)
-    new_name = re.sub(' - JP Full Art$', '', new_name)
-    # catch some special cards with alternate names embedded
-    # Anguirus, Armored Killer - Gemrazer
-    # Godzilla, Doom Inevitable - Yidaro, Wandering Monster
-    # Godzilla, King of the Monsters - Zilortha, Strength Incarnate
-    # Godzilla, Primeval Champion - Titanoth Rex
-    new_name = re.sub('^.* - ', '', new_name)
-    return new_name.strip()
+    return _normalizer.clean(name)
 
 def append_line_to_file(filename: str, line: str):
     with open(filename, 'a') as fout:
         fout.write(line + '\n')
 
+# --- Profiling -----------------------------------------------------------------
+def install_profiling(sets: SetResolver, *writers: csv.DictWriter) -> None:
+    """
+    Wrap the conversion stages in timing wrappers. Only called when profiling
+    is enabled; stages run in --jobs worker processes are not included. The
+    fast and columnar engines time their own csv.writer calls and row reading
+    (see _timed), as csv.writer objects can't be patched.
+    """
+    module = sys.modules[__name__]
+    PROFILER.instrument(ShinyAppRow, "from_csv_row", "ShinyAppRow.from_csv_row")
+    PROFILER.instrument(MoxfieldAppRow, "from_shiny", "MoxfieldAppRow.from_shiny")
+    PROFILER.instrument(module, "clean_name")
+    PROFILER.instrument(module, "_edition_code")
+    PROFILER.instrument(module, "_format_last_modified")
+    PROFILER.instrument(module, "_purchase_price")
+    PROFILER.instrument(module, "read_csv_columns", "csv read")
+    PROFILER.instrument(DateNormalizer, "format_column", "last_modified column")
+    PROFILER.instrument(DeckExporter, "add", "deck add")
+    PROFILER.instrument(DeckExporter, "write", "deck write")
+    for writer in writers:
+        if writer is not None:
+            PROFILER.instrument(writer, "writerow", "csv write")
+    PROFILER.add_cache("clean_name", _normalizer.stats)
+    PROFILER.add_cache("set fuzzy match", sets.stats)
+    PROFILER.add_cache("last_modified", _dates.stats)
+
+def _timed(name: str, fn: Callable) -> Callable:
+    """fn, in a timing wrapper when profiling is enabled."""
+    return PROFILER.wrap(name, fn) if PROFILER.enabled else fn
+
+def _reader(f) -> Iterable[Dict[str, Any]]:
+    reader = csv.DictReader(f)
+    if PROFILER.enabled:
+        reader.fieldnames  # read the header outside of the timed rows
+        return PROFILER.wrap_iter("csv read", reader)
+    return reader
+
 # --- CLI -----------------------------------------------------------------------
 def parse_args(argv: List[str]) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Convert ShinyApp CSV rows to Moxfield CSV format.")
     p.add_argument("input", help="Path to input CSV file (use '-' for stdin)")
+    p.add_argument("-o", "--output", default=default_output_filename,
+                   help="Path to the Moxfield CSV to write (use '-' for stdout, which also turns off "
+                        "the simple TSV and deck files unless they are asked for explicitly)")
+    p.add_argument("--simple-output", help=f"Path to the simple TSV (default: {default_simple_filename}; "
+                                           "use '' to skip it)")
+    p.add_argument("--decks", action=argparse.BooleanOptionalAction, default=None,
+                   help="Write deck_<group_name>.txt files (default: on, unless writing to stdout)")
     p.add_argument("--sets", default=default_sets_json, help="Path to JSON file with { 'Set Name': 'setcode', ... }")
-    return p.parse_args(argv)
+    p.add_argument("--set-codes", default=default_set_codes_csv,
+                   help="Path to Moxfield set codes CSV, used before the other set sources")
+    p.add_argument("--catalogue",
+                   help="Set catalogue built by set_catalogue.py, used after --set-codes, before --sets "
+                        "(default: mtg_sets_catalogue.json, if it exists)")
+    p.add_argument("--set-index", default=default_index_file, help="Path to the compiled set index cache")
+    p.add_argument("--max-open-files", type=int, default=DEFAULT_MAX_OPEN_FILES,
+                   help="Maximum number of deck files kept open (or written) at once")
+    p.add_argument("--profile", nargs="?", const="", metavar="JSON_PATH",
+                   help="Print per-stage timings to stderr (and write them as JSON to JSON_PATH); "
+                        "also enabled by MTG_PROFILE=1 or MTG_PROFILE=path.json")
+    p.add_argument("--engine", choices=["rows", "fast", "columnar"], default="rows",
+                   help="rows: one dataclass per row (default); fast: tuple-based path that reads only the "
+                        "needed columns of a memory-mapped input file; columnar: loads whole columns and converts "
+                        "each distinct value once. All engines produce identical output")
+    p.add_argument("-j", "--jobs", type=int, default=1,
+                   help="Convert the input in N worker processes (file input only; rows and fast engines)")
+    p.add_argument("--aggregate", action="store_true",
+                   help="Write one row per distinct printing (name, edition, collector number, foil, condition, "
+                        "language, proxy) with the counts added up; deck files still list every row")
+    p.add_argument("--aggregate-max-keys", type=int, default=DEFAULT_MAX_KEYS,
+                   help="Distinct printings to hold in memory before --aggregate spills to temporary files")
+    p.add_argument("--incremental", metavar="STATE_FILE",
+                   help="Only convert rows that changed since the run that wrote STATE_FILE, "
+                        f"writing them to {default_delta_filename} (removed rows to {default_removed_filename})")
+    p.add_argument("--full", action="store_true",
+                   help="With --incremental: ignore STATE_FILE, convert every row and write a new STATE_FILE")
+    p.add_argument("--price-report", metavar="JSON_PATH",
+                   help="Write value / paid totals per set, group and rarity and the most valuable cards "
+                        "to JSON_PATH, and print a summary to stderr")
+    p.add_argument("--top", type=int, default=DEFAULT_TOP_N,
+                   help="Number of most valuable cards in the --price-report")
+    p.add_argument("--validate-cards", action="store_true",
+                   help="Check every Name / Edition / Collector Number against the card index and report the "
+                        "rows Moxfield would not recognize (build the index with card_index.py, or use --card-data)")
+    p.add_argument("--fix-cards", action="store_true",
+                   help="Like --validate-cards, but replace mismatches with the suggested value when there is one")
+    p.add_argument("--card-data", metavar="SCRYFALL_JSON",
+                   help="Scryfall bulk-data file to (re)build the card index from when it is missing or out of date")
+    p.add_argument("--card-index", default=default_card_index_file, help="Path to the compiled card index")
+    p.add_argument("--validation-report", metavar="JSON_PATH",
+                   help="Write the card index mismatches as JSON to JSON_PATH (implies --validate-cards)")
+    args = p.parse_args(argv)
+    args.validate_cards = args.validate_cards or args.fix_cards or bool(args.validation_report)
+    streaming = args.output == "-"
+    if args.simple_output is None:
+        args.simple_output = "" if streaming else default_simple_filename
+    if args.decks is None:
+        args.decks = not streaming
+    if args.incremental and (streaming or args.output != default_output_filename
+                             or args.simple_output != default_simple_filename or not args.decks):
+        p.error("--incremental always writes the default output files")
+    if args.full and not args.incremental:
+        p.error("--full only applies to --incremental")
+    if args.engine != "rows" and args.incremental:
+        p.error(f"--engine {args.engine} cannot be combined with --incremental")
+    if args.engine == "columnar" and args.jobs > 1:
+        p.error("--engine columnar cannot be combined with --jobs")
+    if args.aggregate and (args.engine != "rows" or args.incremental):
+        p.error("--aggregate only works with the default rows engine, without --incremental")
+    if args.top < 0:
+        p.error("--top must not be negative")
+    return args
+
+def finish_prices(prices: Optional[PriceAnalytics], path: Optional[str]) -> None:
+    if prices is not None:
+        prices.write(path)
+        print_summary(prices)
+
+def load_cards(args: argparse.Namespace) -> Optional["CardValidator"]:
+    if not args.validate_cards:
+        return None
+    from card_index import CardValidator, load_card_index
+
+    return CardValidator(load_card_index(args.card_data, args.card_index), fix=args.fix_cards)
+
+def finish_cards(cards: Optional["CardValidator"], path: Optional[str]) -> None:
+    if cards is None:
+        return
+    from card_index import report_issues
+
+    print(f"cards: {cards.rows} rows checked, {cards.flagged} do not match the card index, "
+          f"{cards.corrected} corrected", file=sys.stderr)
+    report_issues(cards)
+    if path:
+        cards.write(path)
 
 def main() -> int:
     args = parse_args(sys.argv[1:])
-    exact_map, ci_map = load_set_mapping(args.sets)
+    if args.profile is not None:
+        PROFILER.enable(args.profile or None)
+    else:
+        PROFILER.enable_from_env()
+    sets = load_set_resolver([args.set_codes] + catalogue_sources(args.catalogue) + [args.sets],
+                             args.set_index, lazy=True)
+    prices = PriceAnalytics(args.top) if args.price_report else None
+    cards = load_cards(args)
+
+    if args.incremental:
+        from incremental import StateFileError
+
+        if PROFILER.enabled:
+            install_profiling(sets)
+        try:
+            with DeckExporter(sets, max_open_files=args.max_open_files) as deck_writer:
+                if args.input == "-":
+                    delta = process_incremental(csv.DictReader(sys.stdin), sets, args.incremental, deck_writer,
+                                                prices, cards, args.full)
+                else:
+                    with open(args.input, "r", newline="", encoding="utf-8") as f:
+                        delta = process_incremental(csv.DictReader(f), sets, args.incremental, deck_writer,
+                                                    prices, cards, args.full)
+        except StateFileError as e:
+            print(f"ERROR: {e}\nRun again with --full to convert every row and write a new state file.",
+                  file=sys.stderr)
+            return 2
+        print(f"incremental: {delta.summary()}", file=sys.stderr)
+        finish_prices(prices, args.price_report)
+        finish_cards(cards, args.validation_report)
+        report_unresolved(sets)
+        report_unparseable(_dates)
+        PROFILER.finish()
+        return 0
 
-    # writer = csv.DictWriter(sys.stdout, fieldnames=MOXFIELD_FIELDS, quoting=csv.QUOTE_ALL)
-    output_filename = default_output_filename
-    fout = open(output_filename, "w")
+    # stdout streaming keeps memory flat for the rows / fast engines: rows are
+    # written as they are read, and no per-deck buffers exist without --decks
+    fout = sys.stdout if args.output == "-" else open(args.output, "w")
     writer = csv.DictWriter(fout, fieldnames=MOXFIELD_FIELDS, quoting=csv.QUOTE_ALL)
 
-    simple_fout = open("collection_simple.tsv", "w")
-    simple_writer = csv.DictWriter(simple_fout, fieldnames=SIMPLE_FIELDNAMES, delimiter= '\t')
+    simple_fout = simple_writer = None
+    if args.simple_output:
+        simple_fout = open(args.simple_output, "w")
+        simple_writer = csv.DictWriter(simple_fout, fieldnames=SIMPLE_FIELDNAMES, delimiter= '\t')
+    if PROFILER.enabled:
+        install_profiling(sets, writer, simple_writer)
 
-    if args.input == "-":
-        reader = csv.DictReader(sys.stdin)
-        process(reader, writer, exact_map, ci_map, simple_writer)
-    else:
-        with open(args.input, "r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            process(reader, writer, exact_map, ci_map, simple_writer)
+    aggregator = Aggregator(max_keys=args.aggregate_max_keys) if args.aggregate else None
+    deck_writer_cls = DeckExporter if args.decks else NullDeckExporter
+    try:
+        with deck_writer_cls(sets, max_open_files=args.max_open_files) as deck_writer:
+            if args.jobs > 1 and args.input != "-" and args.engine == "fast":
+                process_fast_parallel(args.input, args.jobs, fout, sets, simple_fout, deck_writer, prices, cards)
+            elif args.jobs > 1 and args.input != "-":
+                process_parallel(args.input, args.jobs, writer, sets, simple_writer, deck_writer, aggregator,
+                                 prices, cards)
+            elif args.engine in ENGINES:
+                engine = ENGINES[args.engine]
+                if args.input == "-":
+                    engine(sys.stdin, fout, sets, simple_fout, deck_writer, prices, cards)
+                else:
+                    with open(args.input, "r", newline="", encoding="utf-8") as f:
+                        engine(f, fout, sets, simple_fout, deck_writer, prices, cards)
+            elif args.input == "-":
+                reader = _reader(sys.stdin)
+                process(reader, writer, sets, simple_writer, deck_writer, aggregator, prices, cards)
+            else:
+                with open(args.input, "r", newline="", encoding="utf-8") as f:
+                    reader = _reader(f)
+                    process(reader, writer, sets, simple_writer, deck_writer, aggregator, prices, cards)
+    finally:
+        if aggregator is not None:
+            aggregator.close()  # removes its spill files, also after an error
 
+    fout.flush()
+    finish_prices(prices, args.price_report)
+    finish_cards(cards, args.validation_report)
+    report_unresolved(sets)
+    report_unparseable(_dates)
+    PROFILER.finish()
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # downstream of a pipe went away (e.g. `| head`); don't print a traceback
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -0,0 +1 @@
+tcgplayer_to_moxfield.py
\ No newline at end of file
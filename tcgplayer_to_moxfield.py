@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+import sys
+import csv
+import argparse
+import os
+from typing import TYPE_CHECKING, List, Optional #Dict, Any, , Tuple
+
+from card_names import get_normalizer
+from prices import DEFAULT_TOP_N, PriceAnalytics, print_summary
+from set_index import (SetResolver, catalogue_sources, default_index_file, default_sets_json,
+                       load_set_resolver, report_unresolved)
+
+if TYPE_CHECKING:
+    from card_index import CardValidator  # imported when card validation is asked for
+
+# USAGE:
+# copy / paste the table from the page here https://store.tcgplayer.com/collection into a .csv file
+# then run this script against it
+# then import the output to https://moxfield.com/collection
+# add --price-report prices.json for value totals per set and the most valuable
+# cards (using the Mid price)
+# add --validate-cards (or --fix-cards) to check the names and set codes against
+# the card index built by card_index.py before importing
+
+# example TCGPlayer collection table format;
+
+# Have,Want,Trade,Name,Set,Low,Mid,High
+# 1,0,0, Youthful Valkyrie (Borderless) - [Foil],Foundations,$0.44,$0.79,$9.64
+# 1,0,0," Ruby, Daring Tracker",Foundations,$0.03,$0.20,"$1,000.12"
+# 1,0,0," Giada, Font of Hope",Foundations,$0.50,$1.26,$7.61
+# 4,0,0, Plains (0282) - [Foil],Foundations,$0.19,$0.68,$99.97
+# 10,0,0, Plains (0283) - [Foil],Foundations,$0.15,$0.42,$8.69
+# 1,0,0, Angel of Finality,Foundations,$0.01,$0.20,$20.00
+# 1,0,0, Forest (0291) - [Foil],Foundations,$0.13,$0.55,$99.90
+# 5,0,0, Forest (0290) - [Foil],Foundations,$0.05,$0.38,$8.69
+# 10,0,0, Mountain (0289) - [Foil],Foundations,$0.08,$0.31,$99.81
+
+this_file_path = os.path.realpath(__file__)
+this_dir_path = os.path.dirname(this_file_path)
+set_codes_file = os.path.join(this_dir_path, "moxfield_set_codes.csv" )# https://moxfield.com/sets
+default_card_index_file = os.path.join(this_dir_path, "mtg_cards.idx")  # card_index.default_index_file
+default_output_filename = "tcgplayer-converted-collection.csv"
+_normalizer = get_normalizer("tcgplayer")
+
+# --- Output CSV schema ---------------------------------------------------------
+MOXFIELD_FIELDS: List[str] = [
+    "Count",
+    "Tradelist Count",
+    "Name",
+    "Edition",
+    "Condition",
+    "Language",
+    "Foil",
+    "Tags",
+    "Last Modified",
+    "Collector Number",
+    "Alter",
+    "Proxy",
+    "Playtest Card",
+    "Purchase Price",
+]
+
+def clean_name(name: str) -> str:
+    return _normalizer.clean(name)
+
+
+def process(reader: csv.DictReader, writer: csv.DictWriter, sets: Optional[SetResolver] = None,
+            prices: Optional[PriceAnalytics] = None, cards: Optional["CardValidator"] = None) -> None:
+    if sets is None:
+        sets = load_set_resolver(lazy=True)
+
+    # start writing output
+    writer.writeheader()
+    for row in reader:
+        is_foil = ""
+        if "[foil]" in row["Name"].lower():
+            is_foil = "TRUE"
+        output_row = {
+            "Count": row["Have"],
+            "Name": clean_name(row["Name"]),
+            "Edition": sets.resolve(row["Set"]) or "",
+            "Foil": is_foil
+        }
+        if cards is not None:
+            # the table has no collector numbers
+            output_row["Name"], output_row["Edition"], _ = cards.check(output_row["Name"], output_row["Edition"], "")
+        writer.writerow(output_row)
+        if prices is not None:
+            # the table has no purchase prices, only market prices
+            prices.add(output_row["Name"], row["Set"], "", "", row["Have"],
+                       value_per_unit=row.get("Mid") or "", currency="USD")
+
+
+# --- CLI -----------------------------------------------------------------------
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Convert TCGPlayer Collection CSV rows to Moxfield CSV format.")
+    p.add_argument("input", help="Path to input CSV file (use '-' for stdin)")
+    p.add_argument("-o", "--output", default=default_output_filename,
+                   help="Path to the Moxfield CSV to write (use '-' for stdout)")
+    p.add_argument("--set-codes", default=set_codes_file,
+                   help="Path to Moxfield set codes CSV, used before the other set sources")
+    p.add_argument("--catalogue", help="Set catalogue built by set_catalogue.py, used after --set-codes "
+                                       "(default: mtg_sets_catalogue.json, if it exists)")
+    p.add_argument("--set-index", default=default_index_file, help="Path to the compiled set index cache")
+    p.add_argument("--price-report", metavar="JSON_PATH",
+                   help="Write value totals per set and the most valuable cards (by Mid price) to JSON_PATH, "
+                        "and print a summary to stderr")
+    p.add_argument("--top", type=int, default=DEFAULT_TOP_N,
+                   help="Number of most valuable cards in the --price-report")
+    p.add_argument("--validate-cards", action="store_true",
+                   help="Check every Name / Edition against the card index and report the rows Moxfield would "
+                        "not recognize (build the index with card_index.py, or use --card-data)")
+    p.add_argument("--fix-cards", action="store_true",
+                   help="Like --validate-cards, but replace mismatches with the suggested value when there is one")
+    p.add_argument("--card-data", metavar="SCRYFALL_JSON",
+                   help="Scryfall bulk-data file to (re)build the card index from when it is missing or out of date")
+    p.add_argument("--card-index", default=default_card_index_file, help="Path to the compiled card index")
+    p.add_argument("--validation-report", metavar="JSON_PATH",
+                   help="Write the card index mismatches as JSON to JSON_PATH (implies --validate-cards)")
+    args = p.parse_args(argv)
+    args.validate_cards = args.validate_cards or args.fix_cards or bool(args.validation_report)
+    if args.top < 0:
+        p.error("--top must not be negative")
+    return args
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+    sets = load_set_resolver([args.set_codes] + catalogue_sources(args.catalogue) + [default_sets_json],
+                             args.set_index, lazy=True)
+    prices = PriceAnalytics(args.top) if args.price_report else None
+    cards = None
+    if args.validate_cards:
+        from card_index import CardValidator, load_card_index
+        cards = CardValidator(load_card_index(args.card_data, args.card_index), fix=args.fix_cards)
+
+    fout = sys.stdout if args.output == "-" else open(args.output, "w")
+    writer = csv.DictWriter(fout, fieldnames=MOXFIELD_FIELDS, quoting=csv.QUOTE_ALL)
+
+    if args.input == "-":
+        reader = csv.DictReader(sys.stdin)
+        process(reader, writer, sets, prices, cards)
+    else:
+        with open(args.input, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            process(reader, writer, sets, prices, cards)
+
+    fout.flush()
+    if prices is not None:
+        prices.write(args.price_report)
+        print_summary(prices)
+    if cards is not None:
+        from card_index import report_issues
+        report_issues(cards)
+        if args.validation_report:
+            cards.write(args.validation_report)
+    report_unresolved(sets)
+    return 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # downstream of a pipe went away (e.g. `| head`); don't print a traceback
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
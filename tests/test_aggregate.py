@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+
+import pytest
+
+from aggregate import Aggregator
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+
+
+def test_spill_files_are_removed_when_the_conversion_fails(tmp_path):
+    spill = tmp_path / "tmp"
+    spill.mkdir()
+    with open(EXAMPLE, "rb") as f:
+        data = f.read()
+    (tmp_path / "in.csv").write_bytes(data + b"\xff\n")  # fails to decode after many rows were added
+    run = subprocess.run([sys.executable, os.path.join(REPO, "shiny_to_moxfield.py"), "in.csv",
+                          "--aggregate", "--aggregate-max-keys", "1"],
+                         cwd=tmp_path, capture_output=True, text=True, env=dict(os.environ, TMPDIR=str(spill)))
+    assert "UnicodeDecodeError" in run.stderr
+    assert os.listdir(spill) == []
+
+
+@dataclass
+class Row:
+    name: str
+    last_modified: str
+    edition: str = "lea"
+    collector_number: str = ""
+    foil: str = ""
+    condition: str = ""
+    language: str = ""
+    proxy: str = ""
+    count: str = "1"
+    tradelist_count: str = ""
+    tags: str = ""
+
+
+@pytest.mark.parametrize("max_keys", [10, 1])  # merged in memory, merged from spill partitions
+@pytest.mark.parametrize("dates,newest", [
+    (["2024-01-01 10:00:00.000000", "2025-06-01 10:00:00.000000"], "2025-06-01 10:00:00.000000"),
+    (["", "2025-06-01 10:00:00.000000"], "2025-06-01 10:00:00.000000"),
+    (["2024-01-01 10:00:00.000000", "sometime"], "2024-01-01 10:00:00.000000"),
+    (["31/12/2023", "2025-06-01 10:00:00.000000"], "31/12/2023"),
+])
+def test_only_normalized_last_modified_dates_are_compared(tmp_path, max_keys, dates, newest):
+    with Aggregator(max_keys=max_keys, spill_dir=str(tmp_path)) as merged:
+        for date in dates:
+            merged.add(Row("Black Lotus", date))
+            merged.add(Row("Mox Pearl", date))
+        rows = list(merged.rows())
+    assert [(r.name, r.count, r.last_modified) for r in sorted(rows, key=lambda r: r.name)] == [
+        ("Black Lotus", "2", newest), ("Mox Pearl", "2", newest)]
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from card_index import CardIndex, CardValidator, build_index
+
+CARDS = [
+    {"name": "Sol Ring", "set": "cmr", "collector_number": "472"},
+    {"name": "Sol Ring", "set": "c21", "collector_number": "263"},
+    {"name": "Lightning Bolt", "set": "m10", "collector_number": "146"},
+    {"name": "Serra Angel", "set": "dom", "collector_number": "33"},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    source = tmp_path / "cards.json"
+    source.write_text(json.dumps(CARDS), encoding="utf-8")
+    path = str(tmp_path / "cards.idx")
+    build_index(str(source), path)
+    with CardIndex(path) as index:
+        yield index
+
+
+@pytest.mark.parametrize("number,expected", [
+    ("0472", "472"),   # zero-padded
+    ("?", "472"),      # not a number
+    ("999", "999"),    # a real number that is not in the set
+    ("", ""),          # left to Moxfield
+])
+def test_fix_only_replaces_numbers_that_cannot_be_right(index, number, expected):
+    cards = CardValidator(index, fix=True)
+    assert cards.check("Sol Ring", "cmr", number) == ("Sol Ring", "cmr", expected)
+
+
+def test_wrong_number_is_reported_without_a_suggestion(index):
+    cards = CardValidator(index, fix=True)
+    cards.check("Sol Ring", "cmr", "999")
+    assert cards.issues == {("collector number", "Sol Ring", "999", "", False): 1}
+    assert cards.corrected == 0
+
+
+def test_treatment_words_are_dropped_from_a_name(index):
+    cards = CardValidator(index, fix=True)
+    assert cards.check("Sol Ring Borderless Extended Art", "cmr", "472") == ("Sol Ring", "cmr", "472")
+    assert cards.corrected == 1
+
+
+@pytest.mark.parametrize("edition,number", [
+    ("fdn", "12"),   # a set newer than the index
+    ("dom", "33"),   # a set the guessed card is in
+    ("m10", "12"),   # a set the guessed card is not in
+])
+def test_a_card_newer_than_the_index_is_reported_not_renamed(index, edition, number):
+    cards = CardValidator(index, fix=True)
+    row = ("Serra Angel's Grace", edition, number)
+    assert cards.check(*row) == row
+    assert cards.issues == {("name", row[0], row[0], "Serra Angel", False): 1}
+    assert cards.corrected == 0
+
+
+def test_edition_is_not_moved_for_a_guessed_name(index):
+    cards = CardValidator(index, fix=True)
+    assert cards.check("Serra Angel Showcase", "m10", "33") == ("Serra Angel", "m10", "33")
+    assert ("edition", "Serra Angel", "m10", "dom", False) in cards.issues
+
+
+def test_known_card_in_a_set_newer_than_the_index_is_left_alone(index):
+    cards = CardValidator(index, fix=True)
+    assert cards.check("Sol Ring", "fdn", "1") == ("Sol Ring", "fdn", "1")
+    assert cards.issues == {("edition", "Sol Ring", "fdn", "", False): 1}
+    assert cards.report()["issues"][0]["corrected"] is False
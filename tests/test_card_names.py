@@ -0,0 +1,26 @@
+import pytest
+
+from card_names import NameNormalizer, SHINY_RULES, clean_name
+
+
+@pytest.mark.parametrize("name,source,expected", [
+    ("Thornbite Staff (White Border)", "shiny", "Thornbite Staff"),
+    ("Mountain - Full Art", "shiny", "Mountain"),
+    ("Godzilla, Primeval Champion - Titanoth Rex", "shiny", "Titanoth Rex"),
+    (" Youthful Valkyrie (Borderless) - [Foil]", "tcgplayer", "Youthful Valkyrie"),
+    (" Plains (0282) - [Foil]", "tcgplayer", "Plains"),
+    ("Sol Ring", "tcgplayer", "Sol Ring"),
+])
+def test_each_source_has_its_own_rules(name, source, expected):
+    assert clean_name(name, source) == expected
+
+
+def test_unknown_source_is_an_error():
+    with pytest.raises(ValueError):
+        clean_name("Sol Ring", "moxfield")
+
+
+def test_repeated_names_are_cleaned_once():
+    names = NameNormalizer(SHINY_RULES, maxsize=2)
+    assert [names.clean(n) for n in ["Forest - Full Art"] * 3 + ["Island (Showcase)"]] == ["Forest"] * 3 + ["Island"]
+    assert names.stats() == {"hits": 2, "misses": 2, "size": 2}
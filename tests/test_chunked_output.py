@@ -0,0 +1,62 @@
+import csv
+import hashlib
+import os
+
+import pytest
+
+from chunked_output import ChunkedCsvWriter
+
+FIELDS = ["Count", "Name", "Group"]
+
+
+def _read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_groups_with_the_same_slug_get_their_own_files(tmp_path):
+    base = str(tmp_path / "out.csv")
+    groups = ["Red Binder", "Red/Binder", "Red_Binder", "", "ungrouped"]
+    with ChunkedCsvWriter(base, FIELDS, group_by="Group") as writer:
+        for i, group in enumerate(groups):
+            writer.writerow([str(i), f"Card {i}", group], group)
+    manifest = writer.manifest()
+
+    files = [c["file"] for c in manifest["chunks"]]
+    assert len(files) == len(set(files)) == len(groups)
+    rows = []
+    for chunk in manifest["chunks"]:
+        path = os.path.join(tmp_path, chunk["file"])
+        chunk_rows = _read_rows(path)
+        assert [row[2] for row in chunk_rows] == [chunk["group"]]
+        with open(path, "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest() == chunk["sha256"]
+        rows.extend(chunk_rows)
+    assert sorted(row[1] for row in rows) == [f"Card {i}" for i in range(len(groups))]
+
+
+def test_group_keeps_its_file_name_across_chunks(tmp_path):
+    base = str(tmp_path / "out.csv")
+    with ChunkedCsvWriter(base, FIELDS, max_rows=1, group_by="Group") as writer:
+        for group in ["a b", "a/b", "a b", "a/b"]:
+            writer.writerow(["1", "Card", group], group)
+    chunks = writer.manifest()["chunks"]
+    names = {group: {c["file"].rsplit("-", 1)[0] for c in chunks if c["group"] == group}
+             for group in ("a b", "a/b")}
+    assert all(len(stems) == 1 for stems in names.values())
+    assert names["a b"] != names["a/b"]
+    assert len({c["file"] for c in chunks}) == 4
+
+
+def test_a_failed_conversion_leaves_no_manifest(tmp_path):
+    base = str(tmp_path / "out.csv")
+    with ChunkedCsvWriter(base, FIELDS, max_rows=1) as writer:
+        writer.writerow(["1", "Card", ""])
+    assert os.path.exists(writer.manifest_path)
+
+    with pytest.raises(RuntimeError):
+        with ChunkedCsvWriter(base, FIELDS, max_rows=1) as writer:
+            for i in range(3):
+                writer.writerow([str(i), f"Card {i}", ""])
+            raise RuntimeError("conversion failed")
+    assert not os.path.exists(writer.manifest_path)
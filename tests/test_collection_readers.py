@@ -0,0 +1,61 @@
+import csv
+import io
+import os
+import subprocess
+import sys
+
+from collection_readers import detect_format
+from set_index import load_set_resolver
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+
+
+def test_padded_header_names_are_detected_and_read():
+    text = ("Count, Tradelist Count, Name, Edition, Edition Code, Card Number, Condition\n"
+            "2,0,Sol Ring,Commander Legends,cmr,472,Near Mint\n")
+    reader = detect_format(text.splitlines()[0].split(","))
+    assert reader.name == "deckbox"
+    [row] = reader.rows(io.StringIO(text), load_set_resolver(lazy=True))
+    assert (row.count, row.name, row.edition, row.collector_number, row.condition) == \
+        ("2", "Sol Ring", "cmr", "472", "Near Mint")
+
+
+def _run(tmp_path, script, *args):
+    subprocess.run([sys.executable, os.path.join(REPO, script), *args], cwd=tmp_path, check=True,
+                   capture_output=True)
+    return {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path) if name != "in.csv"}
+
+
+def test_ungrouped_shiny_rows_get_the_same_deck_file_as_shiny_to_moxfield(tmp_path):
+    with open(EXAMPLE, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    group = rows[0].index("group_name")
+    for row in rows[1::3]:
+        row[group] = ""
+    for name in ("shiny", "collection"):
+        (tmp_path / name).mkdir()
+        with open(tmp_path / name / "in.csv", "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+
+    expected = _run(tmp_path / "shiny", "shiny_to_moxfield.py", "in.csv")
+    assert "deck_.txt" in expected
+    assert _run(tmp_path / "collection", "convert_collection.py", "in.csv",
+                "-o", "moxfield-converted-collection.csv") == expected
+
+
+def test_batch_mode_reports_unparseable_timestamps_of_every_input(tmp_path):
+    with open(EXAMPLE, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    date_added = rows[0].index("date_added")
+    for name, bad in (("a.csv", rows[1]), ("b.csv", rows[2])):
+        bad[date_added] = "sometime"
+        with open(tmp_path / name, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+        bad[date_added] = rows[3][date_added]
+    for jobs in ("1", "2"):
+        result = subprocess.run([sys.executable, os.path.join(REPO, "convert_collection.py"), "a.csv", "b.csv",
+                                 "--out-dir", f"out{jobs}", "-j", jobs], cwd=tmp_path, check=True,
+                                capture_output=True, text=True)
+        assert "2 timestamp(s) could not be parsed" in result.stderr
+        assert "'sometime' (2 rows)" in result.stderr
@@ -0,0 +1,106 @@
+import asyncio
+
+from conversion_server import ConversionServer
+
+
+async def _wait_for(condition, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_a_failed_reload_does_not_stop_the_source_watcher(tmp_path):
+    source = tmp_path / "sets.json"
+    source.write_text('{"Alpha": "lea"}')
+    server = ConversionServer([str(source)], None, workers=1, reload_interval=0.01, quiet=True)
+
+    async def run():
+        watcher = asyncio.create_task(server.watch_sources())
+        source.write_text('{"sets": [{"name": "Alpha"}]}')  # catalogue entry without a code: KeyError
+        await _wait_for(lambda: server.reload_errors == 1)
+        assert "KeyError" in server.last_reload_error
+        source.write_text('{"Beta": "leb"}')
+        await _wait_for(lambda: server.reloads == 1)
+        assert not watcher.done()
+        watcher.cancel()
+
+    asyncio.run(run())
+    assert server.sets.resolve("Beta") == "leb"
+
+
+def test_expect_100_continue_gets_an_interim_response(tmp_path):
+    source = tmp_path / "sets.json"
+    source.write_text('{"Alpha": "lea"}')
+    server = ConversionServer([str(source)], None, workers=1, quiet=True)
+    body = b"Have,Name,Set\r\n2,Black Lotus,Alpha\r\n"
+
+    async def run():
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"POST /convert HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                     b"Expect: 100-continue\r\nContent-Length: %d\r\n\r\n" % len(body))
+        await writer.drain()
+        interim = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        writer.write(body)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        server.pool.shutdown()
+        return interim, response
+
+    interim, response = asyncio.run(run())
+    assert interim == b"HTTP/1.1 100 Continue\r\n\r\n"
+    assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b'"2","","Black Lotus","lea"' in response
+
+
+async def _post(server, body):
+    listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"POST /convert HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return response
+
+
+def test_each_response_reports_its_own_unresolved_sets_and_dates(tmp_path):
+    source = tmp_path / "sets.json"
+    source.write_text('{"Alpha": "lea"}')
+    server = ConversionServer([str(source)], None, workers=2, quiet=True)
+    bad = (b"product_name,set_name,quantity,date_added\r\n"
+           b"Black Lotus,No Such Set,1,sometime\r\n"
+           b"Mox Pearl,No Such Set,1,2025-08-11T15:42:20.783\r\n")
+    good = b"product_name,set_name,quantity,date_added\r\nBlack Lotus,Alpha,1,2025-08-11T15:42:20.783\r\n"
+
+    async def run():
+        responses = [await _post(server, bad), await _post(server, good)]
+        server.pool.shutdown()
+        return responses
+
+    bad_response, good_response = asyncio.run(run())
+    assert b"Trailer: X-Unresolved-Sets, X-Unparseable-Dates\r\n" in bad_response
+    assert bad_response.endswith(b"0\r\nX-Unresolved-Sets: 2\r\nX-Unparseable-Dates: 1\r\n\r\n")
+    assert good_response.endswith(b"0\r\nX-Unresolved-Sets: 0\r\nX-Unparseable-Dates: 0\r\n\r\n")
+    assert server.sets.unresolved == {}
+    assert server.metrics_snapshot()["set_index"]["unresolved_rows"] == 2
+
+
+def test_the_fuzzy_match_cache_is_bounded(monkeypatch):
+    import set_index
+
+    monkeypatch.setattr(set_index, "FUZZY_CACHE_SIZE", 10)
+    sets = set_index.SetResolver.from_pairs([("Limited Edition Alpha", "lea")])
+    for i in range(25):
+        sets.resolve(f"Unknown Set {i}")
+    assert sets.stats()["size"] <= 10
+    assert sets.stats()["misses"] == 25
@@ -0,0 +1,86 @@
+import csv
+import io
+
+import pytest
+
+import csv_chunks
+from csv_chunks import MappedCsv
+
+HEADER = b"Have,Name,Set,Low\n"
+ROWS = [
+    b'1,Sol Ring,Commander Legends,"$1,000.12"\n',
+    b'2,"Black Lotus\nAlpha, ""Limited""",Limited Edition Alpha,"$25,000.00"\n',
+    b"3,Forest,Alpha,$0.10\n",
+    b'4,"Giada, Font of Hope",Streets of New Capenna,"$2,001.50"\r\n',
+    b'5,"line one\r\nline two\nline three",Alpha,"$3.00"\n',
+    b"6,Island,Alpha\n",   # short row
+    b"\n",                 # blank line
+    b'7,"""Quoted""",Alpha,"$1,234,567.89"\n',
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_bytes(HEADER + b"".join(ROWS * 20))
+    return str(path)
+
+
+def _row_starts():
+    starts, pos = set(), len(HEADER)
+    for row in ROWS * 20:
+        starts.add(pos)
+        pos += len(row)
+    return starts | {pos}
+
+
+def _expected(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [row for row in reader if row]
+
+
+@pytest.mark.parametrize("block_size", [5, 64, 1 << 20])
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 50, 500])
+def test_regions_start_on_rows_and_read_like_csv_reader(path, monkeypatch, block_size, parts):
+    monkeypatch.setattr(csv_chunks, "BLOCK_SIZE", block_size)
+    with MappedCsv(path) as data:
+        regions = data.boundaries(parts)
+        assert len(regions) == parts if parts <= 50 else len(regions) > 100  # ~5.9 kB, 160 rows
+        assert regions[0][0] == data.data_start
+        assert regions[-1][1] == data.size
+        assert all(end == start for (_, end), (start, _) in zip(regions, regions[1:]))
+        assert {start for start, _ in regions} <= _row_starts()
+        records = [row for start, end in regions for row in data.records(start, end)]
+        text = [row for start, end in regions for row in csv.reader(data.text(start, end)) if row]
+    assert records == _expected(path)
+    assert text == _expected(path)
+
+
+def test_rows_follow_dictreader_semantics(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_bytes(b"Name,Set,Name,Low\n"
+                     b'Sol Ring,cmr,Sol Ring (Foil),"$1,000.12"\n'
+                     b"Forest,lea\n"
+                     b"Island,lea,Island,$0.10,extra\n")
+    with MappedCsv(str(path)) as data:
+        rows = list(data.rows(["Name", "Low", "Missing"]))
+    with open(path, newline="") as f:
+        expected = [(r["Name"] or "", r["Low"] or "", r.get("Missing", "")) for r in csv.DictReader(f)]
+    assert rows == expected == [("Sol Ring (Foil)", "$1,000.12", ""), ("", "", ""), ("Island", "$0.10", "")]
+
+
+def test_empty_files_and_streams(tmp_path):
+    empty = tmp_path / "empty.csv"
+    empty.write_bytes(b"")
+    with MappedCsv(str(empty)) as data:
+        assert data.header == [] and data.boundaries(4) == []
+    assert MappedCsv.from_file(io.StringIO("Name\nForest\n")) is None
+    full = tmp_path / "full.csv"
+    full.write_bytes(HEADER + ROWS[0])
+    with open(full, "rb") as f:
+        with MappedCsv.from_file(f) as data:
+            assert list(data.records()) == [["1", "Sol Ring", "Commander Legends", "$1,000.12"]]
+        f.readline()
+        assert MappedCsv.from_file(f) is None  # not at the start any more
@@ -0,0 +1,30 @@
+from dates import DateNormalizer
+
+
+def test_unparseable_values_beyond_the_limit_are_counted_in_one_total():
+    dates = DateNormalizer(unparseable_limit=2)
+    for value in ["bad 1", "bad 2", "bad 3", "bad 1", "bad 4", "2025-08-11T15:42:20.783"]:
+        dates.format(value)
+    assert dates.unparseable == {"bad 1": 2, "bad 2": 1}
+    assert dates.unparseable_other == 2
+    assert dates.unparseable_rows() == 5
+
+
+def test_format_column_counts_every_row():
+    dates = DateNormalizer(unparseable_limit=1)
+    column = ["bad 1", "bad 2", "bad 1", "bad 2", "bad 2", ""]
+    assert dates.format_column(column) == column
+    assert dates.unparseable == {"bad 1": 2}
+    assert dates.unparseable_other == 3
+
+
+def test_merging_taken_counts_keeps_the_limit():
+    worker = DateNormalizer()
+    for value in ["bad 1", "bad 2", "bad 2"]:
+        worker.format(value)
+    parent = DateNormalizer(unparseable_limit=1)
+    parent.format("bad 0")
+    parent.merge_unparseable(worker.take_unparseable())
+    assert worker.unparseable_rows() == 0
+    assert parent.unparseable == {"bad 0": 1}
+    assert parent.unparseable_other == 3
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+import deck_output
+from deck_output import DeckExporter, deck_line
+
+ROWS = [
+    ("Red Binder", "1", "Sol Ring", "", "472", ""),
+    ("Blue Binder", "2", "Counterspell", "", "", "foil"),
+    ("Red Binder", "3", "Lightning Bolt", "", "", ""),
+    ("Red Binder", "2", "Sol Ring", "", "472", ""),
+    ("Green Binder", "1", "Forest", "", "", "etched"),
+    ("Blue Binder", "1", "Counterspell", "", "", "foil"),
+    ("Red Binder", "1", "Lightning Bolt", "", "", "foil"),
+]
+
+
+def _export(directory, rows, **kwargs):
+    with DeckExporter(directory=str(directory), **kwargs) as decks:
+        for row in rows:
+            decks.add(*row)
+    return decks
+
+
+def _files(directory):
+    return {name: (directory / name).read_text() for name in sorted(os.listdir(directory))}
+
+
+def test_decks_are_merged_and_sorted():
+    decks = DeckExporter()
+    for row in ROWS:
+        decks.add(*row)
+    assert decks.render("deck_Red_Binder.txt") == "3 Lightning Bolt\n1 Lightning Bolt *F*\n3 Sol Ring\n"
+    assert decks.render("deck_Green_Binder.txt") == "1 Forest *E*\n"
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_spilled_decks_match_decks_held_in_memory(tmp_path, monkeypatch, threaded):
+    if threaded:
+        monkeypatch.setattr(deck_output, "PARALLEL_WRITE_BYTES", 0)
+    rows = ROWS * 50
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "spilled").mkdir()
+    (tmp_path / "spill").mkdir()
+    _export(tmp_path / "memory", rows)
+    decks = _export(tmp_path / "spilled", rows, max_buffered_entries=2, max_open_files=2,
+                    spill_dir=str(tmp_path / "spill"))
+    assert decks.spills > 0
+    assert _files(tmp_path / "spilled") == _files(tmp_path / "memory")
+    index = json.loads((tmp_path / "spilled" / "deck_index.json").read_text())
+    assert index["total_cards"] == 11 * 50
+    assert os.listdir(tmp_path / "spill") == []
+
+
+def test_nothing_is_written_when_the_conversion_fails(tmp_path):
+    (tmp_path / "spill").mkdir()
+    with pytest.raises(RuntimeError):
+        with DeckExporter(directory=str(tmp_path), max_buffered_entries=1,
+                          spill_dir=str(tmp_path / "spill")) as decks:
+            for row in ROWS:
+                decks.add(*row)
+            raise RuntimeError("conversion failed")
+    assert os.listdir(tmp_path) == ["spill"]
+    assert os.listdir(tmp_path / "spill") == []
+
+
+def test_deck_line_writes_the_set_only_with_a_known_label():
+    assert deck_line("2", "Sol Ring", "CMR", "472", "foil") == "2 Sol Ring (CMR) 472 *F*"
+    assert deck_line("2", "Sol Ring", "", "472") == "2 Sol Ring"
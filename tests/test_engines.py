@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+
+
+def _convert(directory, args, stdin=None):
+    directory.mkdir()
+    subprocess.run([sys.executable, os.path.join(REPO, "shiny_to_moxfield.py"), *args],
+                   cwd=directory, stdin=stdin, capture_output=True, check=True)
+    return {name: (directory / name).read_bytes() for name in sorted(os.listdir(directory))}
+
+
+@pytest.mark.parametrize("args", [
+    ["--engine", "fast"],
+    ["--engine", "columnar"],
+    ["--jobs", "3"],
+    ["--engine", "fast", "--jobs", "3"],
+])
+def test_every_engine_writes_the_same_files(tmp_path, args):
+    expected = _convert(tmp_path / "rows", [EXAMPLE])
+    assert len(expected) > 2  # the output CSV, the simple TSV and the deck files
+    assert _convert(tmp_path / "other", [EXAMPLE, *args]) == expected
+
+
+def test_stdin_is_converted_like_a_file(tmp_path):
+    expected = _convert(tmp_path / "file", [EXAMPLE])
+    with open(EXAMPLE, "rb") as f:
+        assert _convert(tmp_path / "stdin", ["-"], stdin=f) == expected
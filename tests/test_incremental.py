@@ -0,0 +1,65 @@
+import csv
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+
+
+def _convert(tmp_path, *args):
+    return subprocess.run([sys.executable, os.path.join(REPO, "shiny_to_moxfield.py"), "in.csv",
+                           "--incremental", "state.json", *args], cwd=tmp_path, capture_output=True, text=True)
+
+
+def _write_input(tmp_path, rows):
+    with open(tmp_path / "in.csv", "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+
+def _output_rows(tmp_path):
+    with open(tmp_path / "moxfield-converted-collection.csv", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_rows_that_repeat_an_id_are_all_kept(tmp_path):
+    with open(EXAMPLE, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    rows[2][0] = rows[1][0]
+    _write_input(tmp_path, rows)
+    assert _convert(tmp_path).returncode == 0
+    names = [row["Name"] for row in _output_rows(tmp_path)]
+    assert len(names) == len(rows) - 1
+    assert names[1] == rows[2][1]
+
+    rows[2][6] = "7"  # quantity of the second row with that id
+    _write_input(tmp_path, rows)
+    run = _convert(tmp_path)
+    assert "0 added, 1 changed, 0 removed" in run.stderr
+    assert _output_rows(tmp_path)[1]["Count"] == "7"
+
+
+def test_a_damaged_state_file_asks_for_full(tmp_path):
+    with open(EXAMPLE, newline="", encoding="utf-8") as f:
+        _write_input(tmp_path, list(csv.reader(f)))
+    (tmp_path / "state.json").write_text('{"version": 1, "rows": {"x": 5}}')
+    run = _convert(tmp_path)
+    assert run.returncode == 2
+    assert "--full" in run.stderr and "Traceback" not in run.stderr
+
+    assert _convert(tmp_path, "--full").returncode == 0
+    run = _convert(tmp_path)
+    assert run.returncode == 0
+    assert "0 added, 0 changed, 0 removed" in run.stderr
+
+
+def test_an_unchanged_input_empties_the_previous_delta(tmp_path):
+    with open(EXAMPLE, newline="", encoding="utf-8") as f:
+        _write_input(tmp_path, list(csv.reader(f)))
+    assert _convert(tmp_path).returncode == 0
+    (tmp_path / "moxfield-removed.csv").write_text("left over\n")
+    run = _convert(tmp_path)
+    assert "0 added, 0 changed, 0 removed" in run.stderr
+    for name in ("moxfield-delta.csv", "moxfield-removed.csv"):
+        with open(tmp_path / name, newline="", encoding="utf-8") as f:
+            assert len(list(csv.reader(f))) == 1
@@ -0,0 +1,34 @@
+import sys
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+import page_cache
+import scrape_set_names
+from page_cache import PageCache
+
+URL = "https://example.invalid/sets"
+PAGE = b"<table><tr><th>Set</th><th>Set code</th></tr><tr><td>Alpha</td><td>LEA</td></tr></table>"
+
+
+@pytest.fixture(params=[URLError("no network"), HTTPError(URL, 503, "Service Unavailable", {}, None)])
+def failing_network(request, monkeypatch):
+    def urlopen(*args, **kwargs):
+        raise request.param
+    monkeypatch.setattr(page_cache, "urlopen", urlopen)
+    monkeypatch.setattr(scrape_set_names, "urlopen", urlopen)
+
+
+def test_a_failed_fetch_uses_the_cached_snapshot(tmp_path, failing_network, capsys):
+    cache = PageCache(str(tmp_path))
+    sha = cache.import_snapshot(URL, PAGE)
+    assert cache.fetch(URL) == (PAGE, sha, False)
+    assert "using the cached snapshot" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("no_cache", [False, True])
+def test_a_failed_fetch_without_a_snapshot_is_an_error(tmp_path, failing_network, monkeypatch, capsys, no_cache):
+    argv = ["scrape_set_names.py", "--url", URL, "--cache-dir", str(tmp_path)] + (["--no-cache"] if no_cache else [])
+    monkeypatch.setattr(sys, "argv", argv)
+    assert scrape_set_names.main() == 2
+    assert capsys.readouterr().err.startswith(f"ERROR: could not fetch {URL}")
@@ -0,0 +1,55 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from prices import parse_cents, purchase_price
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+
+
+@pytest.mark.parametrize("value, cents", [
+    ("15.30", 1530),
+    ("$1,000.12", 100012),
+    ("2.5", 250),
+    (".50", 50),
+    ("$.05", 5),
+    ("1,50", 150),
+    ("$12,99", 1299),
+    ("1,500", 150000),
+    ("1,000,000", 100000000),
+    ("0.125", 13),
+    (".", None),
+    ("$", None),
+    ("", None),
+    ("Unavailable", None),
+])
+def test_parse_cents(value, cents):
+    assert parse_cents(value) == cents
+
+
+def test_purchase_price_is_blank_for_other_currencies():
+    assert purchase_price("1.50", "USD") == "1.50"
+    assert purchase_price("1.50", " usd ") == "1.50"
+    assert purchase_price("1.50", "") == "1.50"
+    assert purchase_price("1.50", "EUR") == ""
+
+
+@pytest.mark.parametrize("engine", ["rows", "fast", "columnar"])
+def test_every_engine_skips_purchase_prices_in_other_currencies(tmp_path, engine):
+    with open(EXAMPLE, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    header = rows[0]
+    paid, currency = header.index("paid_per_unit"), header.index("paid_currency")
+    rows[1][paid], rows[1][currency] = "1.50", "EUR"
+    rows[2][paid], rows[2][currency] = "1,50", "USD"
+    with open(tmp_path / "in.csv", "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+    run = subprocess.run([sys.executable, os.path.join(REPO, "shiny_to_moxfield.py"), "in.csv", "-o", "-",
+                          "--no-decks", "--engine", engine], cwd=tmp_path, capture_output=True, text=True, check=True)
+    out = list(csv.DictReader(run.stdout.splitlines()))
+    assert [row["Purchase Price"] for row in out[:2]] == ["", "1.50"]
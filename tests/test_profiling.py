@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+ROWS = 1269
+
+
+@pytest.mark.parametrize("engine", ["rows", "fast", "columnar"])
+def test_every_engine_profiles_its_read_write_and_date_stages(tmp_path, engine):
+    subprocess.run([sys.executable, os.path.join(REPO, "shiny_to_moxfield.py"), EXAMPLE, "--engine", engine,
+                    "-o", "-", "--profile", "profile.json"], cwd=tmp_path, check=True, capture_output=True)
+    report = json.loads((tmp_path / "profile.json").read_text())
+    stages = report["stages"]
+    assert stages["csv read"]["calls"] > 0
+    assert stages["csv write"]["calls"] > 0
+    assert stages["_format_last_modified"]["calls"] + stages["last_modified column"]["calls"] > 0
+    dates = report["caches"]["last_modified"]
+    assert dates["hits"] + dates["misses"] == ROWS
@@ -0,0 +1,27 @@
+import pytest
+
+from scrape_set_names import iter_set_pairs
+
+HTML = """<html><body>
+<table><tr><th>Year</th><th>Other</th></tr><tr><td>1993</td><td>LEA</td></tr></table>
+<table class="wikitable">
+<tr><th>Set</th><th>Release date</th><th>Set code</th></tr>
+<tr><td><i>Limited Edition Alpha</i><sup>[1]</sup></td><td rowspan="2">1993</td><td>LEA</td></tr>
+<tr><td>Limited   Edition Beta</td><td>LEB</td></tr>
+<tr><td>Unlimited Edition</td><td>1993</td><td>none</td></tr>
+<tr><td>Deck Builder&#39;s Toolkit</td><td>2010</td><td>&mdash;[a]</td></tr>
+</table>
+<table><tr><th>Set</th><th>Expansion code</th></tr><tr><td>Arabian Nights</td><td>ARN</td></tr></table>
+</body></html>"""
+
+EXPECTED = [("Limited Edition Alpha", "LEA"), ("Limited Edition Beta", "LEB"), ("Arabian Nights", "ARN")]
+
+
+def test_set_tables_are_found_and_cleaned():
+    assert list(iter_set_pairs([HTML])) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 7, 64])
+def test_chunks_split_anywhere_give_the_same_pairs(size):
+    chunks = [HTML[i:i + size] for i in range(0, len(HTML), size)]
+    assert list(iter_set_pairs(chunks)) == EXPECTED
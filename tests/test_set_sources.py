@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+
+import pytest
+
+import tcgplayer_to_moxfield
+from set_catalogue import ScryfallSource, SetSource
+from set_index import SetResolver, default_set_codes_csv, default_sets_json, load_set_resolver
+
+
+def _moxfield_codes():
+    # what tcgplayer_to_moxfield.py looked up before the set index existed
+    with open(default_set_codes_csv, newline="", encoding="utf-8") as f:
+        return {row["Set Name"]: row["SetCode"] for row in csv.DictReader(f)}
+
+
+def test_tcgplayer_editions_match_the_moxfield_set_codes():
+    codes = _moxfield_codes()
+    src = io.StringIO()
+    w = csv.writer(src)
+    w.writerow(["Have", "Name", "Set"])
+    for name in codes:
+        w.writerow(["1", "Card", name])
+    src.seek(0)
+
+    out = io.StringIO()
+    sets = load_set_resolver([default_set_codes_csv, default_sets_json], index_path=None)
+    tcgplayer_to_moxfield.process(csv.DictReader(src), csv.DictWriter(out, tcgplayer_to_moxfield.MOXFIELD_FIELDS), sets)
+    out.seek(0)
+    editions = [row["Edition"] for row in csv.DictReader(out)]
+    assert editions == list(codes.values())
+
+
+def test_default_sources_put_the_moxfield_codes_first():
+    sets = load_set_resolver(index_path=None)
+    assert sets.resolve("Lorwyn Eclipsed") == "ecl"
+    assert sets.resolve("Duel Decks: Elves vs. Goblins") == "dd1"
+
+
+def test_scryfall_source_follows_pages_of_a_saved_response(tmp_path):
+    second = tmp_path / "sets-2.json"
+    second.write_text(json.dumps({"data": [{"name": "Limited Edition Beta", "code": "leb"}]}))
+    first = tmp_path / "sets-1.json"
+    first.write_text(json.dumps({"data": [{"name": "Limited Edition Alpha", "code": "lea"}],
+                                 "has_more": True, "next_page": str(second)}))
+    records = ScryfallSource(str(first)).load(None, True, 1)
+    assert [(r.name, r.code) for r in records] == [("Limited Edition Alpha", "lea"),
+                                                   ("Limited Edition Beta", "leb")]
+    with pytest.raises(TypeError):
+        SetSource(str(first))
+
+
+def test_earlier_sources_win_when_names_differ_only_in_case():
+    sets = SetResolver.from_pairs([("Time Spiral Remastered", "tsr"), ("Time Spiral remastered", "xxx")])
+    assert sets.resolve("TIME SPIRAL REMASTERED") == "tsr"
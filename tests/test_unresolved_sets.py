@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO, "examples", "ShinyExport-fedfe0e51d11449ab31763ff769b09b1.csv")
+
+
+def _unresolved_report(tmp_path, *args):
+    """The set name warning block shiny_to_moxfield.py prints to stderr."""
+    run = subprocess.run([sys.executable, os.path.join(REPO, "shiny_to_moxfield.py"), EXAMPLE, "-o", "-",
+                          "--no-decks", *args],
+                         cwd=tmp_path, capture_output=True, text=True, check=True)
+    return [line for line in run.stderr.splitlines() if line.startswith(("WARNING", "  "))]
+
+
+@pytest.mark.parametrize("args", [
+    ("--jobs", "2"),
+    ("--engine", "fast"),
+    ("--engine", "fast", "--jobs", "2"),
+    ("--engine", "columnar"),
+])
+def test_every_engine_counts_unresolved_rows_like_the_rows_engine(tmp_path, args):
+    expected = _unresolved_report(tmp_path)
+    assert expected
+    assert _unresolved_report(tmp_path, *args) == expected